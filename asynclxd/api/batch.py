@@ -0,0 +1,138 @@
+"""Batching of concurrent resource reads.
+
+When many resources of a collection are fetched at the same time, a single
+recursive listing of the collection is often faster than individual requests.
+The :class:`ReadBatcher` collects reads performed within a short window and
+replaces them with a listing if they're enough.
+
+"""
+
+from asyncio import (
+    gather,
+    get_event_loop,
+    shield,
+    sleep,
+)
+from typing import NamedTuple
+
+
+class BatchConfig(NamedTuple):
+    """Configuration for batching resource reads."""
+
+    #: Seconds to wait for more reads after the first one, before performing
+    #: them.
+    window: float = 0.005
+    #: Minimum number of reads from the same collection within the window
+    #: which are replaced by a recursive listing of the collection.
+    threshold: int = 10
+
+
+class BatchStats(NamedTuple):
+    """Statistics about a :class:`ReadBatcher`."""
+
+    #: Number of recursive listings performed in place of individual reads.
+    listings: int
+    #: Number of reads served by recursive listings.
+    batched: int
+    #: Number of reads performed with individual requests.
+    individual: int
+
+
+class ReadBatcher:
+    """Batch concurrent reads of resources from the same collection.
+
+    Reads are performed individually if less than the configured threshold,
+    or if the resource is not in the collection listing.
+
+    Resources read through a listing don't have an ETag set, since the API
+    only returns one for the whole listing.
+
+    :param BatchConfig config: the configuration for batching.
+
+    """
+
+    def __init__(self, config=None):
+        self.config = config or BatchConfig()
+        self._listings = 0
+        self._batched = 0
+        self._individual = 0
+        # map collection URIs to dicts of pending reads
+        self._pending = {}
+        self._tasks = set()
+
+    async def read(self, collection, resource):
+        """Read details for a resource in a collection.
+
+        :param asynclxd.api.resource.ResourceCollection collection: the
+            collection the resource belongs to.
+        :param asynclxd.api.resource.Resource resource: the resource to read.
+
+        """
+        batch = self._pending.get(collection.uri)
+        if batch is None:
+            batch = self._pending[collection.uri] = {}
+            task = get_event_loop().create_task(self._flush(collection, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        future = batch.get(resource)
+        if future is None:
+            future = batch[resource] = get_event_loop().create_future()
+        # cancelling a caller must not cancel the read for others
+        await shield(future)
+
+    def stats(self):
+        """Return :class:`BatchStats` for the batcher."""
+        return BatchStats(
+            listings=self._listings,
+            batched=self._batched,
+            individual=self._individual,
+        )
+
+    async def _flush(self, collection, batch):
+        """Perform pending reads for a collection after the window."""
+        await sleep(self.config.window)
+        del self._pending[collection.uri]
+
+        if len(batch) < self.config.threshold:
+            await self._read_individually(batch)
+            return
+
+        self._listings += 1
+        try:
+            resources = set(await collection.read(recursion=True))
+        except Exception as error:
+            for future in batch.values():
+                _set_future(future, error=error)
+            return
+
+        missing = {}
+        for resource, future in batch.items():
+            if resource in resources:
+                self._batched += 1
+                _set_future(future)
+            else:
+                missing[resource] = future
+        # the resource might be not found, let the individual read fail
+        await self._read_individually(missing)
+
+    async def _read_individually(self, batch):
+        """Read resources with a request for each."""
+        self._individual += len(batch)
+        results = await gather(
+            *(resource.read() for resource in batch), return_exceptions=True
+        )
+        for future, result in zip(batch.values(), results):
+            if isinstance(result, Exception):
+                _set_future(future, error=result)
+            else:
+                _set_future(future)
+
+
+def _set_future(future, error=None):
+    """Set the result of a future, unless it's been cancelled."""
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
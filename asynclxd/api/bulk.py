@@ -0,0 +1,142 @@
+"""Run API calls for many items with bounded concurrency.
+
+Running a call for each item at once with :func:`asyncio.gather` can flood
+the server with requests. Functions in this module run at most a given number
+of calls at the same time, and capture errors for each item instead of
+failing on the first one.
+
+"""
+
+from asyncio import (
+    gather,
+    get_event_loop,
+    Queue,
+)
+from time import monotonic
+from typing import (
+    Any,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+#: Default number of calls run at the same time.
+DEFAULT_CONCURRENCY = 10
+
+
+class BulkResult(NamedTuple):
+    """The result of a call for an item."""
+
+    #: The item the call was run for.
+    item: Any
+    #: The value returned by the call, if successful.
+    result: Any = None
+    #: The exception raised by the call, if it failed.
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self):
+        """Whether the call was successful."""
+        return self.error is None
+
+
+class BulkReport(NamedTuple):
+    """A report for calls run for multiple items."""
+
+    #: A list of :class:`BulkResult`, in the same order as items.
+    results: List[BulkResult]
+    #: Seconds taken to run all calls.
+    elapsed: float
+
+    @property
+    def succeeded(self):
+        """Return a list of :class:`BulkResult` for successful calls."""
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self):
+        """Return a list of :class:`BulkResult` for failed calls."""
+        return [result for result in self.results if not result.ok]
+
+
+async def run_bulk(func, items, concurrency=DEFAULT_CONCURRENCY):
+    """Run a coroutine function for each item.
+
+    :param func: the coroutine function to call with each item.
+    :param items: an iterable with items.
+    :param int concurrency: the maximum number of calls run at the same time.
+    :return: a list of :class:`BulkResult`, in the same order as items.
+
+    """
+    _check_concurrency(concurrency)
+    entries = list(enumerate(items))
+    results = [None] * len(entries)
+
+    def store(index, result):
+        results[index] = result
+
+    await _run_workers(func, iter(entries), concurrency, store)
+    return results
+
+
+async def run_bulk_report(func, items, concurrency=DEFAULT_CONCURRENCY):
+    """Run a coroutine function for each item, returning a report.
+
+    This is like :func:`run_bulk`, but returns a :class:`BulkReport`.
+
+    """
+    start = monotonic()
+    results = await run_bulk(func, items, concurrency=concurrency)
+    return BulkReport(results=results, elapsed=monotonic() - start)
+
+
+def iter_bulk(func, items, concurrency=DEFAULT_CONCURRENCY):
+    """Run a coroutine function for each item, yielding results.
+
+    This returns an asynchronous iterator of :class:`BulkResult`. Results are
+    yielded as calls complete, so they might not be in the same order as
+    items. If iteration is stopped early, pending calls are cancelled.
+
+    :param func: the coroutine function to call with each item.
+    :param items: an iterable with items.
+    :param int concurrency: the maximum number of calls run at the same time.
+
+    """
+    _check_concurrency(concurrency)
+    return _iter_bulk(func, list(enumerate(items)), concurrency)
+
+
+async def _iter_bulk(func, entries, concurrency):
+    queue = Queue()
+
+    def store(index, result):
+        queue.put_nowait(result)
+
+    task = get_event_loop().create_task(
+        _run_workers(func, iter(entries), concurrency, store)
+    )
+    try:
+        for _ in entries:
+            yield await queue.get()
+    finally:
+        task.cancel()
+
+
+async def _run_workers(func, entries, concurrency, store):
+    """Run calls for entries with a pool of workers."""
+
+    async def worker():
+        # workers share the iterator, each taking the next entry
+        for index, item in entries:
+            try:
+                result = BulkResult(item=item, result=await func(item))
+            except Exception as error:
+                result = BulkResult(item=item, error=error)
+            store(index, result)
+
+    await gather(*(worker() for _ in range(concurrency)))
+
+
+def _check_concurrency(concurrency):
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
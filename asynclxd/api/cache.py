@@ -0,0 +1,141 @@
+"""Cache for API responses, revalidated through ETags."""
+
+from collections import OrderedDict
+from copy import deepcopy
+from time import monotonic
+from typing import (
+    Any,
+    Dict,
+    NamedTuple,
+)
+
+
+class CacheStats(NamedTuple):
+    """Statistics about a :class:`ResponseCache`."""
+
+    #: Number of requests served from the cache.
+    hits: int
+    #: Number of requests whose response was not cached or had changed.
+    misses: int
+    #: Number of cached responses.
+    size: int
+
+
+class CacheEntry(NamedTuple):
+    """A cached response."""
+
+    etag: str
+    http_code: int
+    headers: Dict[str, str]
+    content: Dict[str, Any]
+    expires: float
+
+
+class ResponseCache:
+    """A bounded LRU cache for API responses.
+
+    Keys are tuples with the request path as first element.
+
+    Cached responses are revalidated with the server through the
+    :data:`If-None-Match` header, and served from the cache if the server
+    replies that the resource has not been modified.
+
+    :param int max_entries: the maximum number of cached responses.
+    :param float ttl: seconds a cached response is served without being
+        revalidated with the server. By default, responses are always
+        revalidated.
+    :param dict collection_ttls: a dict mapping collection names (such as
+        :data:`containers`) to the TTL for their responses, overriding the
+        default one.
+
+    """
+
+    _time = staticmethod(monotonic)  # for testing
+
+    def __init__(self, max_entries=1024, ttl=0, collection_ttls=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.collection_ttls = collection_ttls or {}
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return :class:`CacheStats` for the cache."""
+        return CacheStats(hits=self.hits, misses=self.misses, size=len(self))
+
+    def get(self, key):
+        """Return the :class:`CacheEntry` for a key, or :data:`None`."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def is_fresh(self, entry):
+        """Return whether the entry can be used without revalidating it."""
+        return self._time() < entry.expires
+
+    def store(self, key, response):
+        """Store an :class:`asynclxd.api.http.Response` for a key.
+
+        Responses without an ETag are not cached.
+
+        """
+        if not response.etag:
+            self._entries.pop(key, None)
+            return
+
+        headers = {"ETag": response.etag}
+        if response.location:
+            headers["Location"] = response.location
+        content = {"type": response.type, "metadata": deepcopy(response.metadata)}
+        self._entries[key] = CacheEntry(
+            etag=response.etag,
+            http_code=response.http_code,
+            headers=headers,
+            content=content,
+            expires=self._expires(key),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def touch(self, key):
+        """Mark the entry for a key as fresh, after it's been revalidated."""
+        entry = self._entries[key]
+        self._entries[key] = entry._replace(expires=self._expires(key))
+
+    def invalidate(self, path):
+        """Remove cached responses affected by a change to a path.
+
+        Responses for the path itself, its ancestors (such as the collection
+        listing) and its descendants are removed.
+
+        """
+        for key in list(self._entries):
+            cached_path = key[0]
+            if (
+                cached_path == path
+                or path.startswith(cached_path + "/")
+                or cached_path.startswith(path + "/")
+            ):
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all cached responses."""
+        self._entries.clear()
+
+    def _expires(self, key):
+        """Return the time until the entry for a key is fresh."""
+        return self._time() + self._ttl(key[0])
+
+    def _ttl(self, path):
+        """Return the TTL for a path, based on the collection it's in."""
+        # paths are in the form /<version>/<collection>/...
+        parts = path.split("/")
+        if len(parts) > 2:
+            return self.collection_ttls.get(parts[2], self.ttl)
+        return self.ttl
@@ -0,0 +1,165 @@
+"""JSON codecs for API requests and responses.
+
+The standard library :mod:`json` module is always available. If installed,
+:mod:`orjson` or :mod:`ujson` are used instead, since they're considerably
+faster at decoding large responses.
+
+Decoding large payloads can still block the event loop for a noticeable time.
+The :class:`Decoder` can run it in an executor for payloads above a size
+threshold.
+
+"""
+
+from asyncio import get_event_loop
+import json
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    NamedTuple,
+)
+
+
+class JSONCodec(NamedTuple):
+    """A JSON encoder/decoder."""
+
+    #: Name of the codec.
+    name: str
+    #: Function decoding JSON from a :class:`str` or :class:`bytes`.
+    loads: Callable[[Any], Any]
+    #: Function encoding an object to a JSON :class:`str`.
+    dumps: Callable[[Any], str]
+
+
+def _json_codec():
+    """Return a codec using the standard library :mod:`json` module."""
+    return JSONCodec(name="json", loads=json.loads, dumps=json.dumps)
+
+
+def _orjson_codec():
+    """Return a codec using :mod:`orjson`."""
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+
+    return JSONCodec(name="orjson", loads=orjson.loads, dumps=dumps)
+
+
+def _ujson_codec():
+    """Return a codec using :mod:`ujson`."""
+    import ujson
+
+    return JSONCodec(name="ujson", loads=ujson.loads, dumps=ujson.dumps)
+
+
+#: Factories for supported codecs, in order of preference.
+CODECS = {
+    "orjson": _orjson_codec,
+    "ujson": _ujson_codec,
+    "json": _json_codec,
+}
+
+
+def get_codec(name=None):
+    """Return a :class:`JSONCodec`.
+
+    :param str name: the name of the codec. If not specified, the first
+        available one from :data:`CODECS` is returned.
+
+    """
+    if name is not None:
+        try:
+            factory = CODECS[name]
+        except KeyError:
+            raise ValueError(f"Unknown JSON codec: {name}")
+        return factory()
+
+    for factory in CODECS.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+
+
+class DecodeStats(NamedTuple):
+    """Statistics about payloads decoded by a :class:`Decoder`."""
+
+    #: Number of payloads decoded in the event loop.
+    inline: int
+    #: Total seconds spent decoding payloads in the event loop.
+    inline_time: float
+    #: Number of payloads decoded in the executor.
+    offloaded: int
+    #: Total seconds spent decoding payloads in the executor rather than in
+    #: the event loop.
+    offloaded_time: float
+    #: Longest time spent decoding a single payload in the executor.
+    max_offloaded_time: float
+
+
+class Decoder:
+    """Decode JSON payloads, running large ones in an executor.
+
+    :param JSONCodec codec: the codec to decode payloads with.
+    :param int offload_threshold: payload size in bytes from which decoding is
+        run in the executor. If :data:`None`, payloads are always decoded in
+        the event loop.
+    :param concurrent.futures.Executor executor: the executor for decoding
+        large payloads. If not specified, the loop default one is used. With a
+        :class:`concurrent.futures.ProcessPoolExecutor`, the codec
+        :data:`loads` function must be picklable.
+
+    Decoders hold the GIL while building the result, so the event loop can
+    still be slowed down by decoding in a thread. The
+    :data:`benchmarks/bench_decode_lag.py` script measures the actual loop
+    lag for different executors.
+
+    """
+
+    def __init__(self, codec, offload_threshold=None, executor=None):
+        self.codec = codec
+        self.offload_threshold = offload_threshold
+        self.executor = executor
+        self._inline = 0
+        self._inline_time = 0.0
+        self._offloaded = 0
+        self._offloaded_time = 0.0
+        self._max_offloaded_time = 0.0
+
+    async def decode(self, data):
+        """Decode a JSON payload.
+
+        :param bytes data: the payload to decode.
+
+        """
+        if self.offload_threshold is None or len(data) < self.offload_threshold:
+            content, elapsed = _timed_loads(self.codec.loads, data)
+            self._inline += 1
+            self._inline_time += elapsed
+            return content
+
+        content, elapsed = await get_event_loop().run_in_executor(
+            self.executor, _timed_loads, self.codec.loads, data
+        )
+        self._offloaded += 1
+        self._offloaded_time += elapsed
+        self._max_offloaded_time = max(self._max_offloaded_time, elapsed)
+        return content
+
+    def stats(self):
+        """Return :class:`DecodeStats` for the decoder."""
+        return DecodeStats(
+            inline=self._inline,
+            inline_time=self._inline_time,
+            offloaded=self._offloaded,
+            offloaded_time=self._offloaded_time,
+            max_offloaded_time=self._max_offloaded_time,
+        )
+
+
+def _timed_loads(loads, data):
+    """Decode data, returning a tuple with the result and elapsed time."""
+    start = perf_counter()
+    content = loads(data)
+    return content, perf_counter() - start
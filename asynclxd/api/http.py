@@ -1,6 +1,7 @@
 """Perform requests to the API."""
 
 from abc import ABC
+import json
 from pathlib import Path
 from pprint import pformat
 
@@ -9,6 +10,7 @@ from aiohttp import (
     StreamReader,
 )
 
+from .jsonstream import iter_metadata_items
 from .resources.operations import Operation
 
 
@@ -38,9 +40,15 @@ class Response:
 
     """
 
-    metadata = None
-
-    _content = None
+    __slots__ = (
+        "_remote",
+        "http_code",
+        "etag",
+        "location",
+        "type",
+        "metadata",
+        "_content",
+    )
 
     def __init__(self, remote, http_code, headers, content):
         self._remote = remote
@@ -50,7 +58,9 @@ class Response:
         if isinstance(content, ContentStream):
             self._content = content
             self.type = "raw"
+            self.metadata = None
         else:
+            self._content = None
             self.type = content.get("type")
             self.metadata = content.get("metadata", {})
 
@@ -60,7 +70,7 @@ class Response:
         if self.type != "async":
             return None
 
-        operation = Operation(self._remote, self.location)
+        operation = self._remote.identity_map.get(Operation, self.location)
         operation.update_details(self.metadata)
         return operation
 
@@ -76,6 +86,21 @@ class Response:
         async for data in self._content.iter_any():
             stream.write(data)
 
+    def iter_metadata(self, depth=1):
+        """Asynchronously iterate over items in metadata of a streamed response.
+
+        This is for JSON responses to requests performed with
+        :data:`stream=True`, whose content is parsed as it's received.
+
+        :param int depth: nesting level of items in the metadata. For a list,
+            this is ``1``; for a dict of lists, ``2``.
+
+        """
+        if not self._content:
+            raise ValueError("No streamed payload")
+
+        return iter_metadata_items(self._content.iter_any(), depth=depth)
+
     def pprint(self):
         """Pretty-print the response.
 
@@ -107,7 +132,14 @@ class ResponseError(Exception):
 
 
 async def request(
-    session, method, path, params=None, headers=None, content=None, upload=None
+    session,
+    method,
+    path,
+    params=None,
+    headers=None,
+    content=None,
+    upload=None,
+    loads=json.loads,
 ):
     """Perform an API request with a session.
 
@@ -122,6 +154,7 @@ async def request(
     :param content: JSON-serializable object for the request content.
     :param upload: a :class:`pathlib.Path` or open file descriptor for file
         upload.
+    :param loads: the function used to decode JSON error responses.
 
     """
     if not headers:
@@ -145,7 +178,7 @@ async def request(
         error_code = error.status
         error_mesg = error.message
         if error.headers.get("Content-Type") == "application/json":
-            content = await response.json()
+            content = await response.json(loads=loads)
             error_code = content["error_code"]
             error_mesg = content["error"]
         raise ResponseError(error_code, error_mesg)
@@ -0,0 +1,218 @@
+"""Incremental parsing of JSON API responses.
+
+This allows processing items in the :data:`metadata` of large responses (such
+as collection listings) as they're received, without loading the whole
+response in memory.
+
+Items are decoded with the standard library :mod:`json` decoder, since
+parsing needs to resume on partial data.
+
+"""
+
+import codecs
+from json import (
+    JSONDecodeError,
+    JSONDecoder,
+)
+
+_WHITESPACE = " \t\n\r"
+
+# returned when more data is needed to decode a value
+_INCOMPLETE = object()
+
+
+class MetadataItemsParser:
+    """Push parser returning items in the metadata of a JSON API response.
+
+    Data is passed to the parser with :func:`feed` as it's received, and items
+    are returned as soon as they're fully parsed.
+
+    :param int depth: nesting level of items in the metadata. With ``1``
+        items are the elements of the metadata list, with ``2`` they're the
+        elements of lists in the metadata dict (or list), and so on.
+
+    """
+
+    def __init__(self, depth=1):
+        self.depth = depth
+        self._decoder = JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        # stack of parsing states, with the current one at the end
+        self._states = [("envelope-start",)]
+
+    def feed(self, data):
+        """Feed a chunk of data to the parser.
+
+        :param bytes data: a chunk of the response body.
+        :return: a list of items completely parsed.
+
+        """
+        self._append(self._text_decoder.decode(data))
+        return self._parse()
+
+    def close(self):
+        """Signal the end of data.
+
+        :return: a list of remaining items.
+        :raises ValueError: if the response is incomplete or invalid.
+
+        """
+        self._append(self._text_decoder.decode(b"", final=True))
+        self._eof = True
+        items = self._parse()
+        self._skip_whitespace()
+        if self._states or self._pos < len(self._buffer):
+            raise ValueError("Incomplete or invalid JSON response")
+        return items
+
+    def _append(self, text):
+        """Append text to the buffer, dropping the parsed part."""
+        self._buffer = self._buffer[self._pos :] + text
+        self._pos = 0
+
+    def _parse(self):
+        """Parse the buffer as much as possible, returning found items."""
+        items = []
+        while self._states and self._step(items):
+            pass
+        return items
+
+    def _step(self, items):
+        """Perform a parsing step, returning whether it made progress."""
+        self._skip_whitespace()
+        if self._pos == len(self._buffer):
+            return False
+
+        state = self._states[-1]
+        name = state[0]
+        char = self._buffer[self._pos]
+        if name == "envelope-start":
+            self._expect(char, "{")
+            self._states[-1] = ("envelope-key", True)
+        elif name == "envelope-key":
+            if state[1] and char == "}":
+                self._pos += 1
+                self._states.pop()
+                return True
+            key = self._decode()
+            if key is _INCOMPLETE:
+                return False
+            self._states[-1] = ("envelope-colon", key)
+        elif name == "envelope-colon":
+            self._expect(char, ":")
+            self._states[-1] = ("envelope-next",)
+            if state[1] == "metadata":
+                self._states.append(("value", self.depth))
+            else:
+                self._states.append(("skip",))
+        elif name == "envelope-next":
+            if char == ",":
+                self._pos += 1
+                self._states[-1] = ("envelope-key", False)
+            else:
+                self._expect(char, "}")
+                self._states.pop()
+        elif name == "skip":
+            if self._decode() is _INCOMPLETE:
+                return False
+            self._states.pop()
+        elif name == "value":
+            return self._step_value(state[1], items)
+        elif name == "container":
+            return self._step_container(state, char)
+        elif name == "key":
+            key = self._decode()
+            if key is _INCOMPLETE:
+                return False
+            self._states[-1] = ("colon", state[1])
+        elif name == "colon":
+            self._expect(char, ":")
+            self._states[-1] = ("value", state[1])
+        return True
+
+    def _step_value(self, depth, items):
+        """Parse a value at the specified depth."""
+        char = self._buffer[self._pos]
+        if depth == 0:
+            item = self._decode()
+            if item is _INCOMPLETE:
+                return False
+            items.append(item)
+            self._states.pop()
+        elif char in "[{":
+            self._pos += 1
+            self._states[-1] = ("container", char, depth, True)
+        else:
+            # null or empty values don't contain items
+            if self._decode() is _INCOMPLETE:
+                return False
+            self._states.pop()
+        return True
+
+    def _step_container(self, state, char):
+        """Parse the next element of a list or dict."""
+        _, kind, depth, first = state
+        end = "]" if kind == "[" else "}"
+        if char == end:
+            self._pos += 1
+            self._states.pop()
+            return True
+        if not first:
+            self._expect(char, ",")
+        self._states[-1] = ("container", kind, depth, False)
+        if kind == "[":
+            self._states.append(("value", depth - 1))
+        else:
+            self._states.append(("key", depth - 1))
+        return True
+
+    def _skip_whitespace(self):
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+
+    def _expect(self, char, expected):
+        if char != expected:
+            raise ValueError(
+                f"Invalid JSON response: expected {expected!r} at position "
+                f"{self._pos}, found {char!r}"
+            )
+        self._pos += 1
+
+    def _decode(self):
+        """Decode a value from the buffer.
+
+        :data:`_INCOMPLETE` is returned if more data is needed.
+
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except JSONDecodeError:
+            if self._eof:
+                raise ValueError("Invalid JSON response")
+            return _INCOMPLETE
+        if end == len(self._buffer) and not self._eof:
+            # values such as numbers could continue in the next chunk
+            return _INCOMPLETE
+        self._pos = end
+        return value
+
+
+async def iter_metadata_items(chunks, depth=1):
+    """Asynchronously yield items in the metadata of a JSON API response.
+
+    :param chunks: an asynchronous iterable of :class:`bytes` chunks.
+    :param int depth: nesting level of items in the metadata (see
+        :class:`MetadataItemsParser`).
+
+    """
+    parser = MetadataItemsParser(depth=depth)
+    async for data in chunks:
+        for item in parser.feed(data):
+            yield item
+    for item in parser.close():
+        yield item
@@ -1,11 +1,215 @@
 """API resources base classes."""
 
 import abc
+from collections.abc import (
+    Mapping,
+    Sequence,
+)
 from copy import deepcopy
+from functools import partial
 from urllib.parse import (
     quote,
     unquote,
 )
+from weakref import WeakValueDictionary
+
+from .bulk import (
+    DEFAULT_CONCURRENCY,
+    iter_bulk,
+    run_bulk,
+)
+
+
+class FrozenDict(Mapping):
+    """A read-only view of a dict.
+
+    Nested dicts and lists are returned as read-only views too, so data is
+    shared with the underlying dict rather than copied.
+
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({repr(self._data)})"
+
+    def __getitem__(self, key):
+        return freeze(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, (FrozenDict, FrozenList)):
+            other = other._data
+        return self._data == other
+
+    def __deepcopy__(self, memo):
+        return deepcopy(self._data, memo)
+
+    def copy(self):
+        """Return a mutable deep copy of the data."""
+        return deepcopy(self._data)
+
+
+class FrozenList(Sequence):
+    """A read-only view of a list.
+
+    Nested dicts and lists are returned as read-only views too, so data is
+    shared with the underlying list rather than copied.
+
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({repr(self._data)})"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FrozenList(self._data[index])
+        return freeze(self._data[index])
+
+    def __iter__(self):
+        return (freeze(item) for item in self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        if isinstance(other, (FrozenDict, FrozenList)):
+            other = other._data
+        return self._data == other
+
+    def __deepcopy__(self, memo):
+        return deepcopy(self._data, memo)
+
+    def copy(self):
+        """Return a mutable deep copy of the data."""
+        return deepcopy(self._data)
+
+
+class LazyResourceList(Sequence):
+    """A read-only list of related resources, created on access.
+
+    Entries from resource details are converted to resources only when
+    they're accessed, so that long lists (such as :data:`used_by`) don't need
+    to be fully processed if they're not used.
+
+    :param list entries: entries from resource details.
+    :param factory: a callable returning a resource from an entry.
+
+    """
+
+    __slots__ = ("_entries", "_factory", "_resources")
+
+    def __init__(self, entries, factory):
+        self._entries = entries
+        self._factory = factory
+        self._resources = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({repr(self._entries)})"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._resource(i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        return self._resource(index)
+
+    def __iter__(self):
+        return (self._resource(i) for i in range(len(self)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyResourceList):
+            other = list(other)
+        return list(self) == other
+
+    def __deepcopy__(self, memo):
+        return deepcopy(list(self), memo)
+
+    @property
+    def entries(self):
+        """Return a read-only view of entries from resource details."""
+        return FrozenList(self._entries)
+
+    def copy(self):
+        """Return a list with all resources."""
+        return list(self)
+
+    def _resource(self, index):
+        """Return the resource at the specified index, creating it if needed."""
+        if self._resources is None:
+            self._resources = [None] * len(self._entries)
+        resource = self._resources[index]
+        if resource is None:
+            resource = self._factory(self._entries[index])
+            self._resources[index] = resource
+        return resource
+
+
+def freeze(value):
+    """Return a read-only view of a value, if it's a dict or a list."""
+    if isinstance(value, dict):
+        return FrozenDict(value)
+    if isinstance(value, list):
+        return FrozenList(value)
+    return value
+
+
+class IdentityMap:
+    """Map URIs to resource instances for a remote.
+
+    This allows sharing a single instance (and its cached details) for each
+    resource. Instances are weakly referenced, so they're dropped from the map
+    once they're not used anymore.
+
+    :param asynclxd.remote.Remote remote: the remote for resources.
+
+    """
+
+    def __init__(self, remote):
+        self._remote = remote
+        self._resources = WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._resources)
+
+    def __contains__(self, uri):
+        return uri in self._resources
+
+    def get(self, resource_class, uri):
+        """Return the instance of a resource class for the URI.
+
+        A new instance is created if one doesn't exist.
+
+        """
+        resource = self._resources.get(uri)
+        if type(resource) is not resource_class:
+            resource = resource_class(self._remote, uri)
+            self._resources[uri] = resource
+        return resource
+
+    def rename(self, resource, old_uri):
+        """Update the map for a resource whose URI has changed."""
+        if self._resources.get(old_uri) is resource:
+            del self._resources[old_uri]
+        self._resources[resource.uri] = resource
 
 
 class Collection:
@@ -40,6 +244,11 @@ class ResourceCollection(metaclass=abc.ABCMeta):
 
     resource_class = abc.abstractproperty(doc="Class for returned resources")
 
+    #: Nesting level of resources in the metadata of the collection listing,
+    # used when streaming it. It must match the format returned by
+    # _process_content().
+    stream_depth = 1
+
     def __init__(self, remote, uri, raw=False):
         self._remote = remote
         self.uri = uri
@@ -60,22 +269,58 @@ class ResourceCollection(metaclass=abc.ABCMeta):
         if response.operation:
             # the creation operation is async
             return response.operation
-        return self.resource_class(self._remote, response.location)
+        return self._remote.identity_map.get(self.resource_class, response.location)
 
     def get_resource(self, id):
-        """Return a resource with the specified ID."""
-        return self.resource_class(self._remote, self._resource_uri(id))
+        """Return a resource with the specified ID.
+
+        The same instance is returned for the same resource, as long as it's
+        in use.
+
+        """
+        return self._remote.identity_map.get(
+            self.resource_class, self._resource_uri(id)
+        )
 
     async def get(self, id):
         """Return a single resource in the collection.
 
         This performs a :data:`GET` call to fetch resource details.
 
+        If the remote has a :class:`asynclxd.api.batch.ReadBatcher`,
+        concurrent calls might be performed with a single request.
+
         """
         resource = self.get_resource(id)
-        await resource.read()
+        batcher = self._remote.read_batcher
+        if batcher is None or self._raw:
+            await resource.read()
+        else:
+            await batcher.read(self, resource)
         return resource
 
+    async def get_many(self, ids, concurrency=DEFAULT_CONCURRENCY):
+        """Return multiple resources in the collection.
+
+        Resources are fetched as with :func:`get`, performing at most
+        `concurrency` requests at the same time.
+
+        A list of :class:`asynclxd.api.bulk.BulkResult` is returned, in the
+        same order as IDs, with either the resource or the error raised when
+        fetching it.
+
+        """
+        return await run_bulk(self.get, ids, concurrency=concurrency)
+
+    def iter_many(self, ids, concurrency=DEFAULT_CONCURRENCY):
+        """Asynchronously iterate over multiple resources in the collection.
+
+        This is like :func:`get_many`, but results are yielded as soon as
+        resources are fetched, not necessarily in the same order as IDs.
+
+        """
+        return iter_bulk(self.get, ids, concurrency=concurrency)
+
     async def read(self, recursion=False):
         """Return resources for this collection.
 
@@ -84,7 +329,9 @@ class ResourceCollection(metaclass=abc.ABCMeta):
 
         """
         params = {"recursion": 1} if recursion else None
-        response = await self._remote.request("GET", self.uri, params=params)
+        response = await self._remote.request(
+            "GET", self.uri, params=params, cache=True
+        )
         content = response.metadata
         if self._raw:
             return content
@@ -92,12 +339,36 @@ class ResourceCollection(metaclass=abc.ABCMeta):
         content = self._process_content(content)
         if recursion:
             return [self.resource_from_details(details) for details in content]
-        return [self.resource_class(self._remote, uri) for uri in content]
+        identity_map = self._remote.identity_map
+        return [identity_map.get(self.resource_class, uri) for uri in content]
+
+    async def iter(self, recursion=False):
+        """Asynchronously iterate over resources in this collection.
+
+        Unlike :func:`read`, the response is parsed as it's received and
+        resources are yielded one at a time, so memory usage doesn't depend on
+        the size of the collection.
+
+        If recursion is True, details for resources are fetched in a single
+        request.
+
+        """
+        params = {"recursion": 1} if recursion else None
+        response = await self._remote.request(
+            "GET", self.uri, params=params, stream=True
+        )
+        identity_map = self._remote.identity_map
+        async for entry in response.iter_metadata(depth=self.stream_depth):
+            if self._raw:
+                yield entry
+            elif recursion:
+                yield self.resource_from_details(entry)
+            else:
+                yield identity_map.get(self.resource_class, entry)
 
     def resource_from_details(self, details):
         """Return an instance of a resource for the collection from details."""
-        resource_id = self.resource_class.id_from_details(details)
-        resource = self.resource_class(self._remote, self._resource_uri(resource_id))
+        resource = self.get_resource(self.resource_class.id_from_details(details))
         resource.update_details(details)
         return resource
 
@@ -134,28 +405,37 @@ class Resource(metaclass=abc.ABCMeta):
     # keys are returned as instances of the resource class.
     related_resources = None
 
-    _last_etag = None
-    _details = None
+    # subclasses should define __slots__ too, to avoid having a __dict__
+    __slots__ = ("_remote", "uri", "_last_etag", "_details", "__weakref__")
 
     def __init__(self, remote, uri):
         self._remote = remote
         self.uri = uri
+        self._last_etag = None
+        self._details = None
 
     def __repr__(self):
         return f"{self.__class__.__name__}({repr(self.uri)})"
 
     def __eq__(self, other):
+        if not isinstance(other, Resource):
+            return NotImplemented
         return (self._remote, self.uri) == (other._remote, other.uri)
 
+    def __hash__(self):
+        # note that the hash changes if the resource is renamed
+        return hash((self._remote, self.uri))
+
     def __getitem__(self, item):
         if not self._details:
             raise KeyError(repr(item))
-        return deepcopy(self._details[item])
+        return freeze(self._details[item])
 
     def __deepcopy__(self, memo):
         copy = self.__class__(self._remote, self.uri)
         copy._last_etag = self._last_etag
-        copy._details = deepcopy(self._details, memo)
+        # details are never modified in place, so they can be shared
+        copy._details = self._details
         return copy
 
     @property
@@ -178,18 +458,26 @@ class Resource(metaclass=abc.ABCMeta):
         self._details = deepcopy(details)
         self._set_related_resources(self._details)
 
-    def details(self):
+    def details(self, mutable=False):
         """Return details about this resource.
 
         If a previous read() operation has been performed for this resouce,
         details from the response are returned, otherwise :data:`None` is
         returned.
 
+        By default, details are returned as a read-only :class:`FrozenDict`
+        view, which doesn't copy them.
+
+        :param bool mutable: whether to return a deep copy of the details
+            that can be modified instead.
+
         """
         if not self._details:
             return None
 
-        return deepcopy(self._details)
+        if mutable:
+            return deepcopy(self._details)
+        return FrozenDict(self._details)
 
     async def read(self):
         """Return details for this resource."""
@@ -230,7 +518,9 @@ class Resource(metaclass=abc.ABCMeta):
             the request.
 
         """
-        response = await self._remote.request("GET", self.uri, params=params)
+        response = await self._remote.request(
+            "GET", self.uri, params=params, cache=True
+        )
         self._process_response(response)
         return response
 
@@ -248,8 +538,9 @@ class Resource(metaclass=abc.ABCMeta):
     def _process_response(self, response):
         """Process response with resource details."""
         self._last_etag = response.etag
-        self._set_related_resources(response.metadata)
+        # copy details first, since the response might be shared
         self._details = deepcopy(response.metadata)
+        self._set_related_resources(self._details)
 
     def _set_related_resources(self, metadata):
         """Convert related resoruces to resource instances."""
@@ -268,10 +559,20 @@ class Resource(metaclass=abc.ABCMeta):
                 continue
             # replace with resource instances
             if isinstance(entry, list):
-                for i, resource_entry in enumerate(entry):
-                    entry[i] = resource_factory(self._remote, resource_entry)
+                # resources in lists are only created when accessed
+                parent_entry[key] = LazyResourceList(
+                    entry, partial(self._related_resource, resource_factory)
+                )
             else:
-                parent_entry[key] = resource_factory(self._remote, entry)
+                parent_entry[key] = self._related_resource(resource_factory, entry)
+
+    def _related_resource(self, resource_factory, entry):
+        """Return a related resource from its factory."""
+        if isinstance(resource_factory, type) and issubclass(
+            resource_factory, Resource
+        ):
+            return self._remote.identity_map.get(resource_factory, entry)
+        return resource_factory(self._remote, entry)
 
 
 class NamedResource(Resource):
@@ -281,6 +582,8 @@ class NamedResource(Resource):
 
     """
 
+    __slots__ = ()
+
     id_attribute = "name"
 
     async def rename(self, name):
@@ -292,5 +595,6 @@ class NamedResource(Resource):
         response = await self._remote.request("POST", self.uri, content={"name": name})
         self._process_response(response)
         # URI has changed
-        self.uri = response.location
+        old_uri, self.uri = self.uri, response.location
+        self._remote.identity_map.rename(self, old_uri)
         return response
@@ -9,6 +9,8 @@ from ..resource import (
 class Certificate(Resource):
     """API resouce for certificates."""
 
+    __slots__ = ()
+
     id_attribute = "fingerprint"
 
 
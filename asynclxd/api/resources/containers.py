@@ -1,5 +1,9 @@
 """API resources for containers."""
 
+from ..bulk import (
+    DEFAULT_CONCURRENCY,
+    run_bulk_report,
+)
 from ..resource import (
     Collection,
     NamedResource,
@@ -11,6 +15,8 @@ from ..resource import (
 class Logfile(Resource):
     """API resource for container log files."""
 
+    __slots__ = ()
+
     id_attribute = None
 
 
@@ -29,6 +35,8 @@ class Logfiles(ResourceCollection):
 class Snapshot(NamedResource):
     """API resource for container snapshots."""
 
+    __slots__ = ()
+
     @classmethod
     def id_from_details(cls, details):
         # return just the snapshot name
@@ -45,13 +53,143 @@ class Snapshots(ResourceCollection):
 class Container(NamedResource):
     """API resource for containers."""
 
+    __slots__ = ()
+
     #: Collection property for accessing log files.
     logs = Collection(Logfiles)
     #: Collection property for accessing snapshots.
     snapshots = Collection(Snapshots)
 
+    async def state(self):
+        """Return the container state."""
+        response = await self._remote.request("GET", self._uri("state"))
+        return response.metadata
+
+    async def change_state(self, action, timeout=None, force=False, stateful=False):
+        """Change the container state.
+
+        :param str action: the state change, one of :data:`start`,
+            :data:`stop`, :data:`restart`, :data:`freeze` or :data:`unfreeze`.
+        :param int timeout: seconds to wait for the state change.
+        :param bool force: whether to force the state change.
+        :param bool stateful: whether to store or restore the container state.
+
+        Return the operation for the state change.
+
+        """
+        content = {"action": action, "force": force, "stateful": stateful}
+        if timeout is not None:
+            content["timeout"] = timeout
+        response = await self._remote.request(
+            "PUT", self._uri("state"), content=content
+        )
+        return response.operation
+
 
 class Containers(ResourceCollection):
-    """Containers collection API methods."""
+    """Containers collection API methods.
+
+    Methods changing multiple containers perform at most `concurrency`
+    requests at the same time. If `wait` is True, they also wait for
+    background operations to complete.
+
+    They return a :class:`asynclxd.api.bulk.BulkReport`, with either the
+    operation (or the response, if the change is not performed in background)
+    or the error for each container.
+
+    """
 
     resource_class = Container
+
+    async def update_many(
+        self, details, etag=True, wait=True, concurrency=DEFAULT_CONCURRENCY
+    ):
+        """Update multiple containers.
+
+        :param dict details: a dict mapping container names to details to
+            update.
+        :param bool etag: whether to set the ETag from the last read of each
+            container, if available.
+
+        """
+
+        async def update(name):
+            container = self.get_resource(name)
+            response = await container.update(details[name], etag=etag)
+            return await _complete(response, wait)
+
+        return await run_bulk_report(update, details, concurrency=concurrency)
+
+    async def replace_many(
+        self, details, etag=True, wait=True, concurrency=DEFAULT_CONCURRENCY
+    ):
+        """Replace details for multiple containers.
+
+        :param dict details: a dict mapping container names to their new
+            details.
+        :param bool etag: whether to set the ETag from the last read of each
+            container, if available.
+
+        """
+
+        async def replace(name):
+            container = self.get_resource(name)
+            response = await container.replace(details[name], etag=etag)
+            return await _complete(response, wait)
+
+        return await run_bulk_report(replace, details, concurrency=concurrency)
+
+    async def delete_many(self, names, wait=True, concurrency=DEFAULT_CONCURRENCY):
+        """Delete multiple containers.
+
+        :param list names: names of containers to delete.
+
+        """
+
+        async def delete(name):
+            response = await self.get_resource(name).delete()
+            return await _complete(response, wait)
+
+        return await run_bulk_report(delete, names, concurrency=concurrency)
+
+    async def change_state_many(
+        self,
+        names,
+        action,
+        timeout=None,
+        force=False,
+        stateful=False,
+        wait=True,
+        concurrency=DEFAULT_CONCURRENCY,
+    ):
+        """Change state for multiple containers.
+
+        :param list names: names of containers to change state for.
+
+        Other parameters are the same as :func:`Container.change_state`.
+
+        """
+
+        async def change_state(name):
+            operation = await self.get_resource(name).change_state(
+                action, timeout=timeout, force=force, stateful=stateful
+            )
+            if operation and wait:
+                await operation.complete()
+            return operation
+
+        return await run_bulk_report(change_state, names, concurrency=concurrency)
+
+
+async def _complete(response, wait):
+    """Return the operation for a response, waiting for it if requested.
+
+    If the response is not for a background operation, it's returned as is.
+
+    """
+    operation = response.operation
+    if operation is None:
+        return response
+    if wait:
+        await operation.complete()
+    return operation
@@ -1,12 +1,22 @@
 """API resources for events."""
 
+from asyncio import Event as AsyncEvent
+from collections import deque
+from enum import Enum
+from typing import NamedTuple
+
 import attr
 import iso8601
+from toolrack.log import Loggable
 
-from ..websocket import WebsocketHandler
+from ..websocket import (
+    Backoff,
+    KeyedDispatcher,
+    WebsocketHandler,
+)
 
 
-@attr.s
+@attr.s(slots=True)
 class Event:
     """An event from the API."""
 
@@ -19,29 +29,507 @@ class Events:
     """Handler for reading events.
 
     When called, it creates a task that reads events and calls the specified
-    handler with each :class:`Event`.
+    handler with each :class:`Event`. If `handle_connect` is specified, it's
+    called once the connection is established.
+
+    If `concurrency` is specified, events are handled concurrently as
+    described in :class:`EventHandler`.
+
+    If `reconnect` is specified with a
+    :class:`asynclxd.api.websocket.Backoff`, the websocket is connected again
+    when closed, and `handle_gap` is called with a
+    :class:`asynclxd.api.websocket.Gap` once reconnected.
 
     """
 
     def __init__(self, remote):
         self._remote = remote
 
-    def __call__(self, handle_event, types=None):
+    def __call__(
+        self,
+        handle_event,
+        types=None,
+        handle_connect=None,
+        concurrency=None,
+        key=None,
+        reconnect=None,
+        handle_gap=None,
+    ):
         params = {"type": ",".join(types)} if types else None
         return self._remote.websocket(
-            EventHandler(handle_event), "events", params=params
+            EventHandler(
+                handle_event,
+                handle_connect=handle_connect,
+                concurrency=concurrency,
+                key=key,
+                handle_gap=handle_gap,
+            ),
+            "events",
+            params=params,
+            reconnect=reconnect,
+        )
+
+    def subscribe(self, handle_event, types=None, predicate=None, handle_gap=None):
+        """Subscribe to events through the shared websocket of the remote.
+
+        See :func:`EventHub.subscribe` for details.
+
+        """
+        return self._remote.event_hub.subscribe(
+            handle_event, types=types, predicate=predicate, handle_gap=handle_gap
+        )
+
+    def stream(self, types=None, predicate=None, maxsize=1000, overflow=None):
+        """Return an :class:`EventStream` for events of specified types.
+
+        Events are received through the shared websocket of the remote.
+
+        See :class:`EventStream` for details.
+
+        """
+        return EventStream(
+            self._remote.event_hub,
+            types=types,
+            predicate=predicate,
+            maxsize=maxsize,
+            overflow=overflow,
+        )
+
+
+class Subscription:
+    """A subscription to events from an :class:`EventHub`.
+
+    :param handle_event: a coroutine function called with each matching
+        :class:`Event`.
+    :param types: an optional set of event types to match.
+    :param predicate: an optional function called with each :class:`Event`
+        of matching types, returning whether it should be handled.
+    :param handle_cancel: an optional function called when the subscription
+        is removed from the hub.
+    :param handle_gap: an optional coroutine function called with a
+        :class:`asynclxd.api.websocket.Gap` when the websocket is connected
+        again after a disconnection.
+
+    """
+
+    __slots__ = (
+        "handle_event",
+        "types",
+        "predicate",
+        "handle_cancel",
+        "handle_gap",
+        "_hub",
+    )
+
+    def __init__(
+        self,
+        hub,
+        handle_event,
+        types=None,
+        predicate=None,
+        handle_cancel=None,
+        handle_gap=None,
+    ):
+        self.handle_event = handle_event
+        self.types = frozenset(types) if types else None
+        self.predicate = predicate
+        self.handle_cancel = handle_cancel
+        self.handle_gap = handle_gap
+        self._hub = hub
+
+    def __repr__(self):
+        types = sorted(self.types) if self.types else "all"
+        return f"{self.__class__.__name__}(types={types})"
+
+    @property
+    def active(self):
+        """Whether the subscription is active."""
+        return self in self._hub.subscriptions
+
+    def matches(self, event):
+        """Return whether an event matches the subscription."""
+        if self.types is not None and event.type not in self.types:
+            return False
+        return self.predicate is None or self.predicate(event)
+
+    def cancel(self):
+        """Cancel the subscription."""
+        self._hub.unsubscribe(self)
+
+
+class EventHub(Loggable):
+    """Dispatch events from a single websocket to multiple subscribers.
+
+    The websocket is connected when the first subscription is added, and
+    covers the union of event types for all subscriptions. Subscriptions can
+    be added and removed without reconnecting, unless a subscription needs
+    types not covered by the current connection, in which case the websocket
+    is connected again with the additional types. The websocket is closed when
+    no subscriptions are left.
+
+    If the websocket is closed while subscriptions are active, it's connected
+    again as configured by `reconnect`, and subscribers are notified of the
+    disconnection through their `handle_gap` callback, so that they can fetch
+    again data that might have changed meanwhile.
+
+    Errors raised by subscribers are logged, and don't affect other
+    subscribers.
+
+    :param remote: the :class:`asynclxd.remote.Remote` to get events from.
+    :param asynclxd.api.websocket.Backoff reconnect: the configuration for
+        reconnecting. By default, the websocket is reconnected with the
+        default :class:`asynclxd.api.websocket.Backoff`. If :data:`False`, it's
+        not reconnected.
+
+    """
+
+    def __init__(self, remote, reconnect=None):
+        self._remote = remote
+        if reconnect is None:
+            reconnect = Backoff()
+        self.reconnect = reconnect or None
+        self._subscriptions = []
+        self._task = None
+        # event types the websocket is connected for, None for all types
+        self._types = frozenset()
+
+    @property
+    def subscriptions(self):
+        """Return a tuple with active subscriptions."""
+        return tuple(self._subscriptions)
+
+    @property
+    def connected(self):
+        """Whether the websocket for events is connected."""
+        return self._task is not None
+
+    @property
+    def types(self):
+        """Return the set of types the websocket covers.
+
+        This is :data:`None` if all types are covered.
+
+        """
+        if self._task is None:
+            return frozenset()
+        return self._types
+
+    def subscribe(
+        self,
+        handle_event,
+        types=None,
+        predicate=None,
+        handle_cancel=None,
+        handle_gap=None,
+    ):
+        """Subscribe to events.
+
+        :param handle_event: a coroutine function called with each matching
+            :class:`Event`.
+        :param list types: optional event types to subscribe to. By default,
+            all types are matched.
+        :param predicate: an optional function called with each :class:`Event`
+            of matching types, returning whether it should be handled.
+        :param handle_cancel: an optional function called when the
+            subscription is removed.
+        :param handle_gap: an optional coroutine function called with a
+            :class:`asynclxd.api.websocket.Gap` when the websocket is
+            connected again after a disconnection.
+        :return: a :class:`Subscription`.
+
+        """
+        subscription = Subscription(
+            self,
+            handle_event,
+            types=types,
+            predicate=predicate,
+            handle_cancel=handle_cancel,
+            handle_gap=handle_gap,
+        )
+        self._subscriptions.append(subscription)
+        try:
+            self._update_connection()
+        except Exception:
+            self._subscriptions.remove(subscription)
+            raise
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove a subscription.
+
+        :param Subscription subscription: the subscription to remove.
+
+        """
+        if subscription not in self._subscriptions:
+            return
+        self._subscriptions.remove(subscription)
+        _cancelled(subscription)
+        if not self._subscriptions:
+            self._disconnect()
+
+    def stop(self):
+        """Remove all subscriptions and close the websocket."""
+        subscriptions = self._subscriptions[:]
+        self._subscriptions.clear()
+        self._disconnect()
+        for subscription in subscriptions:
+            _cancelled(subscription)
+
+    def _update_connection(self):
+        """Connect the websocket, if needed for the current subscriptions."""
+        types = _union_types(self._subscriptions)
+        if self._task is not None and _covers(self._types, types):
+            return
+        self._disconnect()
+        self._types = types
+        self._task = self._remote.events(
+            self._handle_event,
+            types=sorted(types) if types else None,
+            reconnect=self.reconnect,
+            handle_gap=self._handle_gap,
+        )
+        self._task.add_done_callback(self._disconnected)
+
+    def _disconnect(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.remove_done_callback(self._disconnected)
+            task.cancel()
+
+    def _disconnected(self, task):
+        self._task = None
+
+    async def _handle_event(self, event):
+        # subscriptions might change while handling events
+        for subscription in tuple(self._subscriptions):
+            if subscription not in self._subscriptions:
+                continue
+            try:
+                if subscription.matches(event):
+                    await subscription.handle_event(event)
+            except Exception:
+                self.logger.exception(f"Error handling event for {subscription}")
+
+    async def _handle_gap(self, gap):
+        for subscription in tuple(self._subscriptions):
+            if subscription.handle_gap is None:
+                continue
+            try:
+                await subscription.handle_gap(gap)
+            except Exception:
+                self.logger.exception(f"Error handling gap for {subscription}")
+
+
+class OverflowPolicy(Enum):
+    """What to do when an :class:`EventStream` buffer is full."""
+
+    #: Wait for space in the buffer. This delays dispatching events to other
+    #: subscribers of the :class:`EventHub`.
+    BLOCK = "block"
+    #: Discard the oldest event in the buffer.
+    DROP_OLDEST = "drop-oldest"
+    #: Discard the new event.
+    DROP_NEWEST = "drop-newest"
+
+
+class EventStreamStats(NamedTuple):
+    """Statistics about an :class:`EventStream`."""
+
+    #: Number of events added to the buffer.
+    queued: int
+    #: Number of events discarded because the buffer was full.
+    dropped: int
+    #: Number of events currently in the buffer.
+    pending: int
+
+
+class EventStream:
+    """An asynchronous iterator of events, with a bounded buffer.
+
+    Events are buffered as they're received, and consumed by iterating over
+    the stream, so that slow consumers don't delay reading from the websocket.
+    When the buffer is full, events are handled according to the overflow
+    policy.
+
+    The stream subscribes to events when created, and it must be closed by
+    calling :func:`close` or using it as an asynchronous context manager:
+
+    .. code:: python
+
+       async with remote.events.stream(types=["lifecycle"]) as stream:
+           async for event in stream:
+               ...
+
+    Iteration ends when the stream is closed, or its subscription removed.
+    Events still in the buffer at that point are discarded.
+
+    :param EventHub hub: the hub to subscribe to.
+    :param list types: optional event types to subscribe to.
+    :param predicate: an optional function called with each :class:`Event`
+        of matching types, returning whether it should be handled.
+    :param int maxsize: the maximum number of events in the buffer.
+    :param OverflowPolicy overflow: the policy for events received when the
+        buffer is full. By default, :data:`OverflowPolicy.BLOCK` is used.
+
+    """
+
+    def __init__(self, hub, types=None, predicate=None, maxsize=1000, overflow=None):
+        if maxsize < 1:
+            raise ValueError("Buffer size must be at least 1")
+        self.maxsize = maxsize
+        self.overflow = overflow or OverflowPolicy.BLOCK
+        self._events = deque()
+        self._not_empty = AsyncEvent()
+        self._not_full = AsyncEvent()
+        self._queued = 0
+        self._dropped = 0
+        self._closed = False
+        self._subscription = hub.subscribe(
+            self._handle_event,
+            types=types,
+            predicate=predicate,
+            handle_cancel=self._cancelled,
+        )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._events:
+            if self._closed:
+                raise StopAsyncIteration()
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        event = self._events.popleft()
+        self._not_full.set()
+        return event
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def closed(self):
+        """Whether the stream is closed."""
+        return self._closed
+
+    def stats(self):
+        """Return :class:`EventStreamStats` for the stream."""
+        return EventStreamStats(
+            queued=self._queued, dropped=self._dropped, pending=len(self._events)
         )
 
+    def close(self):
+        """Close the stream, removing its subscription."""
+        if not self._closed:
+            self._subscription.cancel()
+
+    def _cancelled(self):
+        self._closed = True
+        self._events.clear()
+        # wake up waiting consumer and producer
+        self._not_empty.set()
+        self._not_full.set()
+
+    async def _handle_event(self, event):
+        if len(self._events) >= self.maxsize:
+            if self.overflow is OverflowPolicy.DROP_NEWEST:
+                self._dropped += 1
+                return
+            if self.overflow is OverflowPolicy.DROP_OLDEST:
+                self._events.popleft()
+                self._dropped += 1
+            else:
+                while len(self._events) >= self.maxsize:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+                if self._closed:
+                    return
+        self._events.append(event)
+        self._queued += 1
+        self._not_empty.set()
+
 
 class EventHandler(WebsocketHandler):
     """Handle messages from the events websocket.
 
     the `handle_event` handler is called with an :class:`Event` instance.
 
+    By default, events are handled one at a time, as they're received. If
+    `concurrency` is specified, up to that number of events are handled
+    concurrently through a :class:`asynclxd.api.websocket.KeyedDispatcher`,
+    with events having the same key being handled in order. The key is
+    returned by the `key` function, :func:`event_key` by default.
+
+    If specified, `handle_gap` is called with a
+    :class:`asynclxd.api.websocket.Gap` when the websocket is connected again.
+
     """
 
-    def __init__(self, handle_event):
+    def __init__(
+        self,
+        handle_event,
+        handle_connect=None,
+        concurrency=None,
+        key=None,
+        handle_gap=None,
+    ):
         self.handle_event = handle_event
+        self._handle_connect = handle_connect
+        self._handle_gap = handle_gap
+        self.dispatcher = None
+        if concurrency is not None:
+            self.dispatcher = KeyedDispatcher(
+                handle_event, key or event_key, concurrency=concurrency
+            )
+
+    async def handle_connect(self):
+        if self._handle_connect is not None:
+            await self._handle_connect()
+
+    async def handle_gap(self, gap):
+        if self._handle_gap is not None:
+            await self._handle_gap(gap)
 
     async def handle_message(self, message):
-        await self.handle_event(Event(**message))
+        event = Event(**message)
+        if self.dispatcher is None:
+            await self.handle_event(event)
+        else:
+            await self.dispatcher.dispatch(event)
+
+
+def event_key(event):
+    """Return the key for ordering handling of an event.
+
+    This is the event source (such as the URI of the container an event is
+    about) or, if not available, the server location.
+
+    """
+    metadata = event.metadata or {}
+    return metadata.get("source") or metadata.get("location")
+
+
+def _union_types(subscriptions):
+    """Return the union of types for subscriptions, None if all types."""
+    types = set()
+    for subscription in subscriptions:
+        if subscription.types is None:
+            return None
+        types.update(subscription.types)
+    return frozenset(types)
+
+
+def _covers(types, other):
+    """Return whether a set of types covers another one."""
+    if types is None:
+        return True
+    return other is not None and other <= types
+
+
+def _cancelled(subscription):
+    """Notify a subscription that it's been removed."""
+    if subscription.handle_cancel is not None:
+        subscription.handle_cancel()
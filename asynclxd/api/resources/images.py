@@ -16,6 +16,8 @@ def _related_image(remote, fingerprint):
 class ImageAlias(NamedResource):
     """API resource for image aliases."""
 
+    __slots__ = ()
+
     related_resources = frozenset([(("target",), _related_image)])
 
 
@@ -33,6 +35,8 @@ def _related_alias(remote, details):
 class Image(Resource):
     """API resouce for images."""
 
+    __slots__ = ()
+
     id_attribute = "fingerprint"
 
     related_resources = frozenset([(("aliases",), _related_alias)])
@@ -9,6 +9,8 @@ from ..resource import (
 class Network(NamedResource):
     """API resource for networks."""
 
+    __slots__ = ()
+
 
 class Networks(ResourceCollection):
     """Networks collection API methods."""
@@ -1,7 +1,18 @@
 """API resources for asynchronous operations."""
 
+from asyncio import (
+    Event,
+    get_event_loop,
+    shield,
+    sleep,
+    TimeoutError,
+    wait_for,
+)
+from collections import OrderedDict
 from itertools import chain
+from time import monotonic
 
+from ..bulk import run_bulk
 from ..resource import (
     Resource,
     ResourceCollection,
@@ -9,10 +20,31 @@ from ..resource import (
 from .containers import Container
 from .images import Image
 
+# operations status codes from this one are final
+_FINAL_STATUS_CODE = 200
+
+
+class OperationError(Exception):
+    """A background operation failed.
+
+    :param str uri: the URI of the operation.
+    :param int code: the operation status code.
+    :param str message: the operation error message.
+
+    """
+
+    def __init__(self, uri, code, message):
+        self.uri = uri
+        self.code = code
+        self.message = message
+        super().__init__(f"Operation {uri} failed with {code}: {message}")
+
 
 class Operation(Resource):
     """API resouce for operations."""
 
+    __slots__ = ()
+
     id_attribute = "id"
 
     related_resources = frozenset(
@@ -23,18 +55,314 @@ class Operation(Resource):
         ]
     )
 
+    def __await__(self):
+        """Wait for the operation to complete, returning the operation.
+
+        This is the same as calling :func:`complete`.
+
+        """
+        yield from self.complete().__await__()
+        return self
+
     async def wait(self, timeout=None):
         params = {"timeout": timeout} if timeout else None
         response = await self._remote.request("GET", self._uri("wait"), params=params)
         self._process_response(response)
         return response
 
+    async def complete(self, timeout=None):
+        """Wait for the operation to complete.
+
+        If the remote has an :class:`OperationWatcher`, it's used to wait for
+        the operation, otherwise :func:`wait` is called.
+
+        :raises OperationError: if the operation failed or was cancelled.
+
+        """
+        watcher = self._remote.operation_watcher
+        if watcher is None:
+            await self.wait(timeout=timeout)
+        else:
+            await watcher.wait(self, timeout=timeout)
+        status_code = self["status_code"]
+        if status_code >= 400:
+            raise OperationError(self.uri, status_code, self["err"])
+
+    def progress(self, interval=1.0):
+        """Asynchronously iterate over progress updates for the operation.
+
+        This yields the operation :data:`metadata` (such as download
+        progress) when it changes, at most once every `interval` seconds, with
+        intermediate updates being skipped. Iteration ends when the operation
+        completes.
+
+        If the remote has an :class:`OperationWatcher`, updates are received
+        through events, otherwise :func:`wait` is called periodically.
+
+        :param float interval: the minimum interval between updates.
+
+        """
+        watcher = self._remote.operation_watcher
+        if watcher is None:
+            return self._poll_progress(interval)
+        return watcher.progress(self, interval=interval)
+
+    async def _poll_progress(self, interval):
+        """Yield progress updates by waiting on the operation with a timeout."""
+        # the API timeout is in seconds
+        timeout = max(1, round(interval))
+        while True:
+            await self.wait(timeout=timeout)
+            yield _progress_metadata(self)
+            if _is_final(self.details()):
+                return
+
 
 class Operations(ResourceCollection):
     """Operations collection API methods."""
 
     resource_class = Operation
 
+    # operations are grouped by status
+    stream_depth = 2
+
     def _process_content(self, content):
         # Operations listing returns a dict keyed by operation status.
         return list(chain(*content.values()))
+
+
+class OperationWatcher:
+    """Wait for completion of background operations through events.
+
+    A single websocket subscribed to :data:`operation` events is used to track
+    completion of all operations, instead of a :data:`wait` request for each.
+
+    The subscription is started when the first operation is watched. If the
+    websocket is disconnected, pending operations are waited for through
+    :func:`Operation.wait`, and a new subscription is started for operations
+    watched after that. Iteration over progress updates ends on disconnection.
+
+    :param asynclxd.remote.Remote remote: the remote to watch operations for.
+    :param int recent_size: number of recently completed operations to keep
+        track of, in case they complete before they're watched.
+
+    """
+
+    def __init__(self, remote, recent_size=1024):
+        self._remote = remote
+        self._recent_size = recent_size
+        self._task = None
+        # map operation IDs to a tuple with the operation and its future
+        self._pending = {}
+        # map IDs of recently completed operations to their details
+        self._recent = OrderedDict()
+        self._fallbacks = set()
+        # map operation IDs to sets of progress listeners
+        self._listeners = {}
+
+    @property
+    def pending(self):
+        """Return the number of operations being waited for."""
+        return len(self._pending)
+
+    async def wait(self, operation, timeout=None):
+        """Wait for an operation to complete.
+
+        Operation details are updated when it completes. If the timeout
+        expires, this returns without waiting further.
+
+        :param Operation operation: the operation to wait for.
+        :param float timeout: maximum seconds to wait for.
+
+        """
+        details = self._recent.get(operation.id)
+        if details is not None:
+            operation.update_details(details)
+        if _is_final(operation.details()):
+            return
+
+        self._ensure_subscribed()
+        entry = self._pending.get(operation.id)
+        if entry is None:
+            entry = self._pending[operation.id] = (
+                operation,
+                get_event_loop().create_future(),
+            )
+        try:
+            # a caller timing out must not cancel waiting for others
+            await wait_for(shield(entry[1]), timeout)
+        except TimeoutError:
+            pass
+
+    async def progress(self, operation, interval=1.0):
+        """Asynchronously iterate over progress updates for an operation.
+
+        See :func:`Operation.progress` for details.
+
+        """
+        if _is_final(operation.details()):
+            yield _progress_metadata(operation)
+            return
+
+        self._ensure_subscribed()
+        listener = _ProgressListener(operation)
+        listeners = self._listeners.setdefault(operation.id, set())
+        listeners.add(listener)
+        try:
+            last_update = None
+            while True:
+                await listener.updated.wait()
+                if listener.closed:
+                    return
+                if last_update is not None:
+                    # skip intermediate updates until the interval passed
+                    await sleep(last_update + interval - monotonic())
+                listener.updated.clear()
+                yield _progress_metadata(operation)
+                last_update = monotonic()
+                if _is_final(operation.details()):
+                    return
+        finally:
+            listeners.discard(listener)
+            if not listeners and self._listeners.get(operation.id) is listeners:
+                del self._listeners[operation.id]
+
+    def stop(self):
+        """Stop watching operations.
+
+        Pending calls to :func:`wait` are cancelled, and iterations over
+        progress updates end.
+
+        """
+        task, self._task = self._task, None
+        if task is not None:
+            task.remove_done_callback(self._disconnected)
+            task.cancel()
+        for task in self._fallbacks:
+            task.cancel()
+        for _, future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._close_listeners()
+
+    def _ensure_subscribed(self):
+        """Subscribe to operation events, if not subscribed yet."""
+        if self._task is not None:
+            return
+        self._task = self._remote.events(
+            self._handle_event,
+            types=["operation"],
+            handle_connect=self._handle_connect,
+        )
+        self._task.add_done_callback(self._disconnected)
+
+    async def _handle_connect(self):
+        """Refresh pending operations when the websocket is connected.
+
+        Operations could have completed before the subscription was active.
+
+        """
+
+        async def refresh(operation):
+            await operation.read()
+            self._notify_listeners(operation.id)
+            if _is_final(operation.details()):
+                self._resolve(operation.id)
+
+        operations = {
+            operation.id: operation for operation, _ in self._pending.values()
+        }
+        for operation_id, listeners in self._listeners.items():
+            for listener in listeners:
+                operations.setdefault(operation_id, listener.operation)
+        results = await run_bulk(refresh, list(operations.values()))
+        for result in results:
+            if not result.ok:
+                self._resolve(result.item.id, error=result.error)
+
+    async def _handle_event(self, event):
+        details = event.metadata
+        operation_id = details["id"]
+        final = _is_final(details)
+        if final:
+            self._recent[operation_id] = details
+            while len(self._recent) > self._recent_size:
+                self._recent.popitem(last=False)
+
+        operations = [
+            listener.operation for listener in self._listeners.get(operation_id, ())
+        ]
+        entry = self._pending.get(operation_id)
+        if entry is not None:
+            operations.append(entry[0])
+        for operation in operations:
+            operation.update_details(details)
+        self._notify_listeners(operation_id)
+        if final:
+            self._resolve(operation_id)
+
+    def _notify_listeners(self, operation_id):
+        """Notify progress listeners of an update for an operation."""
+        for listener in self._listeners.get(operation_id, ()):
+            listener.updated.set()
+
+    def _close_listeners(self):
+        """End iteration of all progress listeners."""
+        for listeners in self._listeners.values():
+            for listener in listeners:
+                listener.closed = True
+                listener.updated.set()
+
+    def _disconnected(self, task):
+        """Wait for pending operations through requests."""
+        self._task = None
+        self._close_listeners()
+        for operation, _ in self._pending.values():
+            fallback = get_event_loop().create_task(self._fallback_wait(operation))
+            self._fallbacks.add(fallback)
+            fallback.add_done_callback(self._fallbacks.discard)
+
+    async def _fallback_wait(self, operation):
+        try:
+            await operation.wait()
+        except Exception as error:
+            self._resolve(operation.id, error=error)
+        else:
+            self._resolve(operation.id)
+
+    def _resolve(self, operation_id, error=None):
+        """Mark an operation as completed."""
+        entry = self._pending.pop(operation_id, None)
+        if entry is None:
+            return
+        future = entry[1]
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+
+class _ProgressListener:
+    """Track progress updates for an operation."""
+
+    __slots__ = ("operation", "updated", "closed")
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.updated = Event()
+        self.closed = False
+
+
+def _progress_metadata(operation):
+    """Return progress metadata for an operation."""
+    details = operation.details()
+    if not details:
+        return None
+    return details.get("metadata")
+
+
+def _is_final(details):
+    """Return whether operation details have a final status."""
+    return bool(details) and details.get("status_code", 0) >= _FINAL_STATUS_CODE
@@ -10,6 +10,8 @@ from .containers import Container
 class Profile(NamedResource):
     """API resource for profiles."""
 
+    __slots__ = ()
+
     related_resources = frozenset([(("used_by",), Container)])
 
 
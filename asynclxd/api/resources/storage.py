@@ -18,6 +18,8 @@ def _related_used_by(remote, entry):
 class StoragePool(NamedResource):
     """API resources for storage pools"""
 
+    __slots__ = ()
+
     related_resources = frozenset([(("used_by",), _related_used_by)])
 
     async def resources(self):
@@ -1,11 +1,33 @@
 import pytest
 
+from ...http import Response
 from ...testing import FakeRemote
 from ..containers import (
     Container,
+    Containers,
     Logfile,
     Snapshot,
 )
+from ..operations import (
+    Operation,
+    OperationError,
+)
+
+
+def make_async_response(remote, uri):
+    """Return a response for a background operation."""
+    return Response(
+        remote,
+        202,
+        {"Location": uri},
+        {"type": "async", "metadata": {"id": uri.split("/")[-1]}},
+    )
+
+
+def make_operation_status(code=200, err=""):
+    """Return details for a completed operation."""
+    status = "Success" if code == 200 else "Failure"
+    return {"status": status, "status_code": code, "err": err}
 
 
 @pytest.mark.asyncio
@@ -30,6 +52,167 @@ class TestContainer:
             (("GET", "/containers/c/snapshots", None, None, None, None))
         ]
 
+    async def test_state(self):
+        """The state() method returns the container state."""
+        remote = FakeRemote(responses=[{"status": "Running"}])
+        container = Container(remote, "/containers/c")
+        assert await container.state() == {"status": "Running"}
+        assert remote.calls == [("GET", "/containers/c/state", None, None, None, None)]
+
+    async def test_change_state(self):
+        """The change_state() method returns the operation."""
+        remote = FakeRemote()
+        remote.responses.append(make_async_response(remote, "/operations/op"))
+        container = Container(remote, "/containers/c")
+        operation = await container.change_state("start")
+        assert isinstance(operation, Operation)
+        assert operation.uri == "/operations/op"
+        content = {"action": "start", "force": False, "stateful": False}
+        assert remote.calls == [
+            ("PUT", "/containers/c/state", None, None, content, None)
+        ]
+
+    async def test_change_state_options(self):
+        """Options can be passed for the state change."""
+        remote = FakeRemote()
+        remote.responses.append(make_async_response(remote, "/operations/op"))
+        container = Container(remote, "/containers/c")
+        await container.change_state("stop", timeout=30, force=True, stateful=True)
+        content = {"action": "stop", "force": True, "stateful": True, "timeout": 30}
+        assert remote.calls == [
+            ("PUT", "/containers/c/state", None, None, content, None)
+        ]
+
+
+@pytest.mark.asyncio
+class TestContainers:
+    async def test_update_many(self):
+        """Multiple containers can be updated."""
+        remote = FakeRemote(responses=[{}, {}])
+        containers = Containers(remote, "/containers")
+        details = {"c1": {"description": "one"}, "c2": {"description": "two"}}
+        report = await containers.update_many(details, concurrency=1)
+        assert [result.item for result in report.succeeded] == ["c1", "c2"]
+        assert remote.calls == [
+            ("PATCH", "/containers/c1", None, None, {"description": "one"}, None),
+            ("PATCH", "/containers/c2", None, None, {"description": "two"}, None),
+        ]
+
+    async def test_update_many_etag(self):
+        """ETags from the last read are used for updates."""
+        remote = FakeRemote(responses=[{}])
+        containers = Containers(remote, "/containers")
+        container = containers.get_resource("c1")
+        container._last_etag = "abc"
+        await containers.update_many({"c1": {}})
+        assert remote.calls[0][3] == {"If-Match": "abc"}
+
+    async def test_update_many_no_etag(self):
+        """ETags from the last read are not used if requested."""
+        remote = FakeRemote(responses=[{}])
+        containers = Containers(remote, "/containers")
+        container = containers.get_resource("c1")
+        container._last_etag = "abc"
+        await containers.update_many({"c1": {}}, etag=False)
+        assert remote.calls[0][3] is None
+
+    async def test_replace_many(self):
+        """Details for multiple containers can be replaced."""
+        remote = FakeRemote()
+        remote.responses.extend(
+            [
+                make_async_response(remote, "/operations/op1"),
+                make_operation_status(),
+            ]
+        )
+        containers = Containers(remote, "/containers")
+        report = await containers.replace_many({"c1": {"description": "one"}})
+        [result] = report.results
+        assert result.item == "c1"
+        assert result.result.uri == "/operations/op1"
+        assert result.result["status"] == "Success"
+        assert remote.calls == [
+            ("PUT", "/containers/c1", None, None, {"description": "one"}, None),
+            ("GET", "/operations/op1/wait", None, None, None, None),
+        ]
+
+    async def test_delete_many(self):
+        """Multiple containers can be deleted, waiting for operations."""
+        remote = FakeRemote()
+        remote.responses.extend(
+            [
+                make_async_response(remote, "/operations/op1"),
+                make_operation_status(),
+                make_async_response(remote, "/operations/op2"),
+                make_operation_status(code=400, err="Boom"),
+            ]
+        )
+        containers = Containers(remote, "/containers")
+        report = await containers.delete_many(["c1", "c2"], concurrency=1)
+        [succeeded] = report.succeeded
+        assert succeeded.item == "c1"
+        assert succeeded.result.uri == "/operations/op1"
+        [failed] = report.failed
+        assert failed.item == "c2"
+        assert isinstance(failed.error, OperationError)
+        assert failed.error.message == "Boom"
+
+    async def test_delete_many_no_wait(self):
+        """It's possible not to wait for operations."""
+        remote = FakeRemote()
+        remote.responses.append(make_async_response(remote, "/operations/op1"))
+        containers = Containers(remote, "/containers")
+        report = await containers.delete_many(["c1"], wait=False)
+        [result] = report.results
+        assert result.result.uri == "/operations/op1"
+        assert remote.calls == [("DELETE", "/containers/c1", None, None, None, None)]
+
+    async def test_delete_many_error(self):
+        """Errors from requests are captured."""
+        remote = FakeRemote()
+        containers = Containers(remote, "/containers")
+        # no response available
+        report = await containers.delete_many(["c1"])
+        [result] = report.failed
+        assert isinstance(result.error, IndexError)
+
+    async def test_change_state_many(self):
+        """The state of multiple containers can be changed."""
+        remote = FakeRemote()
+        remote.responses.extend(
+            [
+                make_async_response(remote, "/operations/op1"),
+                make_operation_status(),
+                make_async_response(remote, "/operations/op2"),
+                make_operation_status(),
+            ]
+        )
+        containers = Containers(remote, "/containers")
+        report = await containers.change_state_many(
+            ["c1", "c2"], "stop", timeout=10, force=True, concurrency=1
+        )
+        assert [result.result.uri for result in report.succeeded] == [
+            "/operations/op1",
+            "/operations/op2",
+        ]
+        content = {"action": "stop", "force": True, "stateful": False, "timeout": 10}
+        assert remote.calls == [
+            ("PUT", "/containers/c1/state", None, None, content, None),
+            ("GET", "/operations/op1/wait", None, None, None, None),
+            ("PUT", "/containers/c2/state", None, None, content, None),
+            ("GET", "/operations/op2/wait", None, None, None, None),
+        ]
+
+    async def test_change_state_many_no_wait(self):
+        """It's possible not to wait for state changes."""
+        remote = FakeRemote()
+        remote.responses.append(make_async_response(remote, "/operations/op1"))
+        containers = Containers(remote, "/containers")
+        report = await containers.change_state_many(["c1"], "start", wait=False)
+        [result] = report.succeeded
+        assert result.result.uri == "/operations/op1"
+        assert len(remote.calls) == 1
+
 
 class TestSnapshot:
     def test_id_from_details_strips_container_name(self):
@@ -1,15 +1,75 @@
+from asyncio import (
+    Event as AsyncEvent,
+    get_event_loop,
+    sleep,
+)
+from datetime import datetime
 from unittest import mock
 
 import iso8601
 import pytest
 
+from ...testing import average_allocation
+from ...websocket import (
+    Backoff,
+    Gap,
+)
 from ..events import (
     Event,
     EventHandler,
+    EventHub,
     Events,
+    EventStream,
+    EventStreamStats,
+    event_key,
+    OverflowPolicy,
+    Subscription,
 )
 
 
+class HubRemote:
+    """A fake remote tracking events subscriptions."""
+
+    def __init__(self):
+        self.subscriptions = []
+        self.disconnect = AsyncEvent()
+
+    def events(self, handle_event, types=None, reconnect=None, handle_gap=None):
+        self.subscriptions.append(types)
+        self.handle_event = handle_event
+        self.reconnect = reconnect
+        self.handle_gap = handle_gap
+        self.disconnect.clear()
+        return get_event_loop().create_task(self.disconnect.wait())
+
+    async def send(self, type="lifecycle", **metadata):
+        await self.handle_event(make_event(type=type, **metadata))
+
+
+def make_gap():
+    """Return a sample gap."""
+    return Gap(start=datetime(2020, 8, 20, 10), duration=5.0, attempts=2)
+
+
+def item_key(item):
+    return item.metadata["name"]
+
+
+def make_event(type="lifecycle", **metadata):
+    """Return an event with the specified type and metadata."""
+    return Event(type=type, timestamp="2020-08-20T10:00:00Z", metadata=metadata)
+
+
+class Recorder:
+    """Record handled events."""
+
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, event):
+        self.events.append(event)
+
+
 class TestEvent:
     def test_event_create(self):
         """An event is created from a set of details."""
@@ -24,6 +84,18 @@ class TestEvent:
         assert event.timestamp == iso8601.parse_date(timestamp)
         assert event.metadata == {"foo": "bar"}
 
+    def test_memory_size(self):
+        """Event instances are compact."""
+        metadata = {"foo": "bar"}
+        timestamp = "2018-07-06T10:09:08.00012356Z"
+
+        def make_event():
+            return Event(type="logging", timestamp=timestamp, metadata=metadata)
+
+        assert not hasattr(make_event(), "__dict__")
+        # includes the parsed timestamp
+        assert average_allocation(make_event) < 150
+
 
 class TestEvents:
     @pytest.mark.asyncio
@@ -39,11 +111,472 @@ class TestEvents:
 
         await Events(remote)(None, types=["logging", "operation"])
         assert calls == [
-            ((mock.ANY, "events"), {"params": {"type": "logging,operation"}})
+            (
+                (mock.ANY, "events"),
+                {"params": {"type": "logging,operation"}, "reconnect": None},
+            )
         ]
 
+    @pytest.mark.asyncio
+    async def test_call_handle_connect(self):
+        """A handler for connection can be passed."""
+        calls = []
+
+        async def websocket(handler, path, params=None, reconnect=None):
+            await handler.handle_connect()
+
+        async def handle_connect():
+            calls.append("connected")
+
+        remote = mock.Mock()
+        remote.websocket = websocket
+
+        await Events(remote)(None, handle_connect=handle_connect)
+        assert calls == ["connected"]
+
+    @pytest.mark.asyncio
+    async def test_call_concurrency(self):
+        """Events can be handled concurrently."""
+        handlers = []
+
+        async def websocket(handler, path, params=None, reconnect=None):
+            handlers.append(handler)
+
+        remote = mock.Mock()
+        remote.websocket = websocket
+
+        await Events(remote)(None, concurrency=5, key=item_key)
+        [handler] = handlers
+        assert handler.dispatcher.concurrency == 5
+        assert handler.dispatcher._key is item_key
+
+    @pytest.mark.asyncio
+    async def test_subscribe(self):
+        """Subscriptions are added to the remote event hub."""
+        remote = mock.Mock()
+        remote.event_hub = EventHub(HubRemote())
+        handle_gap = mock.Mock()
+        subscription = Events(remote).subscribe(
+            None, types=["lifecycle"], handle_gap=handle_gap
+        )
+        assert remote.event_hub.subscriptions == (subscription,)
+        assert subscription.handle_gap is handle_gap
+        remote.event_hub.stop()
+        await sleep(0)
+
+    @pytest.mark.asyncio
+    async def test_call_reconnect(self):
+        """The websocket can be reconnected, handling gaps."""
+        calls = []
+        gaps = []
+
+        async def websocket(handler, path, params=None, reconnect=None):
+            calls.append(reconnect)
+            await handler.handle_gap(make_gap())
+
+        async def handle_gap(gap):
+            gaps.append(gap)
+
+        remote = mock.Mock()
+        remote.websocket = websocket
+
+        backoff = Backoff(initial=1)
+        await Events(remote)(None, reconnect=backoff, handle_gap=handle_gap)
+        assert calls == [backoff]
+        assert gaps == [make_gap()]
+
+    @pytest.mark.asyncio
+    async def test_stream(self):
+        """Streams are subscribed to the remote event hub."""
+        remote = mock.Mock()
+        remote.event_hub = EventHub(HubRemote())
+        stream = Events(remote).stream(
+            types=["lifecycle"], maxsize=10, overflow=OverflowPolicy.DROP_NEWEST
+        )
+        assert isinstance(stream, EventStream)
+        assert stream.maxsize == 10
+        assert stream.overflow == OverflowPolicy.DROP_NEWEST
+        [subscription] = remote.event_hub.subscriptions
+        assert subscription.types == {"lifecycle"}
+        stream.close()
+        await sleep(0)
+
+
+class TestSubscription:
+    def test_matches_types(self):
+        """Events match if their type is in the subscription types."""
+        subscription = Subscription(None, None, types=["lifecycle"])
+        assert subscription.matches(make_event(type="lifecycle"))
+        assert not subscription.matches(make_event(type="logging"))
+
+    def test_matches_all_types(self):
+        """If no types are specified, all events match."""
+        subscription = Subscription(None, None)
+        assert subscription.types is None
+        assert subscription.matches(make_event(type="logging"))
+
+    def test_matches_predicate(self):
+        """Events match only if the predicate returns True."""
+        subscription = Subscription(
+            None, None, predicate=lambda event: event.metadata["name"] == "c1"
+        )
+        assert subscription.matches(make_event(name="c1"))
+        assert not subscription.matches(make_event(name="c2"))
+
+    def test_repr(self):
+        """The repr includes subscription types."""
+        assert repr(Subscription(None, None, types=["b", "a"])) == (
+            "Subscription(types=['a', 'b'])"
+        )
+        assert repr(Subscription(None, None)) == "Subscription(types=all)"
+
+
+@pytest.mark.asyncio
+class TestEventHub:
+    async def test_subscribe(self):
+        """A websocket is connected when subscribing."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        assert hub.reconnect == Backoff()
+        assert not hub.connected
+        assert hub.types == frozenset()
+        subscription = hub.subscribe(Recorder(), types=["lifecycle"])
+        assert subscription.active
+        assert hub.connected
+        assert hub.types == {"lifecycle"}
+        assert remote.subscriptions == [["lifecycle"]]
+        hub.stop()
+        await sleep(0)
+
+    async def test_reconnect(self):
+        """The websocket is reconnected as configured."""
+        remote = HubRemote()
+        backoff = Backoff(initial=2)
+        hub = EventHub(remote, reconnect=backoff)
+        hub.subscribe(Recorder())
+        assert remote.reconnect == backoff
+        hub.stop()
+        await sleep(0)
+
+    async def test_no_reconnect(self):
+        """Reconnecting can be disabled."""
+        remote = HubRemote()
+        hub = EventHub(remote, reconnect=False)
+        assert hub.reconnect is None
+        hub.subscribe(Recorder())
+        assert remote.reconnect is None
+        hub.stop()
+        await sleep(0)
+
+    async def test_gap(self):
+        """Subscribers are notified of gaps."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        gaps = []
+
+        async def handle_gap(gap):
+            gaps.append(gap)
+
+        async def fail(gap):
+            raise Exception("Boom")
+
+        hub.subscribe(Recorder(), handle_gap=fail)
+        hub.subscribe(Recorder())
+        hub.subscribe(Recorder(), handle_gap=handle_gap)
+        with mock.patch.object(hub, "logger") as logger:
+            await remote.handle_gap(make_gap())
+        logger.exception.assert_called_once()
+        assert gaps == [make_gap()]
+        hub.stop()
+        await sleep(0)
+
+    async def test_fan_out(self):
+        """Events are dispatched to matching subscribers."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        lifecycle, logging, c1 = Recorder(), Recorder(), Recorder()
+        hub.subscribe(lifecycle, types=["lifecycle"])
+        hub.subscribe(logging, types=["logging"])
+        hub.subscribe(
+            c1,
+            types=["lifecycle", "logging"],
+            predicate=lambda event: event.metadata.get("name") == "c1",
+        )
+        await remote.send(type="lifecycle", name="c1")
+        await remote.send(type="logging", name="c2")
+        assert [event.metadata for event in lifecycle.events] == [{"name": "c1"}]
+        assert [event.metadata for event in logging.events] == [{"name": "c2"}]
+        assert [event.metadata for event in c1.events] == [{"name": "c1"}]
+        hub.stop()
+        await sleep(0)
+
+    async def test_covered_types_no_reconnect(self):
+        """Subscriptions for covered types share the existing websocket."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        hub.subscribe(Recorder(), types=["lifecycle", "logging"])
+        hub.subscribe(Recorder(), types=["logging"])
+        assert remote.subscriptions == [["lifecycle", "logging"]]
+        hub.stop()
+        await sleep(0)
+
+    async def test_all_types(self):
+        """A subscription for all types connects without a types filter."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        hub.subscribe(Recorder(), types=["lifecycle"])
+        hub.subscribe(Recorder())
+        hub.subscribe(Recorder(), types=["logging"])
+        assert remote.subscriptions == [["lifecycle"], None]
+        assert hub.types is None
+        hub.stop()
+        await sleep(0)
+
+    async def test_new_types_reconnect(self):
+        """Subscriptions for uncovered types widen the websocket types."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        recorder = Recorder()
+        hub.subscribe(recorder, types=["lifecycle"])
+        first_task = hub._task
+        hub.subscribe(Recorder(), types=["logging"])
+        await sleep(0)
+        assert first_task.cancelled()
+        assert remote.subscriptions == [["lifecycle"], ["lifecycle", "logging"]]
+        # existing subscriptions are still dispatched to
+        await remote.send(type="lifecycle")
+        assert len(recorder.events) == 1
+        hub.stop()
+        await sleep(0)
+
+    async def test_unsubscribe(self):
+        """Removing a subscription doesn't reconnect."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        recorder = Recorder()
+        subscription = hub.subscribe(recorder, types=["lifecycle"])
+        other = hub.subscribe(Recorder(), types=["lifecycle"])
+        subscription.cancel()
+        assert not subscription.active
+        assert hub.subscriptions == (other,)
+        assert hub.connected
+        await remote.send()
+        assert recorder.events == []
+        assert remote.subscriptions == [["lifecycle"]]
+        # removing again is a no-op
+        hub.unsubscribe(subscription)
+        hub.stop()
+        await sleep(0)
+
+    async def test_unsubscribe_last(self):
+        """The websocket is closed when the last subscription is removed."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        subscription = hub.subscribe(Recorder())
+        task = hub._task
+        subscription.cancel()
+        await sleep(0)
+        assert task.cancelled()
+        assert not hub.connected
+        assert hub.types == frozenset()
+
+    async def test_unsubscribe_while_handling(self):
+        """Subscriptions removed while handling an event are skipped."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        recorder = Recorder()
+
+        async def cancel_other(event):
+            other.cancel()
+
+        hub.subscribe(cancel_other)
+        other = hub.subscribe(recorder)
+        await remote.send()
+        assert recorder.events == []
+        hub.stop()
+        await sleep(0)
+
+    async def test_handler_error(self):
+        """Errors from a subscriber are logged and don't affect others."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        recorder = Recorder()
+
+        async def fail(event):
+            raise Exception("Boom")
+
+        hub.subscribe(fail)
+        hub.subscribe(recorder)
+        with mock.patch.object(hub, "logger") as logger:
+            await remote.send()
+        logger.exception.assert_called_once()
+        assert len(recorder.events) == 1
+        hub.stop()
+        await sleep(0)
+
+    async def test_subscribe_error(self):
+        """If connecting fails, the subscription is not added."""
+        remote = mock.Mock()
+        remote.events.side_effect = Exception("Not in a session")
+        hub = EventHub(remote)
+        with pytest.raises(Exception):
+            hub.subscribe(Recorder())
+        assert hub.subscriptions == ()
+
+    async def test_disconnected_reconnect_on_subscribe(self):
+        """If the websocket disconnects, a new subscription reconnects."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        hub.subscribe(Recorder(), types=["lifecycle"])
+        remote.disconnect.set()
+        await sleep(0.01)
+        assert not hub.connected
+        hub.subscribe(Recorder(), types=["lifecycle"])
+        assert hub.connected
+        assert remote.subscriptions == [["lifecycle"], ["lifecycle"]]
+        hub.stop()
+        await sleep(0)
+
+
+@pytest.mark.asyncio
+class TestEventStream:
+    async def test_iterate(self):
+        """Events are yielded in order as they're received."""
+        remote = HubRemote()
+        hub = EventHub(remote)
+        async with EventStream(hub, types=["lifecycle"]) as stream:
+            await remote.send(name="c1")
+            await remote.send(type="logging", name="c2")
+            await remote.send(name="c3")
+            assert await stream.__anext__() == make_event(name="c1")
+            assert await stream.__anext__() == make_event(name="c3")
+            assert stream.stats() == EventStreamStats(queued=2, dropped=0, pending=0)
+        assert stream.closed
+        assert hub.subscriptions == ()
+        await sleep(0)
+
+    async def test_wait_for_events(self):
+        """Iteration waits for events to be received."""
+        remote = HubRemote()
+        stream = EventStream(EventHub(remote))
+        task = get_event_loop().create_task(stream.__anext__())
+        await sleep(0)
+        assert not task.done()
+        await remote.send(name="c1")
+        assert await task == make_event(name="c1")
+        stream.close()
+        await sleep(0)
+
+    async def test_close_ends_iteration(self):
+        """Closing the stream ends iteration, discarding pending events."""
+        remote = HubRemote()
+        stream = EventStream(EventHub(remote))
+        events = []
+
+        async def consume():
+            async for event in stream:
+                events.append(event)
+
+        task = get_event_loop().create_task(consume())
+        await remote.send(name="c1")
+        await sleep(0)
+        await remote.send(name="c2")
+        stream.close()
+        await task
+        assert events == [make_event(name="c1")]
+        assert stream.stats().pending == 0
+        # closing again is a no-op
+        stream.close()
+
+    async def test_hub_stopped(self):
+        """The stream is closed when the hub is stopped."""
+        hub = EventHub(HubRemote())
+        stream = EventStream(hub)
+        hub.stop()
+        assert stream.closed
+        assert [event async for event in stream] == []
+
+    async def test_drop_newest(self):
+        """With DROP_NEWEST, new events are discarded if the buffer is full."""
+        remote = HubRemote()
+        stream = EventStream(
+            EventHub(remote), maxsize=2, overflow=OverflowPolicy.DROP_NEWEST
+        )
+        for name in ("c1", "c2", "c3"):
+            await remote.send(name=name)
+        assert stream.stats() == EventStreamStats(queued=2, dropped=1, pending=2)
+        assert await stream.__anext__() == make_event(name="c1")
+        assert await stream.__anext__() == make_event(name="c2")
+        stream.close()
+        await sleep(0)
+
+    async def test_drop_oldest(self):
+        """With DROP_OLDEST, old events are discarded if the buffer is full."""
+        remote = HubRemote()
+        stream = EventStream(
+            EventHub(remote), maxsize=2, overflow=OverflowPolicy.DROP_OLDEST
+        )
+        for name in ("c1", "c2", "c3"):
+            await remote.send(name=name)
+        assert stream.stats() == EventStreamStats(queued=3, dropped=1, pending=2)
+        assert await stream.__anext__() == make_event(name="c2")
+        assert await stream.__anext__() == make_event(name="c3")
+        stream.close()
+        await sleep(0)
+
+    async def test_block(self):
+        """By default, the producer waits for space in the buffer."""
+        remote = HubRemote()
+        stream = EventStream(EventHub(remote), maxsize=1)
+        assert stream.overflow == OverflowPolicy.BLOCK
+        await remote.send(name="c1")
+        task = get_event_loop().create_task(remote.send(name="c2"))
+        await sleep(0)
+        assert not task.done()
+        assert await stream.__anext__() == make_event(name="c1")
+        await task
+        assert await stream.__anext__() == make_event(name="c2")
+        assert stream.stats() == EventStreamStats(queued=2, dropped=0, pending=0)
+        stream.close()
+        await sleep(0)
+
+    async def test_block_closed(self):
+        """A blocked producer is released when the stream is closed."""
+        remote = HubRemote()
+        stream = EventStream(EventHub(remote), maxsize=1)
+        await remote.send(name="c1")
+        task = get_event_loop().create_task(remote.send(name="c2"))
+        await sleep(0)
+        stream.close()
+        await task
+        assert stream.stats() == EventStreamStats(queued=1, dropped=0, pending=0)
+
+    async def test_invalid_maxsize(self):
+        """The buffer size must be positive."""
+        with pytest.raises(ValueError) as error:
+            EventStream(EventHub(HubRemote()), maxsize=0)
+        assert str(error.value) == "Buffer size must be at least 1"
+
 
 class TestEventHandler:
+    @pytest.mark.asyncio
+    async def test_handle_connect_default(self):
+        """By default, nothing is done on connection."""
+        handler = EventHandler(None)
+        await handler.handle_connect()
+
+    @pytest.mark.asyncio
+    async def test_handle_gap(self):
+        """Gaps are passed to the specified handler."""
+        gaps = []
+
+        async def handle_gap(gap):
+            gaps.append(gap)
+
+        await EventHandler(None).handle_gap(make_gap())
+        await EventHandler(None, handle_gap=handle_gap).handle_gap(make_gap())
+        assert gaps == [make_gap()]
+
     @pytest.mark.asyncio
     async def test_handle_message(self):
         """The handler handles messages and returns events."""
@@ -66,3 +599,52 @@ class TestEventHandler:
                 metadata={"some": "data"},
             )
         ]
+
+    @pytest.mark.asyncio
+    async def test_handle_message_concurrency(self):
+        """Events are dispatched concurrently if concurrency is specified."""
+        events = []
+        release = AsyncEvent()
+
+        async def handle_event(event):
+            await release.wait()
+            events.append((event.metadata["source"], event.metadata["action"]))
+
+        handler = EventHandler(handle_event, concurrency=2)
+        assert handler.dispatcher._key is event_key
+        for source, action in (("c1", "start"), ("c2", "start"), ("c1", "stop")):
+            await handler.handle_message(
+                {
+                    "timestamp": "2015-06-09T19:07:24.379615253-06:00",
+                    "type": "lifecycle",
+                    "metadata": {"source": source, "action": action},
+                }
+            )
+        # the handler doesn't wait for events to be handled
+        assert events == []
+        assert handler.dispatcher.running == 2
+        release.set()
+        await handler.dispatcher.join()
+        # events for the same source are handled in order
+        assert [event for event in events if event[0] == "c1"] == [
+            ("c1", "start"),
+            ("c1", "stop"),
+        ]
+        assert len(events) == 3
+
+
+class TestEventKey:
+    def test_source(self):
+        """The event source is used as key."""
+        event = make_event(source="/1.0/instances/c1", location="node1")
+        assert event_key(event) == "/1.0/instances/c1"
+
+    def test_location(self):
+        """If no source is available, the location is used as key."""
+        assert event_key(make_event(location="node1")) == "node1"
+
+    def test_no_key(self):
+        """If no source or location are available, None is returned."""
+        assert event_key(make_event(message="foo")) is None
+        event = Event(type="lifecycle", timestamp="2020-08-20T10:00:00Z", metadata=None)
+        assert event_key(event) is None
@@ -1,14 +1,85 @@
+from asyncio import (
+    CancelledError,
+    Event as AsyncEvent,
+    get_event_loop,
+    sleep,
+)
+
 import pytest
 
 from ...testing import FakeRemote
 from ..containers import Container
+from ..events import Event
 from ..images import Image
 from ..operations import (
     Operation,
+    OperationError,
     Operations,
+    OperationWatcher,
 )
 
 
+class EventsRemote(FakeRemote):
+    """A FakeRemote with a controllable events subscription."""
+
+    instances = []
+
+    def __init__(self, responses=None):
+        super().__init__(responses=responses)
+        self.subscriptions = []
+        self.disconnect = AsyncEvent()
+        self.wait_allowed = AsyncEvent()
+        self.wait_allowed.set()
+        self.operation_watcher = OperationWatcher(self)
+        self.instances.append(self)
+
+    async def request(self, method, path, *args, **kwargs):
+        if path.endswith("/wait"):
+            await self.wait_allowed.wait()
+        return await super().request(method, path, *args, **kwargs)
+
+    def events(self, handle_event, types=None, handle_connect=None):
+        self.subscriptions.append(types)
+        self.handle_event = handle_event
+        self.handle_connect = handle_connect
+        self.disconnect.clear()
+        return get_event_loop().create_task(self.disconnect.wait())
+
+    async def send(self, **metadata):
+        event = Event(
+            type="operation",
+            timestamp="2020-08-20T10:00:00Z",
+            metadata=metadata,
+        )
+        await self.handle_event(event)
+
+
+@pytest.fixture(autouse=True)
+def stop_watchers():
+    yield
+    for remote in EventsRemote.instances:
+        remote.operation_watcher.stop()
+    EventsRemote.instances.clear()
+
+
+def make_status(id, code=200, err="", metadata=None):
+    """Return details for an operation."""
+    statuses = {103: "Running", 200: "Success", 400: "Failure", 401: "Cancelled"}
+    return {
+        "id": id,
+        "status": statuses[code],
+        "status_code": code,
+        "err": err,
+        "metadata": metadata,
+    }
+
+
+async def collect(iterator, into):
+    """Append items from an async iterator to a list."""
+    async for item in iterator:
+        into.append(item)
+
+
 class TestOperation:
     def test_related_resources(self):
         """Related resources are returned as instances."""
@@ -49,6 +120,418 @@ class TestOperation:
             (("GET", "/operations/op/wait", {"timeout": 20}, None, None, None))
         ]
 
+    @pytest.mark.asyncio
+    async def test_complete(self):
+        """The complete() method waits for operation completion."""
+        status = {"id": "foo", "status": "Success", "status_code": 200, "err": ""}
+        remote = FakeRemote(responses=[status])
+        operation = Operation(remote, "/operations/op")
+        await operation.complete(timeout=10)
+        assert remote.calls == [
+            ("GET", "/operations/op/wait", {"timeout": 10}, None, None, None)
+        ]
+        assert operation.details() == status
+
+    @pytest.mark.asyncio
+    async def test_complete_failed(self):
+        """If the operation fails, an error is raised."""
+        status = {"id": "foo", "status": "Failure", "status_code": 400, "err": "Boom"}
+        remote = FakeRemote(responses=[status])
+        operation = Operation(remote, "/operations/op")
+        with pytest.raises(OperationError) as error:
+            await operation.complete()
+        assert error.value.uri == "/operations/op"
+        assert error.value.code == 400
+        assert error.value.message == "Boom"
+        assert str(error.value) == "Operation /operations/op failed with 400: Boom"
+
+    @pytest.mark.asyncio
+    async def test_complete_watcher(self):
+        """If the remote has an operation watcher, it's used."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        task = get_event_loop().create_task(operation.complete())
+        await sleep(0)
+        await remote.send(**make_status("op", code=400, err="Boom"))
+        with pytest.raises(OperationError) as error:
+            await task
+        assert error.value.message == "Boom"
+        assert remote.calls == []
+
+    @pytest.mark.asyncio
+    async def test_await(self):
+        """Awaiting an operation waits for completion and returns it."""
+        remote = FakeRemote(responses=[make_status("op")])
+        operation = Operation(remote, "/operations/op")
+        assert await operation is operation
+        assert operation.details() == make_status("op")
+
+    @pytest.mark.asyncio
+    async def test_await_failed(self):
+        """Awaiting a failed operation raises an error."""
+        remote = FakeRemote(responses=[make_status("op", code=400, err="Boom")])
+        with pytest.raises(OperationError):
+            await Operation(remote, "/operations/op")
+
+    @pytest.mark.asyncio
+    async def test_progress_poll(self):
+        """Without a watcher, progress is polled by waiting with a timeout."""
+        remote = FakeRemote(
+            responses=[
+                make_status("op", code=103, metadata={"progress": "10%"}),
+                make_status("op", metadata={"progress": "100%"}),
+            ]
+        )
+        operation = Operation(remote, "/operations/op")
+        updates = [update async for update in operation.progress(interval=2.4)]
+        assert updates == [{"progress": "10%"}, {"progress": "100%"}]
+        assert remote.calls == [
+            ("GET", "/operations/op/wait", {"timeout": 2}, None, None, None),
+            ("GET", "/operations/op/wait", {"timeout": 2}, None, None, None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_progress_poll_min_timeout(self):
+        """The polling timeout is at least one second."""
+        remote = FakeRemote(responses=[make_status("op")])
+        operation = Operation(remote, "/operations/op")
+        updates = [update async for update in operation.progress(interval=0.1)]
+        assert updates == [None]
+        assert remote.calls == [
+            ("GET", "/operations/op/wait", {"timeout": 1}, None, None, None)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_progress_watcher(self):
+        """If the remote has an operation watcher, it's used for progress."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        updates = []
+        task = get_event_loop().create_task(collect(operation.progress(), updates))
+        await sleep(0)
+        await remote.send(**make_status("op", metadata={"progress": "100%"}))
+        await task
+        assert updates == [{"progress": "100%"}]
+        assert remote.calls == []
+
+
+@pytest.mark.asyncio
+class TestOperationWatcher:
+    async def test_wait(self):
+        """Operations complete when an event with a final status is received."""
+        remote = EventsRemote()
+        watcher = remote.operation_watcher
+        op1 = Operation(remote, "/operations/op1")
+        op2 = Operation(remote, "/operations/op2")
+        task1 = get_event_loop().create_task(watcher.wait(op1))
+        task2 = get_event_loop().create_task(watcher.wait(op2))
+        await sleep(0)
+        assert watcher.pending == 2
+        await remote.send(**make_status("op2"))
+        await remote.send(**make_status("op1", code=103))
+        await task2
+        assert not task1.done()
+        assert op2.details() == make_status("op2")
+        await remote.send(**make_status("op1"))
+        await task1
+        assert op1.details() == make_status("op1")
+        assert watcher.pending == 0
+        # a single subscription is used, with no requests
+        assert remote.subscriptions == [["operation"]]
+        assert remote.calls == []
+
+    async def test_wait_same_operation(self):
+        """Multiple waits for the same operation complete together."""
+        remote = EventsRemote()
+        watcher = remote.operation_watcher
+        operation = Operation(remote, "/operations/op")
+        task1 = get_event_loop().create_task(watcher.wait(operation))
+        task2 = get_event_loop().create_task(watcher.wait(operation))
+        await sleep(0)
+        assert watcher.pending == 1
+        await remote.send(**make_status("op"))
+        await task1
+        await task2
+
+    async def test_wait_already_completed(self):
+        """If the operation is already completed, it returns immediately."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        operation.update_details(make_status("op"))
+        await remote.operation_watcher.wait(operation)
+        assert remote.subscriptions == []
+
+    async def test_wait_completed_before_watched(self):
+        """Operations completed before being watched are tracked."""
+        remote = EventsRemote()
+        watcher = remote.operation_watcher
+        operation = Operation(remote, "/operations/op")
+        operation.update_details(make_status("op", code=103))
+        task = get_event_loop().create_task(
+            watcher.wait(Operation(remote, "/operations/other"))
+        )
+        await sleep(0)
+        await remote.send(**make_status("op"))
+        await watcher.wait(operation)
+        assert operation.details() == make_status("op")
+        task.cancel()
+
+    async def test_recent_size(self):
+        """Only a limited number of completed operations is tracked."""
+        remote = EventsRemote()
+        watcher = OperationWatcher(remote, recent_size=1)
+        task = get_event_loop().create_task(
+            watcher.wait(Operation(remote, "/operations/other"))
+        )
+        await sleep(0)
+        await remote.send(**make_status("op1"))
+        await remote.send(**make_status("op2"))
+        assert list(watcher._recent) == ["op2"]
+        watcher.stop()
+        task.cancel()
+
+    async def test_wait_timeout(self):
+        """Waiting returns after the timeout."""
+        remote = EventsRemote()
+        watcher = remote.operation_watcher
+        operation = Operation(remote, "/operations/op")
+        await watcher.wait(operation, timeout=0.01)
+        # the operation is still tracked for other callers
+        assert watcher.pending == 1
+
+    async def test_connect_refreshes_pending(self):
+        """Pending operations are refreshed when connected."""
+        remote = EventsRemote(responses=[make_status("op1"), make_status("op2", 103)])
+        watcher = remote.operation_watcher
+        op1 = Operation(remote, "/operations/op1")
+        op2 = Operation(remote, "/operations/op2")
+        task1 = get_event_loop().create_task(watcher.wait(op1))
+        task2 = get_event_loop().create_task(watcher.wait(op2))
+        await sleep(0)
+        await remote.handle_connect()
+        await task1
+        assert not task2.done()
+        assert remote.calls == [
+            ("GET", "/operations/op1", None, None, None, None),
+            ("GET", "/operations/op2", None, None, None, None),
+        ]
+        task2.cancel()
+
+    async def test_connect_refresh_error(self):
+        """Errors refreshing operations are raised to waiters."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        task = get_event_loop().create_task(remote.operation_watcher.wait(operation))
+        await sleep(0)
+        # no response available
+        await remote.handle_connect()
+        with pytest.raises(IndexError):
+            await task
+
+    async def test_disconnect_fallback(self):
+        """If the websocket disconnects, pending operations are waited for."""
+        remote = EventsRemote(responses=[make_status("op")])
+        watcher = remote.operation_watcher
+        operation = Operation(remote, "/operations/op")
+        task = get_event_loop().create_task(watcher.wait(operation))
+        await sleep(0)
+        remote.disconnect.set()
+        await task
+        assert operation.details() == make_status("op")
+        assert remote.calls == [("GET", "/operations/op/wait", None, None, None, None)]
+
+    async def test_disconnect_fallback_error(self):
+        """Errors waiting for operations after a disconnect are raised."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        task = get_event_loop().create_task(remote.operation_watcher.wait(operation))
+        await sleep(0)
+        # no response available
+        remote.disconnect.set()
+        with pytest.raises(IndexError):
+            await task
+
+    async def test_resubscribe_after_disconnect(self):
+        """A new subscription is started after a disconnect."""
+        remote = EventsRemote()
+        watcher = remote.operation_watcher
+        task = get_event_loop().create_task(
+            watcher.wait(Operation(remote, "/operations/op1"))
+        )
+        await sleep(0)
+        await remote.send(**make_status("op1"))
+        await task
+        remote.disconnect.set()
+        await sleep(0.01)
+        task = get_event_loop().create_task(
+            watcher.wait(Operation(remote, "/operations/op2"))
+        )
+        await sleep(0)
+        assert remote.subscriptions == [["operation"], ["operation"]]
+        task.cancel()
+
+    async def test_stop(self):
+        """Stopping the watcher cancels pending waits."""
+        remote = EventsRemote(responses=[make_status("op1", 103)])
+        watcher = remote.operation_watcher
+        task = get_event_loop().create_task(
+            watcher.wait(Operation(remote, "/operations/op1"))
+        )
+        await sleep(0)
+        watcher.stop()
+        with pytest.raises(CancelledError):
+            await task
+        assert watcher.pending == 0
+        # no fallback is performed
+        assert remote.calls == []
+
+    async def test_stop_fallbacks(self):
+        """Stopping the watcher cancels fallback waits."""
+        remote = EventsRemote()
+        remote.wait_allowed.clear()
+        watcher = remote.operation_watcher
+        task = get_event_loop().create_task(
+            watcher.wait(Operation(remote, "/operations/op1"))
+        )
+        await sleep(0)
+        remote.disconnect.set()
+        await sleep(0.01)
+        assert len(watcher._fallbacks) == 1
+        watcher.stop()
+        with pytest.raises(CancelledError):
+            await task
+        assert watcher._fallbacks == set()
+
+    async def test_progress(self):
+        """Progress updates are yielded until the operation completes."""
+        remote = EventsRemote()
+        watcher = remote.operation_watcher
+        operation = Operation(remote, "/operations/op")
+        updates = []
+        task = get_event_loop().create_task(
+            collect(watcher.progress(operation, interval=0), updates)
+        )
+        await sleep(0)
+        await remote.send(**make_status("op", code=103, metadata={"p": 10}))
+        await sleep(0.01)
+        assert updates == [{"p": 10}]
+        await remote.send(**make_status("other", code=103, metadata={"p": 20}))
+        await sleep(0.01)
+        assert updates == [{"p": 10}]
+        await remote.send(**make_status("op", metadata={"p": 100}))
+        await task
+        assert updates == [{"p": 10}, {"p": 100}]
+        assert operation.details() == make_status("op", metadata={"p": 100})
+        assert watcher._listeners == {}
+        assert remote.subscriptions == [["operation"]]
+
+    async def test_progress_rate_limited(self):
+        """Updates within the interval are coalesced to the latest one."""
+        remote = EventsRemote()
+        watcher = remote.operation_watcher
+        operation = Operation(remote, "/operations/op")
+        updates = []
+        task = get_event_loop().create_task(
+            collect(watcher.progress(operation, interval=0.05), updates)
+        )
+        await sleep(0)
+        await remote.send(**make_status("op", code=103, metadata={"p": 10}))
+        await sleep(0.01)
+        for progress in (20, 30, 40):
+            await remote.send(**make_status("op", code=103, metadata={"p": progress}))
+        await sleep(0.01)
+        assert updates == [{"p": 10}]
+        await sleep(0.05)
+        assert updates == [{"p": 10}, {"p": 40}]
+        await remote.send(**make_status("op", metadata={"p": 100}))
+        await task
+        assert updates == [{"p": 10}, {"p": 40}, {"p": 100}]
+
+    async def test_progress_multiple_listeners(self):
+        """Multiple iterations over progress for an operation are possible."""
+        remote = EventsRemote()
+        watcher = remote.operation_watcher
+        op1 = Operation(remote, "/operations/op")
+        op2 = Operation(remote, "/operations/op")
+        updates1, updates2 = [], []
+        task1 = get_event_loop().create_task(
+            collect(watcher.progress(op1, interval=0), updates1)
+        )
+        task2 = get_event_loop().create_task(
+            collect(watcher.progress(op2, interval=0), updates2)
+        )
+        await sleep(0)
+        await remote.send(**make_status("op", metadata={"p": 100}))
+        await task1
+        await task2
+        assert updates1 == updates2 == [{"p": 100}]
+
+    async def test_progress_already_completed(self):
+        """If the operation is already completed, its metadata is yielded."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        operation.update_details(make_status("op", metadata={"p": 100}))
+        updates = [
+            update async for update in remote.operation_watcher.progress(operation)
+        ]
+        assert updates == [{"p": 100}]
+        assert remote.subscriptions == []
+
+    async def test_progress_no_details(self):
+        """If the operation has no details, None is yielded."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        updates = []
+        task = get_event_loop().create_task(
+            collect(remote.operation_watcher.progress(operation), updates)
+        )
+        await sleep(0)
+        remote.operation_watcher._notify_listeners("op")
+        await sleep(0.01)
+        assert updates == [None]
+        task.cancel()
+
+    async def test_progress_connect_refreshes(self):
+        """Operations being iterated are refreshed when connected."""
+        remote = EventsRemote(responses=[make_status("op", metadata={"p": 100})])
+        operation = Operation(remote, "/operations/op")
+        updates = []
+        task = get_event_loop().create_task(
+            collect(remote.operation_watcher.progress(operation), updates)
+        )
+        await sleep(0)
+        await remote.handle_connect()
+        await task
+        assert updates == [{"p": 100}]
+        assert remote.calls == [("GET", "/operations/op", None, None, None, None)]
+
+    async def test_progress_disconnect(self):
+        """Iteration over progress ends if the websocket disconnects."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        updates = []
+        task = get_event_loop().create_task(
+            collect(remote.operation_watcher.progress(operation), updates)
+        )
+        await sleep(0)
+        remote.disconnect.set()
+        await task
+        assert updates == []
+        assert remote.operation_watcher._listeners == {}
+
+    async def test_progress_stop(self):
+        """Iteration over progress ends if the watcher is stopped."""
+        remote = EventsRemote()
+        operation = Operation(remote, "/operations/op")
+        updates = []
+        task = get_event_loop().create_task(
+            collect(remote.operation_watcher.progress(operation), updates)
+        )
+        await sleep(0)
+        remote.operation_watcher.stop()
+        await task
+        assert updates == []
+
 
 class TestOperations:
     @pytest.mark.asyncio
@@ -68,3 +551,22 @@ class TestOperations:
             Operation(remote, "/operations/two"),
             Operation(remote, "/operations/three"),
         ]
+
+    @pytest.mark.asyncio
+    async def test_iter(self):
+        """The iter method yields opreations in all statuses."""
+        remote = FakeRemote(
+            responses=[
+                {
+                    "running": ["/operations/one", "/operations/two"],
+                    "queued": ["/operations/three"],
+                }
+            ]
+        )
+        collection = Operations(remote, "/operations")
+        operations = [operation async for operation in collection.iter()]
+        assert operations == [
+            Operation(remote, "/operations/one"),
+            Operation(remote, "/operations/two"),
+            Operation(remote, "/operations/three"),
+        ]
@@ -3,6 +3,7 @@
 from asyncio import get_event_loop
 import io
 from json import dumps as json_dumps
+import tracemalloc
 
 from aiohttp import (
     ClientResponse,
@@ -16,6 +17,7 @@ from .http import (
     ContentStream,
     Response,
 )
+from .resource import IdentityMap
 
 
 class AsyncIterator:
@@ -24,6 +26,9 @@ class AsyncIterator:
     def __init__(self, iterable):
         self.iterable = iter(iterable)
 
+    def __aiter__(self):
+        return self
+
     async def __anext__(self):
         try:
             return next(self.iterable)
@@ -35,26 +40,43 @@ class FakeRemote:
     """A fake Remote class."""
 
     version = "1.0"
+    read_batcher = None
+    operation_watcher = None
 
     def __init__(self, responses=None):
         self.responses = responses or []
         self.calls = []
+        self.identity_map = IdentityMap(self)
 
     async def request(
-        self, method, path, params=None, headers=None, content=None, upload=None
+        self,
+        method,
+        path,
+        params=None,
+        headers=None,
+        content=None,
+        upload=None,
+        cache=False,
+        stream=False,
     ):
         self.calls.append((method, path, params, headers, content, upload))
         response = self.responses.pop(0)
         if isinstance(response, Response):
             return response
-        return Response(self, 200, {}, make_response_content(response))
+        content = make_response_content(response)
+        if stream:
+            content = FakeStreamReader(io.BytesIO(json_dumps(content).encode("utf8")))
+        return Response(self, 200, {}, content)
 
 
 class FakeSession:
     """A fake session class."""
 
-    def __init__(self, connector=None, responses=(), websocket=None):
+    def __init__(
+        self, connector=None, responses=(), websocket=None, json_serialize=None
+    ):
         self.connector = connector
+        self.json_serialize = json_serialize
         self.responses = list(responses)
         self.websocket = websocket
         self.calls = []
@@ -206,3 +228,21 @@ def make_resource(resource_class, uri="/resource", etag=None, details=None):
     resource._last_etag = etag
     resource._details = details
     return resource
+
+
+def average_allocation(factory, count=1000):
+    """Return the average size in bytes allocated by calls to factory.
+
+    Objects returned by the factory are kept alive while measuring.
+
+    """
+    objects = [None] * count
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        for index in range(count):
+            objects[index] = factory()
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (end - start) / count
@@ -0,0 +1,170 @@
+from asyncio import (
+    gather,
+    sleep,
+)
+
+import pytest
+
+from ..batch import (
+    BatchConfig,
+    BatchStats,
+    ReadBatcher,
+)
+from ..http import ResponseError
+from ..resources.containers import Containers
+from ..testing import FakeRemote
+
+
+class FailingRemote(FakeRemote):
+    """A FakeRemote raising errors for responses that are exceptions."""
+
+    async def request(self, *args, **kwargs):
+        response = await super().request(*args, **kwargs)
+        if isinstance(response.metadata, Exception):
+            raise response.metadata
+        return response
+
+
+@pytest.fixture
+def batcher():
+    yield ReadBatcher(config=BatchConfig(window=0.01, threshold=3))
+
+
+@pytest.fixture
+def remote(batcher):
+    remote = FailingRemote()
+    remote.read_batcher = batcher
+    yield remote
+
+
+@pytest.fixture
+def containers(remote):
+    yield Containers(remote, "/containers")
+
+
+class TestReadBatcher:
+    def test_default_config(self):
+        """The batcher has a default configuration."""
+        assert ReadBatcher().config == BatchConfig()
+
+    @pytest.mark.asyncio
+    async def test_below_threshold(self, remote, batcher, containers):
+        """Reads below the threshold are performed individually."""
+        remote.responses.extend([{"name": "c1"}, {"name": "c2"}])
+        c1, c2 = await gather(containers.get("c1"), containers.get("c2"))
+        assert c1.details() == {"name": "c1"}
+        assert c2.details() == {"name": "c2"}
+        assert remote.calls == [
+            ("GET", "/containers/c1", None, None, None, None),
+            ("GET", "/containers/c2", None, None, None, None),
+        ]
+        assert batcher.stats() == BatchStats(listings=0, batched=0, individual=2)
+
+    @pytest.mark.asyncio
+    async def test_above_threshold(self, remote, batcher, containers):
+        """Reads above the threshold are replaced by a recursive listing."""
+        remote.responses.append(
+            [{"name": "c1"}, {"name": "c2"}, {"name": "c3"}, {"name": "c4"}]
+        )
+        resources = await gather(
+            containers.get("c1"), containers.get("c2"), containers.get("c3")
+        )
+        assert [resource.details() for resource in resources] == [
+            {"name": "c1"},
+            {"name": "c2"},
+            {"name": "c3"},
+        ]
+        assert remote.calls == [
+            ("GET", "/containers", {"recursion": 1}, None, None, None)
+        ]
+        assert batcher.stats() == BatchStats(listings=1, batched=3, individual=0)
+
+    @pytest.mark.asyncio
+    async def test_same_resource(self, remote, batcher, containers):
+        """Reads for the same resource are performed once."""
+        remote.responses.append({"name": "c1"})
+        c1, other1, other2 = await gather(*(containers.get("c1") for _ in range(3)))
+        assert c1 is other1
+        assert c1 is other2
+        assert len(remote.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_after_window(self, remote, batcher, containers):
+        """Reads after the window are performed in a separate batch."""
+        remote.responses.extend([{"name": "c1"}, {"name": "c1"}])
+        await containers.get("c1")
+        await containers.get("c1")
+        assert len(remote.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_separate_collections(self, remote, batcher):
+        """Reads for different collections are batched separately."""
+        remote.responses.extend([{"name": "c1"}, {"name": "p1"}])
+        await gather(
+            Containers(remote, "/containers").get("c1"),
+            Containers(remote, "/profiles").get("p1"),
+        )
+        assert remote.calls == [
+            ("GET", "/containers/c1", None, None, None, None),
+            ("GET", "/profiles/p1", None, None, None, None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_not_in_listing(self, remote, batcher, containers):
+        """Resources not in the listing are read individually."""
+        error = ResponseError(404, "not found")
+        remote.responses.extend([[{"name": "c1"}, {"name": "c2"}], error])
+        results = await gather(
+            containers.get("c1"),
+            containers.get("c2"),
+            containers.get("c3"),
+            return_exceptions=True,
+        )
+        assert results[2] is error
+        assert remote.calls == [
+            ("GET", "/containers", {"recursion": 1}, None, None, None),
+            ("GET", "/containers/c3", None, None, None, None),
+        ]
+        assert batcher.stats() == BatchStats(listings=1, batched=2, individual=1)
+
+    @pytest.mark.asyncio
+    async def test_listing_error(self, remote, batcher, containers):
+        """If the listing fails, all reads get the error."""
+        error = ResponseError(500, "failed")
+        remote.responses.append(error)
+        results = await gather(
+            *(containers.get(name) for name in ("c1", "c2", "c3")),
+            return_exceptions=True,
+        )
+        assert results == [error, error, error]
+
+    @pytest.mark.asyncio
+    async def test_individual_error(self, remote, batcher, containers):
+        """Errors for individual reads are returned to their caller."""
+        error = ResponseError(404, "not found")
+        remote.responses.extend([error, {"name": "c2"}])
+        results = await gather(
+            containers.get("c1"), containers.get("c2"), return_exceptions=True
+        )
+        assert results[0] is error
+        assert results[1].details() == {"name": "c2"}
+
+    @pytest.mark.asyncio
+    async def test_caller_cancelled(self, event_loop, remote, batcher, containers):
+        """Cancelling a caller doesn't cancel the read for others."""
+        remote.responses.append({"name": "c1"})
+        task1 = event_loop.create_task(containers.get("c1"))
+        task2 = event_loop.create_task(containers.get("c1"))
+        await sleep(0)
+        task1.cancel()
+        container = await task2
+        assert container.details() == {"name": "c1"}
+        assert task1.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_raw_collection_not_batched(self, remote, batcher):
+        """Reads from raw collections are not batched."""
+        remote.responses.append({"name": "c1"})
+        containers = Containers(remote, "/containers", raw=True)
+        await containers.get("c1")
+        assert batcher.stats() == BatchStats(listings=0, batched=0, individual=0)
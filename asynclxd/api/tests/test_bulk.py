@@ -0,0 +1,168 @@
+from asyncio import (
+    Event,
+    sleep,
+)
+
+import pytest
+
+from ..bulk import (
+    BulkReport,
+    BulkResult,
+    iter_bulk,
+    run_bulk,
+    run_bulk_report,
+)
+
+
+class Calls:
+    """Track concurrent calls."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.running = 0
+        self.max_running = 0
+        self.completed = []
+
+    async def __call__(self, item):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await sleep(self.delays.get(item, 0))
+            if isinstance(item, Exception):
+                raise item
+            return item * 2
+        finally:
+            self.running -= 1
+            self.completed.append(item)
+
+
+class TestBulkResult:
+    def test_ok(self):
+        """A result is ok if there's no error."""
+        assert BulkResult(item=1, result=2).ok
+        assert not BulkResult(item=1, error=Exception("fail")).ok
+
+
+class TestBulkReport:
+    def test_succeeded_failed(self):
+        """Successful and failed results can be listed separately."""
+        ok = BulkResult(item=1, result=2)
+        failed = BulkResult(item=2, error=Exception("fail"))
+        report = BulkReport(results=[ok, failed, ok], elapsed=1.0)
+        assert report.succeeded == [ok, ok]
+        assert report.failed == [failed]
+
+
+class TestRunBulk:
+    @pytest.mark.asyncio
+    async def test_results_ordered(self):
+        """Results are returned in the same order as items."""
+        calls = Calls(delays={1: 0.02, 2: 0.01})
+        results = await run_bulk(calls, [1, 2, 3])
+        assert results == [
+            BulkResult(item=1, result=2),
+            BulkResult(item=2, result=4),
+            BulkResult(item=3, result=6),
+        ]
+        assert calls.completed == [3, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_errors_captured(self):
+        """Errors for each item are captured."""
+        error = ValueError("fail")
+        results = await run_bulk(Calls(), [1, error, 3])
+        assert results == [
+            BulkResult(item=1, result=2),
+            BulkResult(item=error, error=error),
+            BulkResult(item=3, result=6),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_concurrency(self):
+        """At most the specified number of calls run at the same time."""
+        calls = Calls(delays={item: 0.001 for item in range(20)})
+        results = await run_bulk(calls, range(20), concurrency=3)
+        assert len(results) == 20
+        assert calls.max_running == 3
+
+    @pytest.mark.asyncio
+    async def test_no_items(self):
+        """An empty list is returned if there are no items."""
+        assert await run_bulk(Calls(), []) == []
+
+    @pytest.mark.asyncio
+    async def test_invalid_concurrency(self):
+        """Concurrency must be positive."""
+        with pytest.raises(ValueError) as error:
+            await run_bulk(Calls(), [1], concurrency=0)
+        assert str(error.value) == "Concurrency must be at least 1"
+
+
+class TestRunBulkReport:
+    @pytest.mark.asyncio
+    async def test_report(self):
+        """A report with results is returned."""
+        error = ValueError("fail")
+        report = await run_bulk_report(Calls(), [1, error])
+        assert report.results == [
+            BulkResult(item=1, result=2),
+            BulkResult(item=error, error=error),
+        ]
+        assert report.elapsed > 0
+
+
+class TestIterBulk:
+    @pytest.mark.asyncio
+    async def test_results_as_completed(self):
+        """Results are yielded as calls complete."""
+        calls = Calls(delays={1: 0.02, 2: 0.01})
+        results = [result async for result in iter_bulk(calls, [1, 2, 3])]
+        assert results == [
+            BulkResult(item=3, result=6),
+            BulkResult(item=2, result=4),
+            BulkResult(item=1, result=2),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_errors_captured(self):
+        """Errors for each item are captured."""
+        error = ValueError("fail")
+        results = [result async for result in iter_bulk(Calls(), [error])]
+        assert results == [BulkResult(item=error, error=error)]
+
+    @pytest.mark.asyncio
+    async def test_concurrency(self):
+        """At most the specified number of calls run at the same time."""
+        calls = Calls(delays={item: 0.001 for item in range(20)})
+        results = [
+            result async for result in iter_bulk(calls, range(20), concurrency=4)
+        ]
+        assert len(results) == 20
+        assert calls.max_running == 4
+
+    @pytest.mark.asyncio
+    async def test_stop_early(self):
+        """Pending calls are cancelled if iteration stops early."""
+        blocked = Event()
+        completed = []
+
+        async def func(item):
+            if item > 1:
+                await blocked.wait()
+            completed.append(item)
+            return item
+
+        iterator = iter_bulk(func, [1, 2, 3], concurrency=2)
+        assert await iterator.__anext__() == BulkResult(item=1, result=1)
+        await iterator.aclose()
+        await sleep(0)
+        blocked.set()
+        await sleep(0.01)
+        # pending calls have been cancelled
+        assert completed == [1]
+
+    def test_invalid_concurrency(self):
+        """Concurrency must be positive."""
+        with pytest.raises(ValueError) as error:
+            iter_bulk(Calls(), [1], concurrency=0)
+        assert str(error.value) == "Concurrency must be at least 1"
@@ -0,0 +1,156 @@
+import pytest
+
+from ..cache import (
+    CacheStats,
+    ResponseCache,
+)
+from ..http import Response
+from ..testing import FakeRemote
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_time():
+    yield FakeTime()
+
+
+@pytest.fixture
+def make_cache(fake_time):
+    def make(**kwargs):
+        cache = ResponseCache(**kwargs)
+        cache._time = fake_time
+        return cache
+
+    yield make
+
+
+def make_response(metadata=None, etag="abc", location=None):
+    headers = {"ETag": etag}
+    if location:
+        headers["Location"] = location
+    return Response(
+        FakeRemote(), 200, headers, {"type": "sync", "metadata": metadata or {}}
+    )
+
+
+class TestResponseCache:
+    def test_get_not_found(self, make_cache):
+        """If a key is not cached, None is returned."""
+        cache = make_cache()
+        assert cache.get(("/1.0/containers/c", ())) is None
+
+    def test_store(self, make_cache):
+        """A response is stored in the cache."""
+        cache = make_cache()
+        key = ("/1.0/containers/c", ())
+        metadata = {"name": "c"}
+        cache.store(key, make_response(metadata=metadata, location="/foo"))
+        entry = cache.get(key)
+        assert entry.etag == "abc"
+        assert entry.http_code == 200
+        assert entry.headers == {"ETag": "abc", "Location": "/foo"}
+        assert entry.content == {"type": "sync", "metadata": metadata}
+        # content is copied
+        assert entry.content["metadata"] is not metadata
+
+    def test_store_no_etag(self, make_cache):
+        """Responses without ETag are not cached."""
+        cache = make_cache()
+        key = ("/1.0/containers/c", ())
+        cache.store(key, make_response())
+        cache.store(key, make_response(etag=None))
+        assert cache.get(key) is None
+
+    def test_store_evict_lru(self, make_cache):
+        """When full, the least recently used entry is evicted."""
+        cache = make_cache(max_entries=2)
+        cache.store(("/1.0/a", ()), make_response())
+        cache.store(("/1.0/b", ()), make_response())
+        cache.get(("/1.0/a", ()))
+        cache.store(("/1.0/c", ()), make_response())
+        assert len(cache) == 2
+        assert cache.get(("/1.0/a", ())) is not None
+        assert cache.get(("/1.0/b", ())) is None
+        assert cache.get(("/1.0/c", ())) is not None
+
+    def test_is_fresh_default(self, make_cache):
+        """By default, entries are never fresh."""
+        cache = make_cache()
+        key = ("/1.0/containers/c", ())
+        cache.store(key, make_response())
+        assert not cache.is_fresh(cache.get(key))
+
+    def test_is_fresh_ttl(self, make_cache, fake_time):
+        """Entries are fresh until the TTL expires."""
+        cache = make_cache(ttl=10)
+        key = ("/1.0/containers/c", ())
+        cache.store(key, make_response())
+        fake_time.now = 5
+        assert cache.is_fresh(cache.get(key))
+        fake_time.now = 10
+        assert not cache.is_fresh(cache.get(key))
+
+    def test_is_fresh_collection_ttl(self, make_cache, fake_time):
+        """The TTL can be specified per collection."""
+        cache = make_cache(ttl=10, collection_ttls={"containers": 2})
+        cache.store(("/1.0/containers", ()), make_response())
+        cache.store(("/1.0/containers/c", ()), make_response())
+        cache.store(("/1.0/images/i", ()), make_response())
+        cache.store(("/1.0", ()), make_response())
+        fake_time.now = 5
+        assert not cache.is_fresh(cache.get(("/1.0/containers", ())))
+        assert not cache.is_fresh(cache.get(("/1.0/containers/c", ())))
+        assert cache.is_fresh(cache.get(("/1.0/images/i", ())))
+        assert cache.is_fresh(cache.get(("/1.0", ())))
+
+    def test_touch(self, make_cache, fake_time):
+        """Touching an entry makes it fresh again."""
+        cache = make_cache(ttl=10)
+        key = ("/1.0/containers/c", ())
+        cache.store(key, make_response())
+        fake_time.now = 15
+        assert not cache.is_fresh(cache.get(key))
+        cache.touch(key)
+        assert cache.is_fresh(cache.get(key))
+
+    def test_invalidate(self, make_cache):
+        """The path, its ancestors and descendants are invalidated."""
+        cache = make_cache()
+        paths = [
+            "/1.0",
+            "/1.0/containers",
+            "/1.0/containers/c",
+            "/1.0/containers/c/snapshots",
+            "/1.0/containers/c2",
+            "/1.0/images",
+        ]
+        for path in paths:
+            cache.store((path, ()), make_response())
+        cache.store(("/1.0/containers/c", (("a", "b"),)), make_response())
+        cache.invalidate("/1.0/containers/c")
+        assert [key[0] for key in cache._entries] == [
+            "/1.0/containers/c2",
+            "/1.0/images",
+        ]
+
+    def test_clear(self, make_cache):
+        """All entries can be removed."""
+        cache = make_cache()
+        cache.store(("/1.0/a", ()), make_response())
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_stats(self, make_cache):
+        """Cache statistics are returned."""
+        cache = make_cache()
+        cache.store(("/1.0/a", ()), make_response())
+        cache.hits = 3
+        cache.misses = 2
+        assert cache.stats() == CacheStats(hits=3, misses=2, size=1)
@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+
+import pytest
+
+from ..codec import (
+    CODECS,
+    Decoder,
+    DecodeStats,
+    get_codec,
+    JSONCodec,
+)
+
+
+class TestGetCodec:
+    def test_default(self, mocker):
+        """The first available codec is returned by default."""
+
+        def unavailable():
+            raise ImportError("not installed")
+
+        codec = JSONCodec(name="sample", loads=json.loads, dumps=json.dumps)
+        mocker.patch.dict(
+            CODECS,
+            {"unavailable": unavailable, "sample": lambda: codec},
+            clear=True,
+        )
+        assert get_codec() is codec
+
+    def test_by_name(self):
+        """A codec can be requested by name."""
+        codec = get_codec("json")
+        assert codec.name == "json"
+        assert codec.loads is json.loads
+        assert codec.dumps is json.dumps
+
+    def test_unknown(self):
+        """An error is raised if an unknown codec is requested."""
+        with pytest.raises(ValueError) as error:
+            get_codec("unknown")
+        assert str(error.value) == "Unknown JSON codec: unknown"
+
+    @pytest.mark.parametrize("name", ["orjson", "ujson"])
+    def test_optional_codecs(self, name):
+        """Optional codecs encode to strings and decode strings and bytes."""
+        pytest.importorskip(name)
+        codec = get_codec(name)
+        assert codec.name == name
+        assert codec.dumps({"a": [1, 2]}).replace(" ", "") == '{"a":[1,2]}'
+        assert codec.loads('{"a": [1, 2]}') == {"a": [1, 2]}
+        assert codec.loads(b'{"a": [1, 2]}') == {"a": [1, 2]}
+
+    @pytest.mark.parametrize("name", ["orjson", "ujson"])
+    def test_optional_codecs_not_installed(self, mocker, name):
+        """An ImportError is raised if the codec is not installed."""
+        mocker.patch.dict("sys.modules", {name: None})
+        with pytest.raises(ImportError):
+            get_codec(name)
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def threads_codec():
+    """A codec recording the threads payloads are decoded in."""
+    threads = []
+
+    def loads(data):
+        threads.append(threading.current_thread())
+        return json.loads(data)
+
+    yield JSONCodec(name="sample", loads=loads, dumps=json.dumps), threads
+
+
+@pytest.mark.asyncio
+class TestDecoder:
+    async def test_decode_inline(self, threads_codec):
+        """By default, payloads are decoded in the event loop thread."""
+        codec, threads = threads_codec
+        decoder = Decoder(codec)
+        assert await decoder.decode(b'{"a": 1}') == {"a": 1}
+        assert threads == [threading.current_thread()]
+
+    async def test_decode_below_threshold(self, threads_codec, executor):
+        """Payloads below the threshold are decoded in the event loop."""
+        codec, threads = threads_codec
+        decoder = Decoder(codec, offload_threshold=100, executor=executor)
+        assert await decoder.decode(b'{"a": 1}') == {"a": 1}
+        assert threads == [threading.current_thread()]
+
+    async def test_decode_offloaded(self, threads_codec, executor):
+        """Payloads above the threshold are decoded in the executor."""
+        codec, threads = threads_codec
+        decoder = Decoder(codec, offload_threshold=5, executor=executor)
+        assert await decoder.decode(b'{"a": 1}') == {"a": 1}
+        [thread] = threads
+        assert thread is not threading.current_thread()
+
+    async def test_stats(self, executor):
+        """Statistics about decoded payloads are tracked."""
+        decoder = Decoder(get_codec("json"), offload_threshold=5, executor=executor)
+        await decoder.decode(b"[]")
+        await decoder.decode(b"[1, 2, 3]")
+        await decoder.decode(b"[1, 2, 3, 4]")
+        stats = decoder.stats()
+        assert stats.inline == 1
+        assert stats.offloaded == 2
+        assert stats.inline_time > 0
+        assert stats.offloaded_time >= stats.max_offloaded_time > 0
+
+    async def test_stats_empty(self):
+        """Statistics are zero if no payload has been decoded."""
+        decoder = Decoder(get_codec("json"))
+        assert decoder.stats() == DecodeStats(
+            inline=0,
+            inline_time=0.0,
+            offloaded=0,
+            offloaded_time=0.0,
+            max_offloaded_time=0.0,
+        )
@@ -1,4 +1,8 @@
-from io import StringIO
+from io import (
+    BytesIO,
+    StringIO,
+)
+import json
 from pathlib import Path
 from textwrap import dedent
 
@@ -11,6 +15,7 @@ from ..http import (
 )
 from ..resources.operations import Operation
 from ..testing import (
+    average_allocation,
     FakeRemote,
     FakeSession,
     FakeStreamReader,
@@ -103,6 +108,19 @@ class TestRequest:
         assert exception.message == "Cancelled"
         assert str(exception) == "API request failed with 401: Cancelled"
 
+    async def test_request_error_payload_loads(self, session):
+        """The specified function is used to decode error payloads."""
+        decoded = []
+
+        def loads(data):
+            decoded.append(data)
+            return json.loads(data)
+
+        session.responses.append(make_error_response("Cancelled", code=401))
+        with pytest.raises(ResponseError):
+            await request(session, "GET", "/", loads=loads)
+        assert len(decoded) == 1
+
     async def test_request_error_paylod_code_overrides_http(self, session):
         """The error code from the payload takes precedence on the HTTP one."""
         session.responses.append(
@@ -124,6 +142,15 @@ class TestResponse:
         assert response.type == "sync"
         assert response.metadata == {"some": "content"}
 
+    def test_memory_size(self):
+        """Response instances are compact."""
+        remote = FakeRemote()
+        content = {"type": "sync", "metadata": {"some": "content"}}
+        headers = {"ETag": "abcde"}
+        response = Response(remote, 200, headers, content)
+        assert not hasattr(response, "__dict__")
+        assert average_allocation(lambda: Response(remote, 200, headers, content)) < 120
+
     def test_instantiate_with_binary_content(self):
         """A Response can be instantiated with binary content."""
         content = StringIO("some content")
@@ -151,6 +178,18 @@ class TestResponse:
         assert response.operation.uri == "/operations/op"
         assert response.operation.details() == metadata
 
+    def test_operation_shared(self):
+        """The operation is a shared instance."""
+        remote = FakeRemote()
+        response = Response(
+            remote,
+            202,
+            {"Location": "/operations/op"},
+            {"type": "async", "metadata": {}},
+        )
+        operation = response.operation
+        assert remote.identity_map.get(Operation, "/operations/op") is operation
+
     @pytest.mark.asyncio
     async def test_write_content(self):
         """Response binary content can be written to file."""
@@ -168,6 +207,31 @@ class TestResponse:
             await response.write_content(StringIO())
         assert str(error.value) == "No binary payload"
 
+    @pytest.mark.asyncio
+    async def test_iter_metadata(self):
+        """Items in metadata of a streamed response can be iterated."""
+        data = json.dumps({"type": "sync", "metadata": [{"a": 1}, "b"]})
+        content = FakeStreamReader(BytesIO(data.encode("utf8")))
+        response = Response(FakeRemote(), 200, {}, content)
+        items = [item async for item in response.iter_metadata()]
+        assert items == [{"a": 1}, "b"]
+
+    @pytest.mark.asyncio
+    async def test_iter_metadata_depth(self):
+        """It's possible to iterate over nested items in the metadata."""
+        data = json.dumps({"metadata": {"one": ["a"], "two": ["b"]}})
+        content = FakeStreamReader(BytesIO(data.encode("utf8")))
+        response = Response(FakeRemote(), 200, {}, content)
+        items = [item async for item in response.iter_metadata(depth=2)]
+        assert items == ["a", "b"]
+
+    def test_iter_metadata_not_streamed(self):
+        """If the response is not streamed, iterating raises an error."""
+        response = Response(FakeRemote(), 200, {}, {"some": "content"})
+        with pytest.raises(ValueError) as error:
+            response.iter_metadata()
+        assert str(error.value) == "No streamed payload"
+
     def test_pprint(self):
         """The pprint method pretty-prints the response."""
         headers = {"ETag": "abcde", "Location": "/some/url"}
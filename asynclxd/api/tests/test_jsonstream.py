@@ -0,0 +1,145 @@
+import json
+
+import pytest
+
+from ..jsonstream import (
+    iter_metadata_items,
+    MetadataItemsParser,
+)
+from ..testing import (
+    AsyncIterator,
+    make_response_content,
+)
+
+
+def parse(content, depth=1, chunk_size=None):
+    """Parse JSON content in chunks, returning all items."""
+    data = json.dumps(content).encode("utf8")
+    if chunk_size is None:
+        chunk_size = len(data)
+    parser = MetadataItemsParser(depth=depth)
+    items = []
+    for start in range(0, len(data), chunk_size):
+        items.extend(parser.feed(data[start : start + chunk_size]))
+    items.extend(parser.close())
+    return items
+
+
+class TestMetadataItemsParser:
+    @pytest.mark.parametrize("chunk_size", [None, 1, 2, 7, 64])
+    def test_items(self, chunk_size):
+        """Items in the metadata list are returned."""
+        metadata = [
+            "/1.0/containers/c1",
+            {"name": "c2", "config": {"a": [1, 2.5, None, True]}},
+            123,
+        ]
+        content = make_response_content(metadata)
+        assert parse(content, chunk_size=chunk_size) == metadata
+
+    @pytest.mark.parametrize("chunk_size", [None, 1, 3])
+    def test_items_nested(self, chunk_size):
+        """Items nested in the metadata are returned."""
+        metadata = {
+            "running": [{"id": "one"}, {"id": "two"}],
+            "success": [],
+            "failure": None,
+            "other": [{"id": "three"}],
+        }
+        content = make_response_content(metadata)
+        assert parse(content, depth=2, chunk_size=chunk_size) == [
+            {"id": "one"},
+            {"id": "two"},
+            {"id": "three"},
+        ]
+
+    def test_items_returned_when_parsed(self):
+        """Items are returned as soon as they're fully received."""
+        parser = MetadataItemsParser()
+        assert parser.feed(b'{"type": "sync", "metadata": ["a", "b') == ["a"]
+        assert parser.feed(b'", {"c": ') == ["b"]
+        assert parser.feed(b"1}]}") == [{"c": 1}]
+        assert parser.close() == []
+
+    def test_number_split_across_chunks(self):
+        """Values at the end of a chunk wait for more data."""
+        parser = MetadataItemsParser()
+        assert parser.feed(b'{"status_code": 20') == []
+        assert parser.feed(b'0, "metadata": [12') == []
+        assert parser.feed(b"3]}") == [123]
+        assert parser.close() == []
+
+    def test_unicode_split_across_chunks(self):
+        """Multibyte characters split across chunks are decoded."""
+        data = json.dumps({"metadata": ["café"]}, ensure_ascii=False)
+        data = data.encode("utf8")
+        split = data.index(b"\xc3") + 1
+        parser = MetadataItemsParser()
+        items = parser.feed(data[:split]) + parser.feed(data[split:])
+        assert items + parser.close() == ["café"]
+
+    def test_whitespace(self):
+        """Whitespace between tokens is ignored."""
+        data = b' {\n "metadata" : [ "a" ,\n\t"b" ] , "type" : "sync" }\n'
+        parser = MetadataItemsParser()
+        assert parser.feed(data) + parser.close() == ["a", "b"]
+
+    @pytest.mark.parametrize("metadata", [None, [], {}])
+    def test_no_items(self, metadata):
+        """No items are returned if the metadata is empty."""
+        assert parse({"type": "sync", "metadata": metadata}) == []
+
+    def test_no_metadata(self):
+        """No items are returned if there's no metadata."""
+        assert parse({}) == []
+
+    def test_incomplete(self):
+        """An error is raised if the response is incomplete."""
+        parser = MetadataItemsParser()
+        assert parser.feed(b'{"metadata": ["a", "b') == ["a"]
+        with pytest.raises(ValueError) as error:
+            parser.close()
+        assert str(error.value) == "Invalid JSON response"
+
+    def test_incomplete_envelope(self):
+        """An error is raised if the response envelope is incomplete."""
+        parser = MetadataItemsParser()
+        assert parser.feed(b'{"metadata": ["a"]') == ["a"]
+        with pytest.raises(ValueError) as error:
+            parser.close()
+        assert str(error.value) == "Incomplete or invalid JSON response"
+
+    def test_trailing_data(self):
+        """An error is raised if there's data after the response."""
+        parser = MetadataItemsParser()
+        parser.feed(b'{"metadata": []} []')
+        with pytest.raises(ValueError) as error:
+            parser.close()
+        assert str(error.value) == "Incomplete or invalid JSON response"
+
+    def test_invalid(self):
+        """An error is raised if the response is invalid."""
+        parser = MetadataItemsParser()
+        with pytest.raises(ValueError) as error:
+            parser.feed(b'{"metadata": ["a" "b"]}')
+        assert str(error.value) == (
+            "Invalid JSON response: expected ',' at position 18, found '\"'"
+        )
+
+    def test_not_an_object(self):
+        """An error is raised if the response is not a JSON object."""
+        parser = MetadataItemsParser()
+        with pytest.raises(ValueError) as error:
+            parser.feed(b"[]")
+        assert str(error.value) == (
+            "Invalid JSON response: expected '{' at position 0, found '['"
+        )
+
+
+class TestIterMetadataItems:
+    @pytest.mark.asyncio
+    async def test_iter(self):
+        """Items are yielded from chunks of data."""
+        chunks = AsyncIterator([b'{"metadata": [{"a": ', b'1}, "b"', b"]}"])
+        items = [item async for item in iter_metadata_items(chunks)]
+        assert items == [{"a": 1}, "b"]
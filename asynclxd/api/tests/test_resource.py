@@ -5,12 +5,19 @@ import pytest
 from ..http import Response
 from ..resource import (
     Collection,
+    freeze,
+    FrozenDict,
+    FrozenList,
+    IdentityMap,
+    LazyResourceList,
     NamedResource,
     Resource,
     ResourceCollection,
 )
+from ..resources.containers import Container
 from ..resources.operations import Operation
 from ..testing import (
+    average_allocation,
     FakeRemote,
     make_resource,
 )
@@ -31,6 +38,282 @@ class SampleResourceCollection(ResourceCollection):
     resource_class = SampleResource
 
 
+class TestFrozenDict:
+    def test_repr(self):
+        """The object repr includes the data."""
+        assert repr(FrozenDict({"a": 1})) == "FrozenDict({'a': 1})"
+
+    def test_read_only(self):
+        """Items can't be set or deleted."""
+        frozen = FrozenDict({"a": 1})
+        with pytest.raises(TypeError):
+            frozen["b"] = 2
+        with pytest.raises(TypeError):
+            del frozen["a"]
+
+    def test_mapping(self):
+        """The dict can be accessed as a mapping."""
+        frozen = FrozenDict({"a": 1, "b": 2})
+        assert frozen["a"] == 1
+        assert list(frozen) == ["a", "b"]
+        assert len(frozen) == 2
+        assert dict(frozen) == {"a": 1, "b": 2}
+        assert frozen.get("c") is None
+
+    def test_nested(self):
+        """Nested dicts and lists are returned as views."""
+        data = {"a": {"b": 1}, "c": [1, 2]}
+        frozen = FrozenDict(data)
+        assert isinstance(frozen["a"], FrozenDict)
+        assert isinstance(frozen["c"], FrozenList)
+        # data is shared
+        assert frozen["a"]._data is data["a"]
+
+    def test_eq(self):
+        """A view is equal to the underlying data or to other views."""
+        frozen = FrozenDict({"a": {"b": 1}})
+        assert frozen == {"a": {"b": 1}}
+        assert frozen == FrozenDict({"a": {"b": 1}})
+        assert frozen != {"a": {"b": 2}}
+
+    def test_deepcopy(self):
+        """A deep copy returns a mutable copy of the data."""
+        data = {"a": {"b": 1}}
+        copy = deepcopy(FrozenDict(data))
+        assert copy == data
+        assert isinstance(copy, dict)
+        assert copy["a"] is not data["a"]
+
+    def test_copy(self):
+        """The copy method returns a mutable deep copy of the data."""
+        data = {"a": {"b": 1}}
+        copy = FrozenDict(data).copy()
+        assert copy == data
+        assert copy["a"] is not data["a"]
+
+
+class TestFrozenList:
+    def test_repr(self):
+        """The object repr includes the data."""
+        assert repr(FrozenList([1, 2])) == "FrozenList([1, 2])"
+
+    def test_read_only(self):
+        """Items can't be set or deleted."""
+        frozen = FrozenList([1, 2])
+        with pytest.raises(TypeError):
+            frozen[0] = 3
+        with pytest.raises(TypeError):
+            del frozen[0]
+
+    def test_sequence(self):
+        """The list can be accessed as a sequence."""
+        frozen = FrozenList([1, 2, 3])
+        assert frozen[0] == 1
+        assert frozen[-1] == 3
+        assert list(frozen) == [1, 2, 3]
+        assert len(frozen) == 3
+        assert 2 in frozen
+        assert frozen.index(3) == 2
+
+    def test_slice(self):
+        """Slices are returned as views."""
+        frozen = FrozenList([1, 2, 3])
+        assert isinstance(frozen[1:], FrozenList)
+        assert frozen[1:] == [2, 3]
+
+    def test_nested(self):
+        """Nested dicts and lists are returned as views."""
+        frozen = FrozenList([{"a": 1}, [1, 2]])
+        assert isinstance(frozen[0], FrozenDict)
+        assert isinstance(frozen[1], FrozenList)
+        first, second = frozen
+        assert isinstance(first, FrozenDict)
+        assert isinstance(second, FrozenList)
+
+    def test_eq(self):
+        """A view is equal to the underlying data or to other views."""
+        frozen = FrozenList([{"a": 1}])
+        assert frozen == [{"a": 1}]
+        assert frozen == FrozenList([{"a": 1}])
+        assert frozen != [{"a": 2}]
+
+    def test_deepcopy(self):
+        """A deep copy returns a mutable copy of the data."""
+        data = [{"a": 1}]
+        copy = deepcopy(FrozenList(data))
+        assert copy == data
+        assert isinstance(copy, list)
+        assert copy[0] is not data[0]
+
+    def test_copy(self):
+        """The copy method returns a mutable deep copy of the data."""
+        data = [{"a": 1}]
+        copy = FrozenList(data).copy()
+        assert copy == data
+        assert copy[0] is not data[0]
+
+
+class TestFreeze:
+    @pytest.mark.parametrize(
+        "value,frozen_class",
+        [({"a": 1}, FrozenDict), ([1, 2], FrozenList)],
+    )
+    def test_freeze(self, value, frozen_class):
+        """Dicts and lists are returned as views."""
+        frozen = freeze(value)
+        assert isinstance(frozen, frozen_class)
+        assert frozen._data is value
+
+    @pytest.mark.parametrize("value", [1, "foo", None, (1, 2)])
+    def test_freeze_other(self, value):
+        """Other values are returned as they are."""
+        assert freeze(value) is value
+
+
+class TestLazyResourceList:
+    @pytest.fixture
+    def created(self):
+        yield []
+
+    @pytest.fixture
+    def factory(self, created):
+        def factory(entry):
+            created.append(entry)
+            return SampleResource(FakeRemote(), entry)
+
+        yield factory
+
+    def test_repr(self, factory):
+        """The repr shows the list entries."""
+        lazy = LazyResourceList(["/r/one"], factory)
+        assert repr(lazy) == "LazyResourceList(['/r/one'])"
+
+    def test_len(self, factory, created):
+        """The length doesn't require creating resources."""
+        lazy = LazyResourceList(["/r/one", "/r/two"], factory)
+        assert len(lazy) == 2
+        assert created == []
+
+    def test_getitem(self, factory, created):
+        """Resources are created when accessed."""
+        lazy = LazyResourceList(["/r/one", "/r/two"], factory)
+        resource = lazy[1]
+        assert resource.uri == "/r/two"
+        assert created == ["/r/two"]
+        assert lazy[-1] is resource
+        assert created == ["/r/two"]
+
+    def test_getitem_out_of_range(self, factory):
+        """IndexError is raised for indexes out of range."""
+        lazy = LazyResourceList(["/r/one"], factory)
+        with pytest.raises(IndexError):
+            lazy[1]
+        with pytest.raises(IndexError):
+            lazy[-2]
+
+    def test_getitem_slice(self, factory, created):
+        """Slices return a list with the resources in it."""
+        lazy = LazyResourceList(["/r/one", "/r/two", "/r/three"], factory)
+        resources = lazy[1:]
+        assert [resource.uri for resource in resources] == ["/r/two", "/r/three"]
+        assert created == ["/r/two", "/r/three"]
+
+    def test_iter(self, factory, created):
+        """Resources are created while iterating."""
+        lazy = LazyResourceList(["/r/one", "/r/two"], factory)
+        iterator = iter(lazy)
+        assert next(iterator).uri == "/r/one"
+        assert created == ["/r/one"]
+
+    def test_entries(self, factory, created):
+        """Original entries are accessible without creating resources."""
+        lazy = LazyResourceList(["/r/one", "/r/two"], factory)
+        assert lazy.entries == ["/r/one", "/r/two"]
+        assert isinstance(lazy.entries, FrozenList)
+        assert created == []
+
+    def test_eq(self):
+        """Lists are compared by their resources."""
+        remote = FakeRemote()
+
+        def factory(entry):
+            return SampleResource(remote, entry)
+
+        lazy = LazyResourceList(["/r/one"], factory)
+        assert lazy == [SampleResource(remote, "/r/one")]
+        assert lazy == LazyResourceList(["/r/one"], factory)
+        assert lazy != LazyResourceList(["/r/two"], factory)
+
+    def test_deepcopy(self, factory):
+        """A deep copy is a list of resources."""
+        lazy = LazyResourceList(["/r/one"], factory)
+        copy = deepcopy(lazy)
+        assert isinstance(copy, list)
+        assert copy == list(lazy)
+
+    def test_copy(self, factory):
+        """The copy() method returns a list of resources."""
+        lazy = LazyResourceList(["/r/one"], factory)
+        copy = lazy.copy()
+        assert copy == [lazy[0]]
+        assert copy[0] is lazy[0]
+
+
+class TestIdentityMap:
+    def test_get_new(self):
+        """A new instance is returned if not in the map."""
+        remote = FakeRemote()
+        identity_map = IdentityMap(remote)
+        resource = identity_map.get(SampleResource, "/resources/one")
+        assert isinstance(resource, SampleResource)
+        assert resource._remote is remote
+        assert resource.uri == "/resources/one"
+        assert "/resources/one" in identity_map
+
+    def test_get_existing(self):
+        """The same instance is returned for the same URI."""
+        identity_map = IdentityMap(FakeRemote())
+        resource = identity_map.get(SampleResource, "/resources/one")
+        assert identity_map.get(SampleResource, "/resources/one") is resource
+        assert identity_map.get(SampleResource, "/resources/two") is not resource
+
+    def test_get_different_class(self):
+        """A new instance is returned if the class doesn't match."""
+        identity_map = IdentityMap(FakeRemote())
+        resource = identity_map.get(SampleResource, "/resources/one")
+        other = identity_map.get(SampleResourceWithRelated, "/resources/one")
+        assert isinstance(other, SampleResourceWithRelated)
+        assert identity_map.get(SampleResourceWithRelated, "/resources/one") is other
+        assert other is not resource
+
+    def test_weak_references(self):
+        """Resources not in use are dropped from the map."""
+        identity_map = IdentityMap(FakeRemote())
+        resource = identity_map.get(SampleResource, "/resources/one")
+        assert len(identity_map) == 1
+        del resource
+        assert len(identity_map) == 0
+
+    def test_rename(self):
+        """The map is updated when the resource URI changes."""
+        identity_map = IdentityMap(FakeRemote())
+        resource = identity_map.get(SampleResource, "/resources/one")
+        resource.uri = "/resources/new"
+        identity_map.rename(resource, "/resources/one")
+        assert "/resources/one" not in identity_map
+        assert identity_map.get(SampleResource, "/resources/new") is resource
+
+    def test_rename_not_in_map(self):
+        """A renamed resource not previously in the map is added."""
+        identity_map = IdentityMap(FakeRemote())
+        other = identity_map.get(SampleResource, "/resources/one")
+        resource = SampleResource(identity_map._remote, "/resources/new")
+        identity_map.rename(resource, "/resources/one")
+        # the other instance for the old URI is left in place
+        assert identity_map.get(SampleResource, "/resources/one") is other
+        assert identity_map.get(SampleResource, "/resources/new") is resource
+
+
 class TestCollection:
     def test_read(self):
         """Getting a collection returns an instance for the remote."""
@@ -202,6 +485,82 @@ class TestResourceCollection:
         collection = SampleResourceCollection(remote, "/resources", raw=True)
         assert await collection.read() == ["/resources/one", "/resources/two"]
 
+    @pytest.mark.asyncio
+    async def test_get_many(self):
+        """The get_many method returns results for multiple resources."""
+        remote = FakeRemote(responses=[{"id": "one"}, {"id": "two"}])
+        collection = SampleResourceCollection(remote, "/resources")
+        [result1, result2] = await collection.get_many(["one", "two"])
+        assert result1.item == "one"
+        assert result1.result is collection.get_resource("one")
+        assert result1.result.details() == {"id": "one"}
+        assert result2.item == "two"
+        assert result2.result.details() == {"id": "two"}
+        assert remote.calls == [
+            ("GET", "/resources/one", None, None, None, None),
+            ("GET", "/resources/two", None, None, None, None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_many_errors(self):
+        """Errors fetching resources are captured in results."""
+        remote = FakeRemote(responses=[{"id": "one"}])
+        collection = SampleResourceCollection(remote, "/resources")
+        # no response for the second resource
+        [result1, result2] = await collection.get_many(["one", "two"])
+        assert result1.ok
+        assert not result2.ok
+        assert isinstance(result2.error, IndexError)
+
+    @pytest.mark.asyncio
+    async def test_iter_many(self):
+        """The iter_many method yields results for multiple resources."""
+        remote = FakeRemote(responses=[{"id": "one"}, {"id": "two"}])
+        collection = SampleResourceCollection(remote, "/resources")
+        results = [
+            result
+            async for result in collection.iter_many(["one", "two"], concurrency=1)
+        ]
+        assert [result.item for result in results] == ["one", "two"]
+        assert [result.result.details() for result in results] == [
+            {"id": "one"},
+            {"id": "two"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_iter(self):
+        """The iter method yields instances of the resource object."""
+        remote = FakeRemote(responses=[["/resources/one", "/resources/two"]])
+        collection = SampleResourceCollection(remote, "/resources")
+        resources = [resource async for resource in collection.iter()]
+        assert resources == [
+            SampleResource(remote, "/resources/one"),
+            SampleResource(remote, "/resources/two"),
+        ]
+        assert remote.calls == [("GET", "/resources", None, None, None, None)]
+
+    @pytest.mark.asyncio
+    async def test_iter_recursion(self):
+        """If recursion is True, resources details are also set."""
+        remote = FakeRemote(responses=[[{"id": "one"}, {"id": "two"}]])
+        collection = SampleResourceCollection(remote, "/resources")
+        resource = collection.get_resource("one")
+        resources = [resource async for resource in collection.iter(recursion=True)]
+        assert resources[0] is resource
+        assert resource.details() == {"id": "one"}
+        assert resources[1].details() == {"id": "two"}
+        assert remote.calls == [
+            ("GET", "/resources", {"recursion": 1}, None, None, None)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_iter_raw(self):
+        """The iter method yields raw entries if raw=True."""
+        remote = FakeRemote(responses=[["/resources/one", "/resources/two"]])
+        collection = SampleResourceCollection(remote, "/resources", raw=True)
+        entries = [entry async for entry in collection.iter()]
+        assert entries == ["/resources/one", "/resources/two"]
+
     def test_get_resource(self):
         """The get_resource method returns a single resource."""
         remote = FakeRemote()
@@ -212,6 +571,34 @@ class TestResourceCollection:
         assert resource.details() is None
         assert remote.calls == []
 
+    def test_get_resource_shared(self):
+        """The same instance is returned for the same resource."""
+        remote = FakeRemote()
+        collection = SampleResourceCollection(remote, "/resources")
+        resource = collection.get_resource("a-resource")
+        assert collection.get_resource("a-resource") is resource
+        other_collection = SampleResourceCollection(remote, "/resources")
+        assert other_collection.get_resource("/resources/a-resource") is resource
+
+    @pytest.mark.asyncio
+    async def test_read_shared_instances(self):
+        """Resources from read() are shared with other lookups."""
+        remote = FakeRemote(responses=[["/resources/one"]])
+        collection = SampleResourceCollection(remote, "/resources")
+        resource = collection.get_resource("one")
+        assert await collection.read() == [resource]
+        assert collection.get_resource("one") is resource
+
+    @pytest.mark.asyncio
+    async def test_recursion_shared_instances(self):
+        """Details from recursive read() update shared resources."""
+        remote = FakeRemote(responses=[[{"id": "one", "value": 1}]])
+        collection = SampleResourceCollection(remote, "/resources")
+        resource = collection.get_resource("one")
+        [read_resource] = await collection.read(recursion=True)
+        assert read_resource is resource
+        assert resource.details() == {"id": "one", "value": 1}
+
     def test_get_resource_full_uri(self):
         """If the full resource URI is passed, prefix is stripped."""
         remote = FakeRemote()
@@ -273,6 +660,49 @@ class TestResource:
             remote, "/resource2"
         )
 
+    def test_slots(self):
+        """Resources don't have a __dict__."""
+        resource = Container(FakeRemote(), "/resource")
+        assert not hasattr(resource, "__dict__")
+
+    def test_slots_subclass_without_slots(self):
+        """Subclasses not defining __slots__ are supported."""
+        resource = SampleResource(FakeRemote(), "/resource")
+        resource.attribute = "value"
+        assert resource.attribute == "value"
+
+    def test_memory_size(self):
+        """Resource instances are compact."""
+        remote = FakeRemote()
+        uri = "/resource"
+        assert average_allocation(lambda: Container(remote, uri)) < 100
+
+    def test_eq_other_type(self):
+        """Resources are not equal to other objects."""
+        assert SampleResource(FakeRemote(), "/resource") != "/resource"
+
+    def test_hash(self):
+        """Resources can be used in sets."""
+        remote = FakeRemote()
+        resources1 = {
+            SampleResource(remote, "/resource1"),
+            SampleResource(remote, "/resource2"),
+        }
+        resources2 = {
+            SampleResource(remote, "/resource2"),
+            SampleResource(remote, "/resource3"),
+        }
+        assert resources1 - resources2 == {SampleResource(remote, "/resource1")}
+        assert resources1 & resources2 == {SampleResource(remote, "/resource2")}
+
+    def test_hash_different_remote(self):
+        """Resources from different remotes are different in sets."""
+        resources = {
+            SampleResource(FakeRemote(), "/resource"),
+            SampleResource(FakeRemote(), "/resource"),
+        }
+        assert len(resources) == 2
+
     def test_getitem_no_response(self):
         """__getitem__ raises KeyError if no response is cached."""
         resource = SampleResource(FakeRemote(), "/resource")
@@ -290,13 +720,13 @@ class TestResource:
         with pytest.raises(KeyError):
             resource["unknown"]
 
-    @pytest.mark.asyncio
-    async def test_getitem_returns_copy(self):
-        """__getitem__ returns a copy of the details."""
+    def test_getitem_returns_read_only(self):
+        """__getitem__ returns a read-only view of the details."""
         resource = make_resource(SampleResource, details={"key": ["foo"]})
-        # modify returned details
         details = resource["key"]
-        details.append("bar")
+        assert isinstance(details, FrozenList)
+        with pytest.raises(AttributeError):
+            details.append("bar")
         # details in the resource are unchanged
         assert resource["key"] == ["foo"]
 
@@ -309,8 +739,8 @@ class TestResource:
         assert copy.uri == "/res"
         assert copy._last_etag == "abcde"
         assert copy._details == {"some": "detail"}
-        # details are different objects
-        assert copy._details is not resource._details
+        # details are not modified in place, so they're shared
+        assert copy._details is resource._details
 
     @pytest.mark.parametrize(
         "path,resource_id",
@@ -367,6 +797,28 @@ class TestResource:
         assert isinstance(related2, SampleResource)
         assert related2.uri == "/resource/two"
 
+    def test_update_details_related_lazy(self):
+        """Related resources in lists are created when accessed."""
+        details = {"foo": {"sample": ["/resource/one", "/resource/two"]}}
+        remote = FakeRemote()
+        resource = SampleResourceWithRelated(remote, "/resource-with-related")
+        resource.update_details(details)
+        related = resource["foo"]["sample"]
+        assert isinstance(related, LazyResourceList)
+        assert len(remote.identity_map) == 0
+        assert related[0].uri == "/resource/one"
+        assert "/resource/one" in remote.identity_map
+        assert "/resource/two" not in remote.identity_map
+
+    def test_update_details_related_shared(self):
+        """Related resources are shared instances."""
+        details = {"id": "res", "foo": {"sample": ["/resource/one"]}}
+        remote = FakeRemote()
+        resource = SampleResourceWithRelated(remote, "/resource-with-related")
+        resource.update_details(details)
+        [related] = resource["foo"]["sample"]
+        assert remote.identity_map.get(SampleResource, "/resource/one") is related
+
     def test_update_details_reset_etag(self):
         """The update_details() reset last ETag."""
         resource = SampleResource(FakeRemote(), "/resource/myresource")
@@ -384,15 +836,25 @@ class TestResource:
         resource = make_resource(SampleResource, details={"some": "detail"})
         assert resource.details() == {"some": "detail"}
 
-    def test_details_returns_copy(self):
-        """A copy of the details is returned."""
+    def test_details_returns_read_only(self):
+        """A read-only view of the details is returned."""
         resource = make_resource(SampleResource, details={"some": "detail"})
-        # modify returned details
         details = resource.details()
-        details["another-key"] = "another value"
+        assert isinstance(details, FrozenDict)
+        with pytest.raises(TypeError):
+            details["another-key"] = "another value"
         # details in the resource are unchanged
         assert resource.details() == {"some": "detail"}
 
+    def test_details_mutable(self):
+        """A mutable copy of the details can be returned."""
+        resource = make_resource(SampleResource, details={"some": ["detail"]})
+        details = resource.details(mutable=True)
+        details["some"].append("other")
+        details["another-key"] = "another value"
+        # details in the resource are unchanged
+        assert resource.details() == {"some": ["detail"]}
+
     @pytest.mark.asyncio
     async def test_read(self):
         """The read method makes a GET request for the resource."""
@@ -428,6 +890,15 @@ class TestResource:
         assert isinstance(related2, SampleResource)
         assert related2.uri == "/resource/two"
 
+    @pytest.mark.asyncio
+    async def test_read_related_resources_response_unchanged(self):
+        """Related resources are not expanded in the response metadata."""
+        details = {"id": "res", "foo": {"sample": ["/resource/one"]}}
+        remote = FakeRemote(responses=[details])
+        resource = SampleResourceWithRelated(remote, "/resource-with-related")
+        response = await resource.read()
+        assert response.metadata == details
+
     @pytest.mark.asyncio
     async def test_read_related_resources_not_found(self):
         """If the attribute for related resources is found, it's ignored."""
@@ -545,3 +1016,14 @@ class TestNamedResource:
         assert resource.uri == "/new-resource"
         # cached details are cleared
         assert resource._details == {}
+
+    @pytest.mark.asyncio
+    async def test_rename_identity_map(self):
+        """The identity map is updated when a resource is renamed."""
+        remote = FakeRemote()
+        response = Response(remote, 204, {"Location": "/new-resource"}, {})
+        remote.responses.append(response)
+        resource = remote.identity_map.get(NamedResource, "/resource")
+        await resource.rename("new-resource")
+        assert "/resource" not in remote.identity_map
+        assert remote.identity_map.get(NamedResource, "/new-resource") is resource
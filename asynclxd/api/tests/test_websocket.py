@@ -1,3 +1,13 @@
+from asyncio import (
+    CancelledError,
+    Event,
+    get_event_loop,
+    sleep,
+)
+from datetime import datetime
+from unittest import mock
+
+from aiohttp import ClientConnectionError
 import pytest
 
 from ..testing import (
@@ -6,7 +16,10 @@ from ..testing import (
     FakeWSMessage,
 )
 from ..websocket import (
+    Backoff,
     connect,
+    Gap,
+    KeyedDispatcher,
     WebsocketHandler,
 )
 
@@ -15,6 +28,18 @@ class SampleWebsocketHandler(WebsocketHandler):
     def __init__(self, messages=None, errors=None):
         self.messages = []
         self.errors = []
+        self.gaps = []
+        self.connected = False
+        self.disconnects = 0
+
+    async def handle_connect(self):
+        self.connected = True
+
+    async def handle_disconnect(self):
+        self.disconnects += 1
+
+    async def handle_gap(self, gap):
+        self.gaps.append(gap)
 
     async def handle_message(self, message):
         self.messages.append(message)
@@ -23,6 +48,55 @@ class SampleWebsocketHandler(WebsocketHandler):
         self.errors.append(error)
 
 
+class SequenceSession:
+    """A fake session returning websockets or raising errors in sequence."""
+
+    def __init__(self, websockets):
+        self.websockets = list(websockets)
+
+    def ws_connect(self, path):
+        websocket = self.websockets.pop(0)
+        if isinstance(websocket, Exception):
+            raise websocket
+        return websocket
+
+
+class TestWebsocketHandler:
+    @pytest.mark.asyncio
+    async def test_default_hooks(self):
+        """By default, hooks do nothing."""
+
+        class Handler(WebsocketHandler):
+            async def handle_message(self, message):
+                pass
+
+        handler = Handler()
+        await handler.handle_connect()
+        await handler.handle_disconnect()
+        await handler.handle_gap(Gap(start=datetime.now(), duration=1, attempts=1))
+        await handler.handle_error(Exception())
+
+
+class TestBackoff:
+    def test_delay(self):
+        """Delays increase exponentially, up to the maximum."""
+        backoff = Backoff(initial=1, maximum=5, factor=2, jitter=0)
+        assert [backoff.delay(attempt) for attempt in range(1, 6)] == [
+            1,
+            2,
+            4,
+            5,
+            5,
+        ]
+
+    def test_delay_jitter(self):
+        """Delays are randomized by the jitter fraction."""
+        backoff = Backoff(initial=10, jitter=0.1)
+        delays = [backoff.delay(1) for _ in range(50)]
+        assert all(9 <= delay <= 11 for delay in delays)
+        assert len(set(delays)) > 1
+
+
 @pytest.mark.asyncio
 class TestConnect:
     async def test_messages(self):
@@ -33,6 +107,22 @@ class TestConnect:
         await connect(session, "/", handler)
         assert handler.messages == ['"foo"', '"bar"']
 
+    async def test_connect(self):
+        """ "connect() calls the handler when connected."""
+        websocket = FakeWebSocket()
+        session = FakeSession(websocket=websocket)
+        handler = SampleWebsocketHandler()
+        await connect(session, "/", handler)
+        assert handler.connected
+        assert handler._ws is websocket
+
+    async def test_disconnect(self):
+        """ "connect() calls the handler when disconnected."""
+        session = FakeSession(websocket=FakeWebSocket())
+        handler = SampleWebsocketHandler()
+        await connect(session, "/", handler)
+        assert handler.disconnects == 1
+
     async def test_error(self):
         """ "connect() processes errors."""
         messages = [FakeWSMessage("error", type="ERROR")]
@@ -51,3 +141,219 @@ class TestConnect:
         assert handler.messages == []
         assert handler.errors == []
         assert websocket.closed
+
+
+class Handler:
+    """Track calls for items, which are (key, value) tuples."""
+
+    def __init__(self):
+        self.started = []
+        self.completed = []
+        self.running = 0
+        self.max_running = 0
+        self.release = Event()
+
+    async def __call__(self, item):
+        self.started.append(item)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.release.wait()
+            if isinstance(item[1], Exception):
+                raise item[1]
+        finally:
+            self.running -= 1
+        self.completed.append(item)
+
+
+def item_key(item):
+    return item[0]
+
+
+@pytest.mark.asyncio
+class TestKeyedDispatcher:
+    async def test_ordered_per_key(self):
+        """Items with the same key are handled in order, one at a time."""
+        handler = Handler()
+        dispatcher = KeyedDispatcher(handler, item_key)
+        for item in [("a", 1), ("b", 1), ("a", 2), ("a", 3), ("b", 2)]:
+            await dispatcher.dispatch(item)
+        await sleep(0)
+        assert handler.started == [("a", 1), ("b", 1)]
+        assert dispatcher.running == 2
+        assert dispatcher.pending == 3
+        handler.release.set()
+        await dispatcher.join()
+        assert [item for item in handler.completed if item[0] == "a"] == [
+            ("a", 1),
+            ("a", 2),
+            ("a", 3),
+        ]
+        assert [item for item in handler.completed if item[0] == "b"] == [
+            ("b", 1),
+            ("b", 2),
+        ]
+        assert handler.max_running == 2
+        assert dispatcher.running == 0
+        assert dispatcher.pending == 0
+
+    async def test_concurrency(self):
+        """At most the specified number of tasks handle items."""
+        handler = Handler()
+        dispatcher = KeyedDispatcher(handler, item_key, concurrency=2)
+        await dispatcher.dispatch(("a", 1))
+        await dispatcher.dispatch(("b", 1))
+        task = get_event_loop().create_task(dispatcher.dispatch(("c", 1)))
+        await sleep(0)
+        # waiting for a task to be available
+        assert not task.done()
+        # items for keys being handled are queued
+        await dispatcher.dispatch(("a", 2))
+        handler.release.set()
+        await task
+        await dispatcher.join()
+        assert handler.max_running == 2
+        assert sorted(handler.completed) == [("a", 1), ("a", 2), ("b", 1), ("c", 1)]
+
+    async def test_no_key(self):
+        """Items with a None key are not ordered."""
+        handler = Handler()
+        dispatcher = KeyedDispatcher(handler, item_key)
+        await dispatcher.dispatch((None, 1))
+        await dispatcher.dispatch((None, 2))
+        await sleep(0)
+        assert handler.running == 2
+        handler.release.set()
+        await dispatcher.join()
+
+    async def test_handle_error(self):
+        """Errors from the handler are passed to the error handler."""
+        errors = []
+
+        async def handle_error(error):
+            errors.append(error)
+
+        handler = Handler()
+        handler.release.set()
+        dispatcher = KeyedDispatcher(handler, item_key, handle_error=handle_error)
+        error = Exception("Boom")
+        await dispatcher.dispatch(("a", error))
+        await dispatcher.dispatch(("a", 2))
+        await dispatcher.join()
+        assert errors == [error]
+        # handling continues after errors
+        assert handler.completed == [("a", 2)]
+
+    async def test_error_exception_handler(self):
+        """By default, errors are reported to the loop exception handler."""
+        handler = Handler()
+        handler.release.set()
+        dispatcher = KeyedDispatcher(handler, item_key)
+        error = Exception("Boom")
+        loop = get_event_loop()
+        with mock.patch.object(loop, "call_exception_handler") as handle:
+            await dispatcher.dispatch(("a", error))
+            await dispatcher.join()
+        handle.assert_called_once_with(
+            {"message": "Error in dispatched handler", "exception": error}
+        )
+
+    async def test_close(self):
+        """Closing cancels running tasks, discarding pending items."""
+        handler = Handler()
+        dispatcher = KeyedDispatcher(handler, item_key, concurrency=1)
+        await dispatcher.dispatch(("a", 1))
+        await dispatcher.dispatch(("a", 2))
+        await sleep(0)
+        [task] = dispatcher._tasks
+        dispatcher.close()
+        with pytest.raises(CancelledError):
+            await task
+        assert dispatcher.pending == 0
+        assert handler.started == [("a", 1)]
+        # the task slot is released
+        handler.release.set()
+        await dispatcher.dispatch(("a", 3))
+        await dispatcher.join()
+        assert handler.completed == [("a", 3)]
+
+    async def test_invalid_concurrency(self):
+        """Concurrency must be positive."""
+        with pytest.raises(ValueError) as error:
+            KeyedDispatcher(Handler(), item_key, concurrency=0)
+        assert str(error.value) == "Concurrency must be at least 1"
+
+
+@pytest.mark.asyncio
+class TestConnectReconnect:
+    async def test_reconnect(self):
+        """The websocket is connected again when closed."""
+        session = SequenceSession(
+            [
+                FakeWebSocket(messages=[FakeWSMessage("foo")]),
+                FakeWebSocket(messages=[FakeWSMessage("bar")]),
+            ]
+        )
+        handler = SampleWebsocketHandler()
+        backoff = Backoff(initial=0, jitter=0, max_attempts=1)
+        with pytest.raises(IndexError):
+            # no more websockets
+            await connect(session, "/", handler, reconnect=backoff)
+        assert handler.messages == ['"foo"', '"bar"']
+        assert handler.disconnects == 2
+        [gap] = handler.gaps
+        assert gap.start.tzinfo is not None
+        assert gap.duration >= 0
+        assert gap.attempts == 1
+
+    async def test_connection_errors(self):
+        """Connection errors are reported, and connection attempted again."""
+        error1 = ClientConnectionError("fail")
+        error2 = OSError("fail")
+        session = SequenceSession(
+            [FakeWebSocket(), error1, error2, FakeWebSocket(), IndexError()]
+        )
+        handler = SampleWebsocketHandler()
+        backoff = Backoff(initial=0.001, jitter=0)
+        with pytest.raises(IndexError):
+            await connect(session, "/", handler, reconnect=backoff)
+        assert handler.errors == [error1, error2]
+        [gap] = handler.gaps
+        assert gap.attempts == 3
+        assert gap.duration >= 0.007
+
+    async def test_initial_connection_no_gap(self):
+        """No gap is reported if the first connection attempt fails."""
+        error = ClientConnectionError("fail")
+        session = SequenceSession([error, FakeWebSocket(), IndexError()])
+        handler = SampleWebsocketHandler()
+        backoff = Backoff(initial=0, jitter=0)
+        with pytest.raises(IndexError):
+            await connect(session, "/", handler, reconnect=backoff)
+        assert handler.connected
+        assert handler.gaps == []
+
+    async def test_max_attempts(self):
+        """Reconnecting stops after the maximum number of attempts."""
+        errors = [ClientConnectionError("fail") for _ in range(3)]
+        session = SequenceSession([FakeWebSocket()] + errors)
+        handler = SampleWebsocketHandler()
+        backoff = Backoff(initial=0, jitter=0, max_attempts=2)
+        await connect(session, "/", handler, reconnect=backoff)
+        assert handler.errors == errors[:2]
+        assert handler.disconnects == 1
+
+    async def test_waits_between_attempts(self):
+        """The backoff delay is waited for between attempts."""
+        session = SequenceSession([FakeWebSocket(), FakeWebSocket()])
+        handler = SampleWebsocketHandler()
+        backoff = Backoff(initial=10, jitter=0)
+        task = get_event_loop().create_task(
+            connect(session, "/", handler, reconnect=backoff)
+        )
+        await sleep(0.01)
+        assert handler.disconnects == 1
+        assert len(session.websockets) == 1
+        task.cancel()
+        with pytest.raises(CancelledError):
+            await task
@@ -1,8 +1,69 @@
 """Websocket protocol for the API."""
 
 import abc
+from asyncio import (
+    gather,
+    get_event_loop,
+    Semaphore,
+    sleep,
+)
+from collections import deque
+from datetime import (
+    datetime,
+    timezone,
+)
+import random
+from time import monotonic
+from typing import (
+    NamedTuple,
+    Optional,
+)
 
-from aiohttp import WSMsgType
+from aiohttp import (
+    ClientError,
+    WSMsgType,
+)
+
+# errors on which connection is attempted again, if reconnecting
+_CONNECTION_ERRORS = (ClientError, OSError)
+
+
+class Backoff(NamedTuple):
+    """Configuration for reconnecting a websocket with exponential backoff."""
+
+    #: Seconds to wait before the first reconnection attempt.
+    initial: float = 0.5
+    #: Maximum seconds to wait between attempts.
+    maximum: float = 30.0
+    #: Factor the wait is multiplied by after each failed attempt.
+    factor: float = 2.0
+    #: Fraction of the wait randomly added or subtracted, so that multiple
+    #: clients don't reconnect at the same time.
+    jitter: float = 0.1
+    #: Maximum number of consecutive attempts, unlimited if :data:`None`.
+    max_attempts: Optional[int] = None
+
+    def delay(self, attempt):
+        """Return seconds to wait before an attempt.
+
+        :param int attempt: the attempt number, starting from 1.
+
+        """
+        delay = min(self.maximum, self.initial * self.factor ** (attempt - 1))
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return delay
+
+
+class Gap(NamedTuple):
+    """A period during which a websocket was disconnected."""
+
+    #: When the websocket was disconnected.
+    start: datetime
+    #: Seconds the websocket was disconnected for.
+    duration: float
+    #: Number of attempts it took to reconnect.
+    attempts: int
 
 
 class WebsocketHandler(metaclass=abc.ABCMeta):
@@ -24,6 +85,31 @@ class WebsocketHandler(metaclass=abc.ABCMeta):
 
         """
 
+    async def handle_connect(self):
+        """Handle the websocket connection being established.
+
+        It does nothing by default, can be overridden by subclasses.
+
+        """
+
+    async def handle_disconnect(self):
+        """Handle the websocket being disconnected.
+
+        It does nothing by default, can be overridden by subclasses.
+
+        """
+
+    async def handle_gap(self, gap):
+        """Handle the websocket being connected again after a disconnection.
+
+        This is called after :func:`handle_connect`, when reconnecting. It
+        does nothing by default, can be overridden by subclasses, for instance
+        to fetch again data that might have changed in the meantime.
+
+        :param Gap gap: the period the websocket was disconnected for.
+
+        """
+
     async def handle_error(self, error):
         """Handle a websocket error.
 
@@ -34,25 +120,189 @@ class WebsocketHandler(metaclass=abc.ABCMeta):
         """
 
 
-async def connect(session, path, handler):
+class KeyedDispatcher:
+    """Dispatch items to a handler concurrently, preserving order per key.
+
+    Items with the same key are handled one at a time, in the order they're
+    dispatched, while items with different keys are handled concurrently, by
+    up to the configured number of tasks. Items with a :data:`None` key are
+    not ordered.
+
+    Errors raised by the handler are passed to `handle_error` if specified,
+    otherwise they're reported to the event loop exception handler.
+
+    :param handler: a coroutine function called with each item.
+    :param key: a function returning the key for an item.
+    :param int concurrency: the maximum number of tasks handling items at the
+        same time.
+    :param handle_error: an optional coroutine function called with errors
+        raised by the handler.
+
+    """
+
+    def __init__(self, handler, key, concurrency=10, handle_error=None):
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        self.concurrency = concurrency
+        self._handler = handler
+        self._key = key
+        self._handle_error = handle_error
+        self._slots = Semaphore(concurrency)
+        # map keys to queues of items for tasks handling them
+        self._queues = {}
+        self._tasks = set()
+
+    @property
+    def running(self):
+        """Return the number of tasks currently handling items."""
+        return len(self._tasks)
+
+    @property
+    def pending(self):
+        """Return the number of items waiting to be handled."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def dispatch(self, item):
+        """Dispatch an item to the handler.
+
+        If an item with the same key is being handled, the item is queued
+        after it. Otherwise, this waits for a task to be available.
+
+        """
+        key = self._key(item)
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(item)
+            return
+
+        await self._slots.acquire()
+        queue = deque([item])
+        if key is not None:
+            self._queues[key] = queue
+        task = get_event_loop().create_task(self._run(key, queue))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def join(self):
+        """Wait until all dispatched items are handled."""
+        while self._tasks:
+            await gather(*self._tasks, return_exceptions=True)
+
+    def close(self):
+        """Cancel tasks handling items, discarding pending ones."""
+        for task in self._tasks:
+            task.cancel()
+
+    async def _run(self, key, queue):
+        """Handle items in a queue until it's empty."""
+        try:
+            while queue:
+                item = queue.popleft()
+                try:
+                    await self._handler(item)
+                except Exception as error:
+                    await self._report_error(error)
+        finally:
+            queue.clear()
+            if key is not None:
+                del self._queues[key]
+            self._slots.release()
+
+    async def _report_error(self, error):
+        if self._handle_error is not None:
+            await self._handle_error(error)
+            return
+        get_event_loop().call_exception_handler(
+            {"message": "Error in dispatched handler", "exception": error}
+        )
+
+
+async def connect(session, path, handler, reconnect=None):
     """Connect to a websocket using the specified session.
 
     Appropriate methods on the handler are called when messages or errors are
     received.
 
+    If `reconnect` is specified, the websocket is connected again when it's
+    closed or connecting fails, waiting between attempts as configured. In
+    this case, connection errors are passed to :func:`handle_error` and, once
+    connected again, the handler is notified of the :class:`Gap` through
+    :func:`WebsocketHandler.handle_gap`.
+
     :param aiohttp.Session session: the session to perform the request.
     :param str path: the request path.
-    :param dict params: optional query string parameters.
     :param WebsocketHandler handler: a websocket handler.
+    :param Backoff reconnect: the configuration for reconnecting.
 
     """
+    if reconnect is None:
+        await _connect(session, path, handler)
+    else:
+        await _Reconnector(session, path, handler, reconnect).run()
+
+
+async def _connect(session, path, handler, handle_connected=None):
+    """Connect to a websocket and handle messages until it's closed."""
     async with session.ws_connect(path) as websocket:
         handler.set_websocket(websocket)
-        async for message in websocket:
-            if message.type == WSMsgType.TEXT:
-                await handler.handle_message(message.json())
-            elif message.type == WSMsgType.CLOSED:
-                websocket.close()
+        try:
+            await handler.handle_connect()
+            if handle_connected is not None:
+                await handle_connected()
+            async for message in websocket:
+                if message.type == WSMsgType.TEXT:
+                    await handler.handle_message(message.json())
+                elif message.type == WSMsgType.CLOSED:
+                    websocket.close()
+                    return
+                elif message.type == WSMsgType.ERROR:
+                    await handler.handle_error(message.data)
+        finally:
+            await handler.handle_disconnect()
+
+
+class _Reconnector:
+    """Keep a websocket connected, reconnecting with backoff."""
+
+    def __init__(self, session, path, handler, backoff):
+        self._session = session
+        self._path = path
+        self._handler = handler
+        self._backoff = backoff
+        self._attempts = 0
+        self._connected = False
+        # time of the last disconnection, as datetime and monotonic time
+        self._disconnected = None
+
+    async def run(self):
+        while True:
+            self._connected = False
+            try:
+                await _connect(
+                    self._session,
+                    self._path,
+                    self._handler,
+                    handle_connected=self._handle_connected,
+                )
+            except _CONNECTION_ERRORS as error:
+                await self._handler.handle_error(error)
+            if self._connected:
+                self._attempts = 0
+                self._disconnected = (datetime.now(timezone.utc), monotonic())
+
+            max_attempts = self._backoff.max_attempts
+            if max_attempts is not None and self._attempts >= max_attempts:
                 return
-            elif message.type == WSMsgType.ERROR:
-                await handler.handle_error(message.data)
+            self._attempts += 1
+            await sleep(self._backoff.delay(self._attempts))
+
+    async def _handle_connected(self):
+        self._connected = True
+        if self._disconnected is None:
+            return
+        start, start_time = self._disconnected
+        self._disconnected = None
+        gap = Gap(
+            start=start, duration=monotonic() - start_time, attempts=self._attempts
+        )
+        await self._handler.handle_gap(gap)
@@ -10,12 +10,15 @@ from xdg.BaseDirectory import xdg_config_home
 import yaml
 
 from .remote import (
+    PoolConfig,
     Remote,
     SSLCerts,
 )
 
 
-def get_remotes(config_dir=None) -> Dict[str, Remote]:
+def get_remotes(
+    config_dir=None, pool_config: Optional[PoolConfig] = None
+) -> Dict[str, Remote]:
     """Return :class:`Remote` instances from the :data:`lxc` config.
 
     Return a dict mapping remote names to :class:`asynclxd.remote.Remote`
@@ -25,6 +28,8 @@ def get_remotes(config_dir=None) -> Dict[str, Remote]:
 
     :param pathlib.Path config_dir: path for the :data:`lxc` configuration file
         to use. If not specified, the default path is used.
+    :param asynclxd.remote.PoolConfig pool_config: configuration for the HTTP
+        connections pool of remotes.
 
     """
     if config_dir is None:
@@ -37,7 +42,11 @@ def get_remotes(config_dir=None) -> Dict[str, Remote]:
         return {}
 
     return {
-        name: Remote(conf.get("addr"), certs=_get_certs(config_dir, name))
+        name: Remote(
+            conf.get("addr"),
+            certs=_get_certs(config_dir, name),
+            pool_config=pool_config,
+        )
         for name, conf in config.get("remotes", []).items()
         if conf.get("protocol") in ("lxd", None)
     }
@@ -14,7 +14,11 @@ to access resources exposed by the API.
 
 """
 
-from asyncio import get_event_loop
+from asyncio import (
+    get_event_loop,
+    shield,
+)
+from copy import deepcopy
 from pathlib import Path
 import ssl
 from typing import (
@@ -35,6 +39,14 @@ from .api import (
     resources,
     websocket,
 )
+from .api.batch import ReadBatcher
+from .api.codec import (
+    Decoder,
+    get_codec,
+)
+from .api.resource import IdentityMap
+from .api.resources.events import EventHub
+from .api.resources.operations import OperationWatcher
 from .uri import RemoteURI
 
 
@@ -46,6 +58,33 @@ class SSLCerts(NamedTuple):
     client_key: Optional[Path] = None
 
 
+class PoolConfig(NamedTuple):
+    """Configuration for the HTTP connections pool."""
+
+    #: Maximum number of simultaneous connections.
+    limit: int = 100
+    #: Maximum number of simultaneous connections to the same endpoint (0 means
+    #: no limit).
+    limit_per_host: int = 0
+    #: Seconds an idle connection is kept open for reuse.
+    keepalive_timeout: float = 15.0
+    #: Whether to close the connection after each request.
+    force_close: bool = False
+    #: Seconds DNS lookups are cached for (:data:`None` caches them forever).
+    ttl_dns_cache: Optional[int] = 10
+
+
+class PoolStats(NamedTuple):
+    """Statistics about the HTTP connections pool."""
+
+    #: Number of connections currently used by requests.
+    in_use: int
+    #: Number of open connections available for reuse.
+    idle: int
+    #: Number of requests waiting for a connection to be available.
+    waiters: int
+
+
 class SessionError(Exception):
     """Remote session is invalid."""
 
@@ -73,6 +112,28 @@ class Remote(Loggable):
     :param RemoteURI uri: the server URI.
     :param SSLCerts certs: Certificates for HTTPS connections.
     :param str version: the API version to use.
+    :param PoolConfig pool_config: configuration for the HTTP connections
+        pool.
+    :param bool coalesce_gets: whether concurrent identical :data:`GET`
+        requests should share a single HTTP request. When enabled, all callers
+        get the same :class:`asynclxd.api.http.Response`, which should then be
+        treated as read-only.
+    :param asynclxd.api.cache.ResponseCache response_cache: an optional cache
+        for responses to resource reads.
+    :param asynclxd.api.codec.JSONCodec codec: the codec for JSON requests and
+        responses. If not specified, the fastest available one is used.
+    :param int decode_offload_threshold: size in bytes of JSON responses from
+        which decoding is run in an executor, to avoid blocking the event loop.
+        By default, responses are decoded in the event loop.
+    :param concurrent.futures.Executor decode_executor: the executor for
+        decoding large responses. If not specified, the loop default one is
+        used.
+    :param asynclxd.api.batch.BatchConfig batch_config: if specified,
+        concurrent :func:`get()` calls on collections are batched, replacing
+        them with a single recursive listing of the collection when possible.
+    :param bool watch_operations: whether to wait for completion of
+        background operations through events, with a single websocket,
+        instead of a request for each.
 
     """
 
@@ -95,12 +156,45 @@ class Remote(Loggable):
     _session = None
     _loop = None
 
-    def __init__(self, uri, certs=None, version="1.0", loop=None):
+    def __init__(
+        self,
+        uri,
+        certs=None,
+        version="1.0",
+        pool_config=None,
+        coalesce_gets=False,
+        response_cache=None,
+        codec=None,
+        decode_offload_threshold=None,
+        decode_executor=None,
+        batch_config=None,
+        watch_operations=False,
+        loop=None,
+    ):
         self.uri = RemoteURI(uri)
         self.certs = certs
         self.version = version
+        self.pool_config = pool_config or PoolConfig()
+        self.coalesce_gets = coalesce_gets
+        self.response_cache = response_cache
+        self.codec = codec or get_codec()
+        self.decoder = Decoder(
+            self.codec,
+            offload_threshold=decode_offload_threshold,
+            executor=decode_executor,
+        )
+        #: The batcher for resource reads, if enabled.
+        self.read_batcher = ReadBatcher(batch_config) if batch_config else None
+        #: The watcher for background operations, if enabled.
+        self.operation_watcher = OperationWatcher(self) if watch_operations else None
+        #: The hub sharing a single events websocket across subscribers.
+        self.event_hub = EventHub(self)
         self._loop = loop or get_event_loop()
         self._remote = self  # for the Collection wrapper
+        #: Map of resource URIs to shared resource instances.
+        self.identity_map = IdentityMap(self)
+        # map request keys to in-flight GET requests
+        self._inflight = {}
 
     def __repr__(self):
         return f"{self.__class__.__name__}({repr(self.uri)})"
@@ -121,15 +215,32 @@ class Remote(Loggable):
         """Start a session with the remote."""
         if self._session:
             raise SessionError("Already in a session")
-        self._session = self._session_factory(connector=self._connector())
+        self._session = self._session_factory(
+            connector=self._connector(), json_serialize=self.codec.dumps
+        )
 
     async def close(self):
         """Terminate the session with the remote."""
         if not self._session:
             raise SessionError("Not in a session")
+        if self.operation_watcher is not None:
+            self.operation_watcher.stop()
+        self.event_hub.stop()
         await self._session.close()
         self._session = None
 
+    def pool_stats(self):
+        """Return :class:`PoolStats` for the session connections pool."""
+        if not self._session:
+            raise SessionError("Not in a session")
+
+        connector = self._session.connector
+        return PoolStats(
+            in_use=len(connector._acquired),
+            idle=sum(len(conns) for conns in connector._conns.values()),
+            waiters=sum(len(waiters) for waiters in connector._waiters.values()),
+        )
+
     async def api_versions(self):
         """Return a list of available API versions."""
         # use absolute URI so that the version is not included
@@ -169,7 +280,15 @@ class Remote(Loggable):
         return resources.Events(self)
 
     async def request(
-        self, method, path, params=None, headers=None, content=None, upload=None
+        self,
+        method,
+        path,
+        params=None,
+        headers=None,
+        content=None,
+        upload=None,
+        cache=False,
+        stream=False,
     ):
         """Perform an API request within the session.
 
@@ -182,25 +301,43 @@ class Remote(Loggable):
         :param content: JSON-serializable object for the request content.
         :param upload: a :class:`pathlib.Path` or open file descriptor for
             file upload.
+        :param bool cache: for :data:`GET` requests, whether the response
+            cache should be used, if the remote has one.
+        :param bool stream: whether the response content should be streamed
+            rather than decoded. Items in the metadata can be iterated with
+            :func:`asynclxd.api.http.Response.iter_metadata`. Streamed
+            requests don't use the response cache and are not coalesced.
 
         """
         if not self._session:
             raise SessionError("Not in a session")
 
         self.logger.debug(f"{method} {self._full_path(path, params=params)} {content}")
-        path = self._full_path(path)
-        response = await http.request(
-            self._session,
+        api_path = self._api_path(path)
+        if method == "GET":
+            if stream:
+                return await self._request(
+                    "GET", api_path, params=params, headers=headers, stream=True
+                )
+            if cache and self.response_cache is not None:
+                return await self._cached_request(
+                    api_path, params=params, headers=headers
+                )
+            return await self._get(api_path, params=params, headers=headers)
+
+        if self.response_cache is not None:
+            self.response_cache.invalidate(api_path)
+        return await self._request(
             method,
-            path,
+            api_path,
             params=params,
             headers=headers,
             content=content,
             upload=upload,
+            stream=stream,
         )
-        return await self._make_response(response)
 
-    def websocket(self, handler, path, params=None):
+    def websocket(self, handler, path, params=None, reconnect=None):
         """Connect a handler to a websocket URL.
 
         :param .api.WebsocketHandler handler: handler for the websocket.
@@ -208,6 +345,9 @@ class Remote(Loggable):
             slash, it's prepended with the API version the remote is
             configured with.
         :param dict params: optional query string parameters.
+        :param .api.websocket.Backoff reconnect: if specified, the websocket
+            is connected again when closed, waiting between attempts as
+            configured.
 
         """
         if not self._session:
@@ -215,28 +355,113 @@ class Remote(Loggable):
 
         path = self._full_path(path, params=params)
         self.logger.debug(f"{handler.__class__.__name__} {path}")
-        return self._loop.create_task(websocket.connect(self._session, path, handler))
+        return self._loop.create_task(
+            websocket.connect(self._session, path, handler, reconnect=reconnect)
+        )
 
-    def _full_path(self, path, params=None):
-        """Return the full path for a request."""
+    async def _request(
+        self,
+        method,
+        path,
+        params=None,
+        headers=None,
+        content=None,
+        upload=None,
+        stream=False,
+    ):
+        """Perform an API request for an API path."""
+        response = await http.request(
+            self._session,
+            method,
+            self._full_path(path),
+            params=params,
+            headers=headers,
+            content=content,
+            upload=upload,
+            loads=self.codec.loads,
+        )
+        return await self._make_response(response, stream=stream)
+
+    async def _get(self, path, params=None, headers=None):
+        """Perform a GET request, coalescing it if enabled."""
+        if self.coalesce_gets:
+            return await self._coalesced_request(path, params=params, headers=headers)
+        return await self._request("GET", path, params=params, headers=headers)
+
+    async def _coalesced_request(self, path, params=None, headers=None):
+        """Perform a GET request, sharing it with identical concurrent ones."""
+        key = (path, _request_key(params), _request_key(headers))
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._loop.create_task(
+                self._request("GET", path, params=params, headers=headers)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # cancelling a caller must not cancel the request for others
+        return await shield(task)
+
+    async def _cached_request(self, path, params=None, headers=None):
+        """Perform a GET request, using the response cache."""
+        cache = self.response_cache
+        key = (path, _request_key(params))
+        entry = cache.get(key)
+        if entry:
+            if cache.is_fresh(entry):
+                cache.hits += 1
+                return self._cached_response(entry)
+            headers = dict(headers or {})
+            headers["If-None-Match"] = entry.etag
+
+        response = await self._get(path, params=params, headers=headers)
+        if entry and response.http_code == 304:
+            cache.hits += 1
+            cache.touch(key)
+            return self._cached_response(entry)
+
+        cache.misses += 1
+        if response.type != "raw":
+            cache.store(key, response)
+        return response
+
+    def _cached_response(self, entry):
+        """Return a Response from a cache entry."""
+        return http.Response(
+            self, entry.http_code, entry.headers, deepcopy(entry.content)
+        )
+
+    def _api_path(self, path):
+        """Return the API path for a request, including the version."""
         if not path:
             path = "/" + self.version
         elif not path.startswith("/"):
             path = f"/{self.version}/{path}"
-        return self.uri.request_path(path, params=params)
+        return path
 
-    async def _make_response(self, http_response):
+    def _full_path(self, path, params=None):
+        """Return the full path for a request."""
+        return self.uri.request_path(self._api_path(path), params=params)
+
+    async def _make_response(self, http_response, stream=False):
         headers = http_response.headers
-        if headers.get("Content-Type") == "application/json":
-            content = await http_response.json()
+        if not stream and headers.get("Content-Type") == "application/json":
+            content = await self.decoder.decode(await http_response.read())
         else:
             content = http_response.content
         return http.Response(self, http_response.status, headers, content)
 
     def _connector(self):
         """Return a connector for the HTTP session."""
+        pool_options = {
+            "limit": self.pool_config.limit,
+            "limit_per_host": self.pool_config.limit_per_host,
+            "force_close": self.pool_config.force_close,
+        }
+        if not self.pool_config.force_close:
+            # aiohttp doesn't allow setting both
+            pool_options["keepalive_timeout"] = self.pool_config.keepalive_timeout
         if self.uri.scheme == "unix":
-            return UnixConnector(path=self.uri.path)
+            return UnixConnector(path=self.uri.path, **pool_options)
 
         ssl_context = None
         if self.certs:  # pragma: no cover
@@ -245,4 +470,15 @@ class Remote(Loggable):
             ssl_context.load_cert_chain(
                 self.certs.client_cert, keyfile=self.certs.client_key
             )
-        return TCPConnector(ssl=ssl_context)
+        return TCPConnector(
+            ssl=ssl_context,
+            ttl_dns_cache=self.pool_config.ttl_dns_cache,
+            **pool_options,
+        )
+
+
+def _request_key(items):
+    """Return a hashable key from a dict of request parameters or headers."""
+    if not items:
+        return ()
+    return tuple(sorted(items.items()))
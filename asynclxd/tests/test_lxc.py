@@ -7,6 +7,7 @@ from ..lxc import (
     cli_config_dir,
     get_remotes,
 )
+from ..remote import PoolConfig
 
 
 @pytest.fixture
@@ -86,6 +87,13 @@ class TestGetRemotes:
         assert str(remotes["local"].uri) == "unix:///path/to/socket"
         assert str(remotes["other"].uri) == "https://example.com:8443/"
 
+    def test_remotes_pool_config(self, make_config):
+        """The pool configuration is passed to remotes."""
+        make_config({"remotes": {"local": {"addr": "unix:///path/to/socket"}}})
+        pool_config = PoolConfig(limit=10)
+        remotes = get_remotes(pool_config=pool_config)
+        assert remotes["local"].pool_config is pool_config
+
     def test_default_unix_socket_path(self, make_config):
         """If a path is not specified for the socket, the default is used."""
         make_config({"remotes": {"local": {"addr": "unix://"}}})
@@ -1,4 +1,12 @@
-from io import StringIO
+from asyncio import (
+    gather,
+    sleep,
+)
+from io import (
+    BytesIO,
+    StringIO,
+)
+import json
 from pathlib import Path
 
 from aiohttp import (
@@ -7,16 +15,34 @@ from aiohttp import (
 )
 import pytest
 
+from ..api.batch import (
+    BatchConfig,
+    ReadBatcher,
+)
+from ..api.cache import (
+    CacheStats,
+    ResponseCache,
+)
+from ..api.codec import JSONCodec
+from ..api.http import ResponseError
 from ..api.resources import Events
+from ..api.resources.events import EventHub
+from ..api.resources.operations import OperationWatcher
 from ..api.testing import (
     FakeSession,
     FakeWebSocket,
     FakeWSMessage,
+    make_error_response,
     make_http_response,
     make_response_content,
 )
-from ..api.websocket import WebsocketHandler
+from ..api.websocket import (
+    Backoff,
+    WebsocketHandler,
+)
 from ..remote import (
+    PoolConfig,
+    PoolStats,
     Remote,
     SessionError,
 )
@@ -31,7 +57,7 @@ def remote(event_loop):
 def make_fake_session(remote):
     def fake_session(_remote=remote, **kwargs):
         session = FakeSession(**kwargs)
-        _remote._session_factory = lambda connector=None: session
+        _remote._session_factory = lambda connector=None, **kwargs: session
         return session
 
     yield fake_session
@@ -42,6 +68,12 @@ class TestRemote:
         """The object repr includes the URI."""
         assert repr(remote) == "Remote('https://example.com:8443/')"
 
+    def test_identity_map(self, remote):
+        """The remote has an identity map for resources."""
+        container = remote.containers.get_resource("c")
+        assert remote.containers.get_resource("c") is container
+        assert remote.identity_map.get(type(container), container.uri) is container
+
     def test_resource_uri(self, remote):
         """THe resource_uri property returns the base resource URI."""
         assert remote.resource_uri == "/1.0"
@@ -165,6 +197,371 @@ class TestRemote:
             await response.write_content(out_stream)
         assert out_stream.getvalue() == "some content"
 
+    @pytest.mark.asyncio
+    async def test_request_stream(self, remote, make_fake_session):
+        """JSON responses can be streamed instead of decoded."""
+        make_fake_session(responses=[make_response_content(["one", "two"])])
+        async with remote:
+            response = await remote.request("GET", "containers", stream=True)
+            assert response.type == "raw"
+            items = [item async for item in response.iter_metadata()]
+        assert items == ["one", "two"]
+        assert remote.decoder.stats().inline == 0
+
+    @pytest.mark.asyncio
+    async def test_request_stream_not_cached(self, event_loop, make_fake_session):
+        """Streamed responses don't use the cache."""
+        remote = Remote(
+            "https://example.com:8443",
+            response_cache=ResponseCache(),
+            loop=event_loop,
+        )
+        content = make_response_content(["one"])
+        session = make_fake_session(
+            _remote=remote,
+            responses=[
+                make_http_response(headers={"ETag": "abc"}, content=content),
+                make_http_response(headers={"ETag": "abc"}, content=content),
+            ],
+        )
+        async with remote:
+            await remote.request("GET", "containers", cache=True)
+            await remote.request("GET", "containers", cache=True, stream=True)
+        assert len(remote.response_cache) == 1
+        # no revalidation header is sent
+        assert session.calls[1][3] == {}
+
+    @pytest.mark.asyncio
+    async def test_request_coalesce_gets(self, event_loop, make_fake_session):
+        """Concurrent identical GET requests share a single HTTP request."""
+        remote = Remote("https://example.com:8443", coalesce_gets=True, loop=event_loop)
+        session = make_fake_session(
+            _remote=remote, responses=[make_response_content(["response"])]
+        )
+        async with remote:
+            response1, response2 = await gather(
+                remote.request("GET", "/", params={"a": "b"}),
+                remote.request("GET", "/", params={"a": "b"}),
+            )
+        assert response1 is response2
+        assert session.calls == [
+            ("GET", "https://example.com:8443", {"a": "b"}, {}, None)
+        ]
+        assert remote._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_request_coalesce_gets_different_requests(
+        self, event_loop, make_fake_session
+    ):
+        """Requests with different paths, params or headers are not shared."""
+        remote = Remote("https://example.com:8443", coalesce_gets=True, loop=event_loop)
+        session = make_fake_session(
+            _remote=remote,
+            responses=[make_response_content([index]) for index in range(3)],
+        )
+        async with remote:
+            responses = await gather(
+                remote.request("GET", "/"),
+                remote.request("GET", "/", params={"a": "b"}),
+                remote.request("GET", "/", headers={"X-Sample": "value"}),
+            )
+        assert len(session.calls) == 3
+        assert [response.metadata for response in responses] == [[0], [1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_request_coalesce_gets_sequential(
+        self, event_loop, make_fake_session
+    ):
+        """Requests are shared only while in-flight."""
+        remote = Remote("https://example.com:8443", coalesce_gets=True, loop=event_loop)
+        session = make_fake_session(
+            _remote=remote,
+            responses=[make_response_content(["one"]), make_response_content(["two"])],
+        )
+        async with remote:
+            response1 = await remote.request("GET", "/")
+            response2 = await remote.request("GET", "/")
+        assert len(session.calls) == 2
+        assert response1.metadata == ["one"]
+        assert response2.metadata == ["two"]
+
+    @pytest.mark.asyncio
+    async def test_request_coalesce_gets_error(self, event_loop, make_fake_session):
+        """Errors from a shared request are raised to all callers."""
+        remote = Remote("https://example.com:8443", coalesce_gets=True, loop=event_loop)
+        make_fake_session(_remote=remote, responses=[make_error_response("Failed")])
+        async with remote:
+            results = await gather(
+                remote.request("GET", "/"),
+                remote.request("GET", "/"),
+                return_exceptions=True,
+            )
+        error1, error2 = results
+        assert isinstance(error1, ResponseError)
+        assert error1 is error2
+
+    @pytest.mark.asyncio
+    async def test_request_coalesce_gets_caller_cancelled(
+        self, event_loop, make_fake_session
+    ):
+        """Cancelling a caller doesn't cancel the shared request."""
+        remote = Remote("https://example.com:8443", coalesce_gets=True, loop=event_loop)
+        make_fake_session(_remote=remote, responses=[make_response_content(["resp"])])
+        async with remote:
+            task1 = event_loop.create_task(remote.request("GET", "/"))
+            task2 = event_loop.create_task(remote.request("GET", "/"))
+            await sleep(0)
+            task1.cancel()
+            response = await task2
+        assert task1.cancelled()
+        assert response.metadata == ["resp"]
+
+    @pytest.mark.asyncio
+    async def test_request_coalesce_gets_only_get(self, event_loop, make_fake_session):
+        """Only GET requests are shared."""
+        remote = Remote("https://example.com:8443", coalesce_gets=True, loop=event_loop)
+        session = make_fake_session(
+            _remote=remote,
+            responses=[make_response_content(), make_response_content()],
+        )
+        async with remote:
+            await gather(remote.request("POST", "/"), remote.request("POST", "/"))
+        assert len(session.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_request_cache(self, event_loop, make_fake_session):
+        """Cached responses are revalidated with the server."""
+        remote = Remote(
+            "https://example.com:8443",
+            response_cache=ResponseCache(),
+            loop=event_loop,
+        )
+        session = make_fake_session(
+            _remote=remote,
+            responses=[
+                make_http_response(
+                    headers={"ETag": "abc"},
+                    content=make_response_content({"name": "c"}),
+                ),
+                make_http_response(status=304, content=BytesIO(b"")),
+            ],
+        )
+        async with remote:
+            response1 = await remote.request("GET", "containers/c", cache=True)
+            response2 = await remote.request("GET", "containers/c", cache=True)
+        assert session.calls == [
+            ("GET", "https://example.com:8443/1.0/containers/c", None, {}, None),
+            (
+                "GET",
+                "https://example.com:8443/1.0/containers/c",
+                None,
+                {"If-None-Match": "abc"},
+                None,
+            ),
+        ]
+        assert response1.metadata == {"name": "c"}
+        assert response2.http_code == 200
+        assert response2.etag == "abc"
+        assert response2.metadata == {"name": "c"}
+        assert remote.response_cache.stats() == CacheStats(hits=1, misses=1, size=1)
+
+    @pytest.mark.asyncio
+    async def test_request_cache_modified(self, event_loop, make_fake_session):
+        """If the resource has changed, the new response is cached."""
+        remote = Remote(
+            "https://example.com:8443",
+            response_cache=ResponseCache(),
+            loop=event_loop,
+        )
+        make_fake_session(
+            _remote=remote,
+            responses=[
+                make_http_response(
+                    headers={"ETag": "abc"}, content=make_response_content({"v": 1})
+                ),
+                make_http_response(
+                    headers={"ETag": "def"}, content=make_response_content({"v": 2})
+                ),
+            ],
+        )
+        async with remote:
+            await remote.request("GET", "containers/c", cache=True)
+            response = await remote.request("GET", "containers/c", cache=True)
+        assert response.metadata == {"v": 2}
+        assert remote.response_cache.get(("/1.0/containers/c", ())).etag == "def"
+        assert remote.response_cache.stats() == CacheStats(hits=0, misses=2, size=1)
+
+    @pytest.mark.asyncio
+    async def test_request_cache_fresh(self, event_loop, make_fake_session):
+        """Fresh responses are served without performing a request."""
+        remote = Remote(
+            "https://example.com:8443",
+            response_cache=ResponseCache(ttl=60),
+            loop=event_loop,
+        )
+        session = make_fake_session(
+            _remote=remote,
+            responses=[
+                make_http_response(
+                    headers={"ETag": "abc"}, content=make_response_content({"v": 1})
+                )
+            ],
+        )
+        async with remote:
+            response1 = await remote.request("GET", "containers/c", cache=True)
+            response1.metadata["v"] = 2
+            response2 = await remote.request("GET", "containers/c", cache=True)
+        assert len(session.calls) == 1
+        # the cached response is not affected by changes to returned ones
+        assert response2.metadata == {"v": 1}
+
+    @pytest.mark.asyncio
+    async def test_request_cache_not_requested(self, event_loop, make_fake_session):
+        """The cache is used only if requested."""
+        remote = Remote(
+            "https://example.com:8443",
+            response_cache=ResponseCache(),
+            loop=event_loop,
+        )
+        make_fake_session(
+            _remote=remote,
+            responses=[
+                make_http_response(
+                    headers={"ETag": "abc"}, content=make_response_content({"v": 1})
+                )
+            ],
+        )
+        async with remote:
+            await remote.request("GET", "containers/c")
+        assert len(remote.response_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_request_cache_raw_not_cached(self, event_loop, make_fake_session):
+        """Binary responses are not cached."""
+        remote = Remote(
+            "https://example.com:8443",
+            response_cache=ResponseCache(),
+            loop=event_loop,
+        )
+        make_fake_session(
+            _remote=remote,
+            responses=[
+                make_http_response(headers={"ETag": "abc"}, content=BytesIO(b"data"))
+            ],
+        )
+        async with remote:
+            await remote.request("GET", "images/i/export", cache=True)
+        assert len(remote.response_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_request_cache_invalidate(self, event_loop, make_fake_session):
+        """Non-GET requests invalidate cached responses for the path."""
+        remote = Remote(
+            "https://example.com:8443",
+            response_cache=ResponseCache(),
+            loop=event_loop,
+        )
+        make_fake_session(
+            _remote=remote,
+            responses=[
+                make_http_response(
+                    headers={"ETag": "abc"}, content=make_response_content({"v": 1})
+                ),
+                make_response_content(),
+            ],
+        )
+        async with remote:
+            await remote.request("GET", "containers/c", cache=True)
+            await remote.request("PATCH", "containers/c", content={"v": 2})
+        assert len(remote.response_cache) == 0
+
+    def test_read_batcher_default(self, remote):
+        """Reads are not batched by default."""
+        assert remote.read_batcher is None
+
+    def test_read_batcher(self, event_loop):
+        """A read batcher is created if batching is configured."""
+        config = BatchConfig(threshold=5)
+        remote = Remote(
+            "https://example.com:8443", batch_config=config, loop=event_loop
+        )
+        assert isinstance(remote.read_batcher, ReadBatcher)
+        assert remote.read_batcher.config == config
+
+    def test_operation_watcher_default(self, remote):
+        """Operations are not watched through events by default."""
+        assert remote.operation_watcher is None
+
+    @pytest.mark.asyncio
+    async def test_operation_watcher(self, event_loop, make_fake_session):
+        """An operation watcher is created if requested, and stopped on close."""
+        remote = Remote(
+            "https://example.com:8443", watch_operations=True, loop=event_loop
+        )
+        assert isinstance(remote.operation_watcher, OperationWatcher)
+        make_fake_session(_remote=remote)
+        stopped = []
+        remote.operation_watcher.stop = lambda: stopped.append(True)
+        async with remote:
+            pass
+        assert stopped == [True]
+
+    @pytest.mark.asyncio
+    async def test_event_hub(self, remote, make_fake_session):
+        """The remote has an event hub, stopped on close."""
+        assert isinstance(remote.event_hub, EventHub)
+        make_fake_session(websocket=FakeWebSocket())
+        async with remote:
+            remote.events.subscribe(None, types=["lifecycle"])
+            assert remote.event_hub.connected
+        assert remote.event_hub.subscriptions == ()
+        assert not remote.event_hub.connected
+
+    def test_codec_default(self, remote):
+        """A JSON codec is used by default."""
+        assert isinstance(remote.codec, JSONCodec)
+
+    @pytest.mark.asyncio
+    async def test_codec_session(self, event_loop):
+        """The codec is used to encode JSON requests in the session."""
+        codec = JSONCodec(name="sample", loads=json.loads, dumps=json.dumps)
+        remote = Remote("https://example.com:8443", codec=codec, loop=event_loop)
+        async with remote:
+            assert remote._session._json_serialize is json.dumps
+
+    @pytest.mark.asyncio
+    async def test_codec_response(self, event_loop, make_fake_session):
+        """The codec is used to decode JSON responses."""
+        decoded = []
+
+        def loads(data):
+            decoded.append(data)
+            return json.loads(data)
+
+        codec = JSONCodec(name="sample", loads=loads, dumps=json.dumps)
+        remote = Remote("https://example.com:8443", codec=codec, loop=event_loop)
+        make_fake_session(
+            _remote=remote, responses=[make_response_content(["response"])]
+        )
+        async with remote:
+            response = await remote.request("GET", "/")
+        assert response.metadata == ["response"]
+        assert len(decoded) == 1
+
+    @pytest.mark.asyncio
+    async def test_decode_offload(self, event_loop, make_fake_session):
+        """Large responses are decoded in an executor."""
+        remote = Remote(
+            "https://example.com:8443", decode_offload_threshold=10, loop=event_loop
+        )
+        make_fake_session(
+            _remote=remote, responses=[make_response_content(["response"])]
+        )
+        async with remote:
+            response = await remote.request("GET", "/")
+        assert response.metadata == ["response"]
+        assert remote.decoder.stats().offloaded == 1
+
     @pytest.mark.asyncio
     async def test_request_not_in_session(self, remote):
         """A SessionError is raised if request is not called in a session."""
@@ -201,6 +598,29 @@ class TestRemote:
 
         assert handler.messages == ['"foo"', '"bar"']
 
+    @pytest.mark.asyncio
+    async def test_websocket_reconnect(self, remote, make_fake_session):
+        """Websocket connections can be reconnected."""
+        make_fake_session(websocket=FakeWebSocket())
+        backoff = Backoff(initial=0, jitter=0)
+
+        class SampleHandler(WebsocketHandler):
+            connects = 0
+
+            async def handle_connect(self):
+                self.connects += 1
+                if self.connects == 2:
+                    raise ValueError("Stop")
+
+            async def handle_message(self, message):
+                pass
+
+        handler = SampleHandler()
+        async with remote:
+            with pytest.raises(ValueError):
+                await remote.websocket(handler, "/", reconnect=backoff)
+        assert handler.connects == 2
+
     @pytest.mark.asyncio
     async def test_websocket_not_in_session(self, remote):
         """A SessionError is raised if websocket is not called in a session."""
@@ -225,6 +645,72 @@ class TestRemote:
             assert isinstance(remote._session.connector, TCPConnector)
             assert remote._session.connector._ssl is None
 
+    @pytest.mark.asyncio
+    async def test_connector_default_pool_config(self, remote):
+        """The connector uses the default pool configuration."""
+        async with remote:
+            connector = remote._session.connector
+            assert connector.limit == 100
+            assert connector.limit_per_host == 0
+            assert connector._keepalive_timeout == 15.0
+            assert not connector.force_close
+            assert connector._cached_hosts._ttl == 10
+
+    @pytest.mark.asyncio
+    async def test_connector_pool_config(self, event_loop):
+        """The connector is configured based on the pool configuration."""
+        pool_config = PoolConfig(
+            limit=20, limit_per_host=5, keepalive_timeout=30.0, ttl_dns_cache=60
+        )
+        remote = Remote(
+            "https://example.com:8443", pool_config=pool_config, loop=event_loop
+        )
+        async with remote:
+            connector = remote._session.connector
+            assert connector.limit == 20
+            assert connector.limit_per_host == 5
+            assert connector._keepalive_timeout == 30.0
+            assert connector._cached_hosts._ttl == 60
+
+    @pytest.mark.asyncio
+    async def test_connector_unix_pool_config(self, make_fake_session):
+        """The pool configuration is used for UNIX connectors."""
+        remote = Remote("unix:///socket/path", pool_config=PoolConfig(limit=3))
+        remote._session_factory = FakeSession
+        async with remote:
+            assert remote._session.connector.limit == 3
+
+    @pytest.mark.asyncio
+    async def test_connector_pool_config_force_close(self, event_loop):
+        """If connections are force-closed, keepalive timeout is not set."""
+        remote = Remote(
+            "https://example.com:8443",
+            pool_config=PoolConfig(force_close=True),
+            loop=event_loop,
+        )
+        async with remote:
+            assert remote._session.connector.force_close
+
+    @pytest.mark.asyncio
+    async def test_pool_stats(self, remote):
+        """Statistics about the connections pool are returned."""
+        async with remote:
+            connector = remote._session.connector
+            connector._acquired.update([object(), object()])
+            connector._conns["key"] = [object()]
+            connector._waiters["key"].append(object())
+            stats = remote.pool_stats()
+            connector._acquired.clear()
+            connector._conns.clear()
+            connector._waiters.clear()
+        assert stats == PoolStats(in_use=2, idle=1, waiters=1)
+
+    def test_pool_stats_not_in_session(self, remote):
+        """A SessionError is raised if not in a session."""
+        with pytest.raises(SessionError) as error:
+            remote.pool_stats()
+        assert str(error.value) == "Not in a session"
+
     @pytest.mark.asyncio
     async def test_api_versions(self, remote, make_fake_session):
         """It's possible to query for API versions."""
@@ -0,0 +1,93 @@
+"""Compare JSON codecs on large container listings.
+
+Run as::
+
+    python benchmarks/bench_codec.py [--containers N] [--repeat N]
+
+"""
+
+import argparse
+from timeit import repeat
+
+from asynclxd.api.codec import (
+    CODECS,
+    get_codec,
+)
+
+
+def container_details(index):
+    """Return details for a container, similar to the ones from LXD."""
+    name = f"container-{index}"
+    return {
+        "architecture": "x86_64",
+        "config": {
+            "image.architecture": "amd64",
+            "image.description": "ubuntu 20.04 LTS amd64 (release) (20200819)",
+            "image.os": "ubuntu",
+            "image.release": "focal",
+            "volatile.base_image": "a" * 64,
+            "volatile.eth0.hwaddr": "00:16:3e:00:00:00",
+            "volatile.idmap.base": "0",
+            "volatile.last_state.power": "RUNNING",
+            "user.index": str(index),
+        },
+        "devices": {},
+        "ephemeral": False,
+        "profiles": ["default"],
+        "stateful": False,
+        "description": "",
+        "created_at": "2020-08-20T10:00:00.123456789Z",
+        "expanded_config": {"security.nesting": "true"},
+        "expanded_devices": {
+            "eth0": {"name": "eth0", "network": "lxdbr0", "type": "nic"},
+            "root": {"path": "/", "pool": "default", "type": "disk"},
+        },
+        "name": name,
+        "status": "Running",
+        "status_code": 103,
+        "last_used_at": "2020-08-20T10:00:01.123456789Z",
+        "location": "none",
+    }
+
+
+def listing(containers):
+    """Return a recursive listing response for the containers."""
+    return {
+        "type": "sync",
+        "status": "Success",
+        "status_code": 200,
+        "operation": "",
+        "error_code": 0,
+        "error": "",
+        "metadata": [container_details(index) for index in range(containers)],
+    }
+
+
+def available_codecs():
+    for name in CODECS:
+        try:
+            yield get_codec(name)
+        except ImportError:
+            print(f"{name:>8}: not installed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--containers", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    content = listing(args.containers)
+    payload = get_codec("json").dumps(content).encode("utf-8")
+    print(f"{args.containers} containers, {len(payload) / 2 ** 20:.1f} MiB payload")
+    for codec in available_codecs():
+        loads = min(repeat(lambda: codec.loads(payload), number=1, repeat=args.repeat))
+        dumps = min(repeat(lambda: codec.dumps(content), number=1, repeat=args.repeat))
+        print(
+            f"{codec.name:>8}: decode {loads * 1000:8.2f} ms, "
+            f"encode {dumps * 1000:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
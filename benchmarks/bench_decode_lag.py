@@ -0,0 +1,85 @@
+"""Measure event loop lag while decoding large listings.
+
+A ticker task measures how late the event loop wakes it up while payloads are
+decoded, either inline or in a thread or process pool executor.
+
+Decoders holding the GIL still compete with the event loop thread when run in
+a thread pool, so a process pool gives the most predictable latency.
+
+Run as::
+
+    python benchmarks/bench_decode_lag.py [--containers N] [--decodes N] [--codec C]
+
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from time import perf_counter
+
+from bench_codec import listing
+
+from asynclxd.api.codec import (
+    Decoder,
+    get_codec,
+)
+
+TICK = 0.001
+
+
+async def ticker(lags):
+    while True:
+        start = perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(perf_counter() - start - TICK)
+
+
+async def measure(decoder, payload, decodes):
+    lags = []
+    task = asyncio.ensure_future(ticker(lags))
+    await asyncio.sleep(TICK * 5)
+    for _ in range(decodes):
+        await decoder.decode(payload)
+        # let the ticker run
+        await asyncio.sleep(TICK * 2)
+    task.cancel()
+    return max(lags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--containers", type=int, default=5000)
+    parser.add_argument("--decodes", type=int, default=10)
+    parser.add_argument("--codec", help="JSON codec (default: fastest available)")
+    args = parser.parse_args()
+
+    codec = get_codec(args.codec)
+    payload = codec.dumps(listing(args.containers)).encode("utf-8")
+    print(
+        f"{args.containers} containers, {len(payload) / 2 ** 20:.1f} MiB payload, "
+        f"{codec.name} codec"
+    )
+    loop = asyncio.get_event_loop()
+    modes = (
+        ("inline", None, None),
+        ("thread", 0, ThreadPoolExecutor(max_workers=1)),
+        ("process", 0, ProcessPoolExecutor(max_workers=1)),
+    )
+    for name, threshold, executor in modes:
+        decoder = Decoder(codec, offload_threshold=threshold, executor=executor)
+        max_lag = loop.run_until_complete(measure(decoder, payload, args.decodes))
+        stats = decoder.stats()
+        print(
+            f"{name:>10}: max loop lag {max_lag * 1000:7.2f} ms, "
+            f"decode time in loop {stats.inline_time * 1000:8.2f} ms, "
+            f"off loop {stats.offloaded_time * 1000:8.2f} ms"
+        )
+        if executor:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare allocations for accessing resource details.
+
+Details access through read-only views is compared with the previous
+behavior, which returned a deep copy of the details on each access. Details
+for all containers are kept, as when building an inventory.
+
+Run as::
+
+    python benchmarks/bench_details.py [--containers N]
+
+"""
+
+import argparse
+from copy import deepcopy
+from time import perf_counter
+import tracemalloc
+
+from bench_codec import container_details
+
+from asynclxd.api.resources.containers import Container
+
+
+def access_views(containers):
+    details = []
+    for container in containers:
+        details.append(container.details())
+        container["expanded_devices"]["root"]["pool"]
+    return details
+
+
+def access_copies(containers):
+    details = []
+    for container in containers:
+        details.append(deepcopy(container._details))
+        deepcopy(container._details["expanded_devices"])["root"]["pool"]
+    return details
+
+
+def measure(func, containers):
+    tracemalloc.start()
+    start = perf_counter()
+    func(containers)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--containers", type=int, default=10000)
+    args = parser.parse_args()
+
+    containers = []
+    for index in range(args.containers):
+        container = Container(None, f"/1.0/containers/container-{index}")
+        container.update_details(container_details(index))
+        containers.append(container)
+
+    print(f"{args.containers} containers")
+    for name, func in (("deepcopy", access_copies), ("views", access_views)):
+        elapsed, peak = measure(func, containers)
+        print(
+            f"{name:>10}: {elapsed * 1000:8.2f} ms, "
+            f"peak allocation {peak / 1024:10.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
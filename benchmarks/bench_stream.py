@@ -0,0 +1,106 @@
+"""Compare peak memory for reading and streaming container listings.
+
+The recursive listing is processed one container at a time, as when
+collecting a summary for each container. With read() the whole listing is
+decoded before processing, while iter() parses containers as chunks of the
+response are received.
+
+Run as::
+
+    python benchmarks/bench_stream.py [--containers N] [--chunk-size N]
+
+"""
+
+import argparse
+import asyncio
+from io import BytesIO
+import json
+from time import perf_counter
+import tracemalloc
+
+from bench_codec import listing
+
+from asynclxd.api.http import (
+    ContentStream,
+    Response,
+)
+from asynclxd.api.resource import IdentityMap
+from asynclxd.api.resources.containers import Containers
+
+
+class ChunkedStream(ContentStream):
+    """A stream returning the payload in chunks."""
+
+    def __init__(self, payload, chunk_size):
+        self._stream = BytesIO(payload)
+        self._chunk_size = chunk_size
+
+    async def read(self):
+        return self._stream.read()
+
+    async def iter_any(self):
+        while True:
+            chunk = self._stream.read(self._chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class BenchRemote:
+    """A remote returning a listing payload, received in chunks."""
+
+    def __init__(self, payload, chunk_size):
+        self.payload = payload
+        self.chunk_size = chunk_size
+        self.identity_map = IdentityMap(self)
+
+    async def request(self, method, path, params=None, stream=False, **kwargs):
+        stream_content = ChunkedStream(self.payload, self.chunk_size)
+        if stream:
+            return Response(self, 200, {}, stream_content)
+        data = b"".join([chunk async for chunk in stream_content.iter_any()])
+        return Response(self, 200, {}, json.loads(data))
+
+
+def summary(container):
+    return container["name"], container["status"]
+
+
+async def read_all(collection):
+    return [summary(container) for container in await collection.read(True)]
+
+
+async def stream_all(collection):
+    return [summary(container) async for container in collection.iter(True)]
+
+
+def measure(func, collection):
+    tracemalloc.start()
+    start = perf_counter()
+    asyncio.run(func(collection))
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--containers", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=2**16)
+    args = parser.parse_args()
+
+    payload = json.dumps(listing(args.containers)).encode("utf-8")
+    print(f"{args.containers} containers, {len(payload) / 2 ** 20:.1f} MiB payload")
+    for name, func in (("read", read_all), ("iter", stream_all)):
+        remote = BenchRemote(payload, args.chunk_size)
+        collection = Containers(remote, "/1.0/containers")
+        elapsed, peak = measure(func, collection)
+        print(
+            f"{name:>6}: {elapsed * 1000:8.2f} ms, "
+            f"peak allocation {peak / 2 ** 20:8.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()